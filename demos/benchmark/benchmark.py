@@ -14,6 +14,7 @@
 # % sort time
 # % stats 20
 
+from tornado.httpserver import HTTPServer
 from tornado.ioloop import IOLoop
 from tornado.options import define, options, parse_command_line
 from tornado.web import RequestHandler, Application
@@ -41,6 +42,10 @@ define("num_runs", type=int, default=1)
 
 define("ioloop", type=str, default=None)
 
+# Serve from this many threads with TCPServer.start_threads (0 means one
+# per core).  By default the server runs on the main IOLoop.
+define("threads", type=int, default=None)
+
 class RootHandler(RequestHandler):
     def get(self):
         self.write("Hello, world")
@@ -61,7 +66,12 @@ def main():
 def run():
     app = Application([("/", RootHandler)])
     port = random.randrange(options.min_port, options.max_port)
-    app.listen(port, address='127.0.0.1')
+    server = HTTPServer(app)
+    if options.threads is not None:
+        server.start_threads(port, address='127.0.0.1',
+                             num_threads=options.threads)
+    else:
+        server.listen(port, address='127.0.0.1')
     signal.signal(signal.SIGCHLD, handle_sigchld)
     args = ["ab"]
     args.extend(["-n", str(options.n)])
@@ -74,6 +84,7 @@ def run():
     args.append("http://127.0.0.1:%d/" % port)
     subprocess.Popen(args)
     IOLoop.instance().start()
+    server.stop()
     IOLoop.instance().close()
     del IOLoop._instance
     assert not IOLoop.initialized()
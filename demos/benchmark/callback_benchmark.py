@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# A microbenchmark of IOLoop.add_callback.
+#
+# "same thread" schedules callbacks from inside the IOLoop (the common
+# case, e.g. IOStream._run_callback); "other thread" schedules them from
+# a second thread while the IOLoop is running, which exercises the lock
+# and the waker.
+
+import threading
+import time
+
+from tornado.ioloop import IOLoop
+from tornado.options import define, options, parse_command_line
+
+define('num', default=200000, help='number of callbacks per run')
+define('batch', default=1000,
+       help='callbacks scheduled per loop iteration in the same-thread case')
+define('ioloop', type=str, default=None)
+
+
+def same_thread(io_loop):
+    remaining = [options.num]
+
+    def callback():
+        remaining[0] -= 1
+        if not remaining[0]:
+            io_loop.stop()
+
+    def schedule():
+        for i in range(min(options.batch, remaining[0])):
+            io_loop.add_callback(callback)
+        if remaining[0] > options.batch:
+            io_loop.add_callback(schedule)
+    io_loop.add_callback(schedule)
+    io_loop.start()
+
+
+def other_thread(io_loop):
+    remaining = [options.num]
+
+    def callback():
+        remaining[0] -= 1
+        if not remaining[0]:
+            io_loop.stop()
+
+    def produce():
+        for i in range(options.num):
+            io_loop.add_callback(callback)
+    thread = threading.Thread(target=produce)
+    io_loop.add_callback(thread.start)
+    io_loop.start()
+    thread.join()
+
+
+def main():
+    parse_command_line()
+    if options.ioloop:
+        IOLoop.configure(options.ioloop)
+    for name, func in [('same thread', same_thread),
+                       ('other thread', other_thread)]:
+        io_loop = IOLoop()
+        start = time.time()
+        func(io_loop)
+        elapsed = time.time() - start
+        io_loop.close()
+        print('%-12s %10.0f callbacks/sec' % (name, options.num / elapsed))
+
+if __name__ == '__main__':
+    main()
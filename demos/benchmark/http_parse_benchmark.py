@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#
+# A benchmark of HTTP request head parsing.
+#
+# "str" is the old HTTPConnection path (decode the whole head, split the
+# start line, then HTTPHeaders.parse); "python" and "speedups" are
+# tornado.httputil.parse_request_head with the pure-Python and C
+# (if built) implementations.
+
+from timeit import Timer
+
+from tornado import httputil
+from tornado.escape import native_str
+from tornado.options import define, options, parse_command_line
+
+try:
+    from tornado import speedups
+except ImportError:
+    speedups = None
+
+define('num', default=100000, help='number of requests to parse')
+
+HEAD = (b"GET /index.html?q=tornado HTTP/1.1\r\n"
+        b"Host: www.example.com\r\n"
+        b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:24.0) "
+        b"Gecko/20100101 Firefox/24.0\r\n"
+        b"Accept: text/html,application/xhtml+xml,application/xml;"
+        b"q=0.9,*/*;q=0.8\r\n"
+        b"Accept-Language: en-US,en;q=0.5\r\n"
+        b"Accept-Encoding: gzip, deflate\r\n"
+        b"Cookie: session=0123456789abcdef0123456789abcdef\r\n"
+        b"Connection: keep-alive\r\n"
+        b"\r\n")
+
+
+def parse_str(data):
+    data = native_str(data.decode('latin1'))
+    eol = data.find("\r\n")
+    method, uri, version = data[:eol].split(" ")
+    return method, uri, version, httputil.HTTPHeaders.parse(data[eol:])
+
+
+def parse_with(split):
+    def parse(data):
+        method, uri, version, pairs = split(data)
+        headers = httputil.HTTPHeaders()
+        headers._add_pairs(pairs)
+        return method, uri, version, headers
+    return parse
+
+
+def main():
+    parse_command_line()
+    parsers = [('str', parse_str),
+               ('python', parse_with(httputil._parse_request_head_python))]
+    if speedups is not None and hasattr(speedups, 'parse_request_head'):
+        parsers.append(('speedups', parse_with(speedups.parse_request_head)))
+    for name, parse in parsers:
+        elapsed = Timer(lambda: parse(HEAD)).timeit(options.num)
+        print('%-8s %8.0f requests/sec' % (name, options.num / elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#
+# A benchmark of IOStream's read buffer.
+#
+# "read_bytes" sends --num_bodies bodies of --body_size bytes over a
+# socket pair and reads each one with read_bytes ("read_into" does the
+# same into one reusable bytearray); "read_until" sends
+# --num_requests pipelined HTTP request headers and reads each one with
+# read_until; "write" sends the same headers with one write call each.
+# "slow header" dribbles a --header_size header in 512-byte pieces, one
+# per IOLoop iteration, as a slow client would.
+
+import socket
+import time
+
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream
+from tornado.options import define, options, parse_command_line
+
+define('body_size', default=1024 * 1024, help='size of each read_bytes body')
+define('num_bodies', default=200, help='number of read_bytes bodies')
+define('num_requests', default=50000, help='number of pipelined headers')
+define('header_size', default=256 * 1024, help='size of the slow header')
+define('ioloop', type=str, default=None)
+
+HEADERS = (b"GET /index.html HTTP/1.1\r\n"
+           b"Host: www.example.com\r\n"
+           b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:24.0) "
+           b"Gecko/20100101 Firefox/24.0\r\n"
+           b"Accept: text/html,application/xhtml+xml,application/xml;"
+           b"q=0.9,*/*;q=0.8\r\n"
+           b"Accept-Language: en-US,en;q=0.5\r\n"
+           b"Accept-Encoding: gzip, deflate\r\n"
+           b"Cookie: session=0123456789abcdef0123456789abcdef\r\n"
+           b"Connection: keep-alive\r\n"
+           b"\r\n")
+
+
+def make_pair(io_loop):
+    a, b = socket.socketpair()
+    return (IOStream(a, io_loop=io_loop, max_buffer_size=1 << 30),
+            IOStream(b, io_loop=io_loop))
+
+
+def run(io_loop, data, count, read):
+    reader, writer = make_pair(io_loop)
+    remaining = [count]
+
+    def on_read(chunk):
+        remaining[0] -= 1
+        if remaining[0]:
+            read(reader, on_read)
+        else:
+            io_loop.stop()
+
+    start = time.time()
+    writer.write(data)
+    read(reader, on_read)
+    io_loop.start()
+    elapsed = time.time() - start
+    reader.close()
+    writer.close()
+    return elapsed
+
+
+def main():
+    parse_command_line()
+    if options.ioloop:
+        IOLoop.configure(options.ioloop)
+    io_loop = IOLoop()
+
+    body = b"x" * options.body_size
+    elapsed = run(io_loop, body * options.num_bodies, options.num_bodies,
+                  lambda stream, cb: stream.read_bytes(options.body_size, cb))
+    print('read_bytes  %8.1f MB/sec' % (
+        options.body_size * options.num_bodies / elapsed / (1 << 20)))
+
+    buf = bytearray(options.body_size)
+    elapsed = run(io_loop, body * options.num_bodies, options.num_bodies,
+                  lambda stream, cb: stream.read_into(buf, cb))
+    print('read_into   %8.1f MB/sec' % (
+        options.body_size * options.num_bodies / elapsed / (1 << 20)))
+
+    elapsed = run(io_loop, HEADERS * options.num_requests,
+                  options.num_requests,
+                  lambda stream, cb: stream.read_until(b"\r\n\r\n", cb))
+    print('read_until  %8.0f headers/sec' % (options.num_requests / elapsed))
+
+    reader, writer = make_pair(io_loop)
+    start = time.time()
+    for i in range(options.num_requests):
+        writer.write(HEADERS)
+    reader.read_bytes(len(HEADERS) * options.num_requests,
+                      lambda data: io_loop.stop())
+    io_loop.start()
+    elapsed = time.time() - start
+    reader.close()
+    writer.close()
+    print('write       %8.0f writes/sec' % (options.num_requests / elapsed))
+
+    reader, writer = make_pair(io_loop)
+    header = b"X-Padding: " + b"x" * options.header_size + b"\r\n\r\n"
+    pieces = [header[i:i + 512] for i in range(0, len(header), 512)]
+
+    def send(i):
+        writer.write(pieces[i])
+        if i + 1 < len(pieces):
+            io_loop.add_callback(send, i + 1)
+    start = time.time()
+    reader.read_until(b"\r\n\r\n", lambda data: io_loop.stop())
+    io_loop.add_callback(send, 0)
+    io_loop.start()
+    elapsed = time.time() - start
+    reader.close()
+    writer.close()
+    print('slow header %8.1f ms' % (elapsed * 1000))
+    io_loop.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#
+# Measures the memory used by idle IOStreams.
+#
+# Opens --num_connections socket pairs, wraps one end of each in an
+# IOStream and leaves it waiting in read_until, as an idle keep-alive
+# or long-poll connection would, after one small request and response
+# have gone through it.  Prints the bytes allocated per connection,
+# not counting the sockets themselves.  Run it against two checkouts
+# to compare them.  Requires Python 3.4+ for tracemalloc.
+
+import gc
+import socket
+import sys
+import tracemalloc
+
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream
+from tornado.options import define, options, parse_command_line
+
+define('num_connections', default=1000,
+       help='number of connections (each uses two file descriptors)')
+define('ioloop', type=str, default=None)
+
+
+def main():
+    parse_command_line()
+    if options.ioloop:
+        IOLoop.configure(options.ioloop)
+    io_loop = IOLoop()
+    pairs = [socket.socketpair() for i in range(options.num_connections)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    streams = []
+    for server, client in pairs:
+        stream = IOStream(server, io_loop=io_loop)
+        stream.read_until(b"\r\n\r\n", lambda data: None)
+        stream.write(b"HTTP/1.1 204 No Content\r\n\r\n")
+        client.send(b"GET / HTTP/1.1\r\n\r\n")
+        streams.append(stream)
+    # Let the reads and writes finish, then wait for the next request.
+    io_loop.add_callback(io_loop.stop)
+    io_loop.start()
+    io_loop.add_timeout(io_loop.time() + 0.1, io_loop.stop)
+    io_loop.start()
+    for stream in streams:
+        stream.read_until(b"\r\n\r\n", lambda data: None)
+    io_loop.add_callback(io_loop.stop)
+    io_loop.start()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print('%s: %.0f bytes per idle connection' % (
+        sys.version.split()[0], (after - before) / len(streams)))
+
+    for stream in streams:
+        stream.close()
+    for server, client in pairs:
+        client.close()
+    io_loop.close(all_fds=True)
+
+if __name__ == '__main__':
+    main()
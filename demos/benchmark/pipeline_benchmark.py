@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# A benchmark of HTTP/1.1 request pipelining.
+#
+# A client on the same IOLoop keeps --depth requests in flight on each of
+# --connections connections and checks that the responses come back in
+# order.  The handler waits --delay seconds (without blocking the IOLoop)
+# before answering, as one that called a backend would.  Each run is
+# repeated with HTTPServer's max_pipelined_requests set to 0 (requests on
+# a connection are handled one at a time) and to --depth.
+
+import socket
+import time
+
+from tornado.escape import utf8
+from tornado.httpserver import HTTPServer
+from tornado.httputil import HTTPHeaders
+from tornado.ioloop import IOLoop
+from tornado.iostream import IOStream
+from tornado.options import define, options, parse_command_line
+from tornado.testing import bind_unused_port
+from tornado.web import Application, RequestHandler, asynchronous
+
+define('num', default=500, help='requests per connection')
+define('connections', default=4)
+define('depth', default=8, help='requests in flight per connection')
+define('delay', default=0.005, help='seconds each request waits')
+
+
+class DelayHandler(RequestHandler):
+    @asynchronous
+    def get(self, n):
+        if options.delay:
+            IOLoop.current().add_timeout(IOLoop.current().time() +
+                                         options.delay,
+                                         lambda: self.finish(n))
+        else:
+            self.finish(n)
+
+    def _log(self):
+        pass
+
+
+class PipeliningClient(object):
+    def __init__(self, io_loop, port, done):
+        self.io_loop = io_loop
+        self.done = done
+        self.sent = self.received = 0
+        self.stream = IOStream(socket.socket(), io_loop=io_loop)
+        self.stream.connect(('127.0.0.1', port), self.fill)
+        self.stream.read_until(b'\r\n\r\n', self.on_headers)
+
+    def fill(self):
+        requests = []
+        while (self.sent < options.num and
+               self.sent - self.received < options.depth):
+            requests.append(utf8('GET /%d HTTP/1.1\r\n\r\n' % self.sent))
+            self.sent += 1
+        if requests:
+            self.stream.write(b''.join(requests))
+
+    def on_headers(self, data):
+        headers = HTTPHeaders.parse(data[data.index(b'\r\n'):].decode('latin1'))
+        self.stream.read_bytes(int(headers['Content-Length']), self.on_body)
+
+    def on_body(self, body):
+        assert body == utf8(str(self.received)), (body, self.received)
+        self.received += 1
+        if self.received == options.num:
+            self.stream.close()
+            self.done()
+            return
+        self.fill()
+        self.stream.read_until(b'\r\n\r\n', self.on_headers)
+
+
+def run(max_pipelined_requests):
+    io_loop = IOLoop()
+    io_loop.make_current()
+    app = Application([('/(.*)', DelayHandler)])
+    server = HTTPServer(app, io_loop=io_loop,
+                        max_pipelined_requests=max_pipelined_requests)
+    sock, port = bind_unused_port()
+    server.add_sockets([sock])
+    remaining = [options.connections]
+
+    def done():
+        remaining[0] -= 1
+        if not remaining[0]:
+            io_loop.stop()
+    start = time.time()
+    for i in range(options.connections):
+        PipeliningClient(io_loop, port, done)
+    io_loop.start()
+    elapsed = time.time() - start
+    server.stop()
+    # Let the server see the clients' connections close.
+    io_loop.add_timeout(io_loop.time() + 0.1, io_loop.stop)
+    io_loop.start()
+    io_loop.close()
+    return options.num * options.connections / elapsed
+
+
+def main():
+    parse_command_line()
+    for max_pipelined_requests in (0, options.depth):
+        print('max_pipelined_requests=%-3d %8.0f requests/sec' % (
+            max_pipelined_requests, run(max_pipelined_requests)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# A benchmark of IOLoop.add_timeout and remove_timeout, comparing the
+# default heap with the timing wheel enabled by the timer_resolution
+# argument.
+#
+# Each run simulates a server with --num connections that each set a
+# timeout, cancel it, and set a new one (as HTTPConnection and friends do
+# for every request), then lets the loop expire whatever is left.
+
+import gc
+import time
+
+from tornado.ioloop import IOLoop
+from tornado.options import define, options, parse_command_line
+
+define('num', default=100000, help='number of simulated connections')
+define('rounds', default=5, help='add/cancel rounds per connection')
+define('resolution', default=0.01, help='timer wheel resolution')
+
+
+def noop():
+    pass
+
+
+def run(io_loop):
+    now = io_loop.time()
+    gc.collect()
+    start = time.time()
+    handles = [io_loop.add_timeout(now + 60 + i * 0.001, noop)
+               for i in range(options.num)]
+    for r in range(options.rounds):
+        for i in range(options.num):
+            io_loop.remove_timeout(handles[i])
+            handles[i] = io_loop.add_timeout(now + 60 + i * 0.001, noop)
+    add_remove = time.time() - start
+    # Cancelled timeouts stay in the heap until the next loop iteration
+    # compacts it; the wheel drops them immediately.
+    if io_loop._timer_wheel is not None:
+        pending = len(io_loop._timer_wheel)
+    else:
+        pending = len(io_loop._timeouts)
+
+    start = time.time()
+    for handle in handles:
+        io_loop.remove_timeout(handle)
+    cancel = time.time() - start
+    ops = options.num * (options.rounds * 2 + 1)
+    return add_remove, cancel, pending, ops
+
+
+def main():
+    parse_command_line()
+    for name, kwargs in [('heap', {}),
+                         ('wheel', dict(timer_resolution=options.resolution))]:
+        io_loop = IOLoop(**kwargs)
+        add_remove, cancel, pending, ops = run(io_loop)
+        io_loop.close()
+        print('%-6s %8.0f ops/sec, %d entries held for %d live timeouts, '
+              'final cancel %.3fs' % (name, ops / add_remove, pending,
+                                      options.num, cancel))
+
+if __name__ == '__main__':
+    main()
@@ -46,7 +46,8 @@ else:
 class custom_build_ext(build_ext):
     """Allow C extension building to fail.
 
-    The C extension speeds up websocket masking, but is not essential.
+    The C extension speeds up websocket masking and HTTP request parsing,
+    but is not essential.
     """
 
     warning_message = """
@@ -24,9 +24,13 @@ module.
 """
 from __future__ import absolute_import, division, print_function, with_statement
 
+import collections
 import functools
 import sys
+import threading
+import time
 
+from tornado.platform.auto import monotonic_time
 from tornado.stack_context import ExceptionStackContext, wrap
 from tornado.util import raise_exc_info, ArgReplacer
 
@@ -40,6 +44,11 @@ class ReturnValueIgnoredError(Exception):
     pass
 
 
+class ExecutorSaturatedError(Exception):
+    """Raised by `ThreadPool.submit` when the pool's queue is full."""
+    pass
+
+
 class _DummyFuture(object):
     def __init__(self):
         self._done = False
@@ -146,16 +155,181 @@ class DummyExecutor(object):
 dummy_executor = DummyExecutor()
 
 
+class ThreadPool(object):
+    """A bounded pool of named threads that delivers results to an `.IOLoop`.
+
+    `submit` has the same interface as
+    `concurrent.futures.Executor.submit`, but does not require the
+    ``futures`` package.  The returned `.Future` is resolved on the
+    ``io_loop``'s thread, so its callbacks run there too.
+
+    At most ``max_workers`` threads (default: five per core) are
+    started, on demand, and named ``name-0``, ``name-1``, etc.  If
+    ``max_queue_size`` is given, `submit` raises
+    `ExecutorSaturatedError` instead of queueing more than that many
+    calls that are waiting for a thread.
+
+    Each `.IOLoop` owns one of these as its default executor; see
+    `.IOLoop.run_in_executor`.
+
+    .. versionadded:: 3.2
+    """
+    clock = staticmethod(monotonic_time or time.time)
+
+    def __init__(self, io_loop, max_workers=None, max_queue_size=None,
+                 name="ThreadPool"):
+        if max_workers is None:
+            from tornado.process import cpu_count
+            max_workers = cpu_count() * 5
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.io_loop = io_loop
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        # Threads that are not running a call (including ones that
+        # have been started but haven't taken their first call yet).
+        self._idle = 0
+        self._shutdown = False
+        self._stats = dict(submitted=0, completed=0, failed=0, rejected=0,
+                           max_queue_depth=0,
+                           wait_time=0.0, max_wait_time=0.0,
+                           run_time=0.0, max_run_time=0.0)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules ``fn(*args, **kwargs)`` to run on a worker thread.
+
+        Returns a `.Future` for the result.
+        """
+        future = TracebackFuture()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot submit to a ThreadPool after "
+                                   "shutdown")
+            stats = self._stats
+            depth = len(self._queue)
+            if (self.max_queue_size is not None and
+                    depth - self._idle >= self.max_queue_size):
+                stats['rejected'] += 1
+                raise ExecutorSaturatedError(
+                    "%s queue is full (%d calls waiting)" % (self.name, depth))
+            self._queue.append((future, fn, args, kwargs, self.clock()))
+            stats['submitted'] += 1
+            stats['max_queue_depth'] = max(stats['max_queue_depth'], depth + 1)
+            if self._idle > depth:
+                self._condition.notify()
+            elif len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name="%s-%d" % (self.name, len(self._threads)))
+                thread.daemon = True
+                self._threads.append(thread)
+                self._idle += 1
+                thread.start()
+        return future
+
+    def shutdown(self, wait=True):
+        """Stops the worker threads once the queue is empty.
+
+        Calls that have already been submitted still run, but their
+        results are dropped if the `.IOLoop` has been closed.
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def get_stats(self):
+        """Returns a dict of statistics about this pool.
+
+        ``submitted``, ``completed``, ``failed`` (calls that raised an
+        exception), and ``rejected`` count calls to `submit`.
+        ``queue_depth`` is the number of calls waiting for a thread and
+        ``max_queue_depth`` its high-water mark.  ``wait_time`` is the
+        total time calls spent in the queue and ``run_time`` the total
+        time they spent running, with ``max_wait_time`` and
+        ``max_run_time`` the longest of each.  ``workers`` and
+        ``idle_workers`` count the threads started so far.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+            stats['workers'] = len(self._threads)
+            stats['idle_workers'] = self._idle
+        return stats
+
+    def _work(self):
+        clock = self.clock
+        condition = self._condition
+        stats = self._stats
+        while True:
+            with condition:
+                while not self._queue:
+                    if self._shutdown:
+                        self._idle -= 1
+                        return
+                    condition.wait()
+                self._idle -= 1
+                future, fn, args, kwargs, submitted = self._queue.popleft()
+            start = clock()
+            result = exc_info = None
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                exc_info = sys.exc_info()
+            end = clock()
+            with condition:
+                stats['completed'] += 1
+                if exc_info is not None:
+                    stats['failed'] += 1
+                stats['wait_time'] += start - submitted
+                stats['max_wait_time'] = max(stats['max_wait_time'],
+                                             start - submitted)
+                stats['run_time'] += end - start
+                stats['max_run_time'] = max(stats['max_run_time'],
+                                            end - start)
+                self._idle += 1
+            try:
+                self.io_loop.add_callback(self._set_result, future,
+                                          result, exc_info)
+            except RuntimeError:
+                # The IOLoop has been closed; nobody can be waiting.
+                pass
+            future = fn = args = kwargs = result = exc_info = None
+
+    def _set_result(self, future, result, exc_info):
+        if exc_info is not None:
+            future.set_exc_info(exc_info)
+        else:
+            future.set_result(result)
+
+
 def run_on_executor(fn):
     """Decorator to run a synchronous method asynchronously on an executor.
 
     The decorated method may be called with a ``callback`` keyword
     argument and returns a future.
+
+    The executor is taken from ``self.executor``.  If there is no such
+    attribute (or it is ``None``), the default executor of
+    ``self.io_loop`` is used (see `.IOLoop.run_in_executor`).
+
+    .. versionchanged:: 3.2
+       The ``executor`` attribute is now optional.
     """
     @functools.wraps(fn)
     def wrapper(self, *args, **kwargs):
         callback = kwargs.pop("callback", None)
-        future = self.executor.submit(fn, self, *args, **kwargs)
+        executor = getattr(self, "executor", None)
+        if executor is None:
+            executor = self.io_loop.get_default_executor()
+        future = executor.submit(fn, self, *args, **kwargs)
         if callback:
             self.io_loop.add_future(future,
                                     lambda future: callback(future.result()))
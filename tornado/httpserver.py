@@ -26,12 +26,15 @@ This module also defines the `HTTPRequest` class which is exposed via
 
 from __future__ import absolute_import, division, print_function, with_statement
 
+import collections
+import functools
 import socket
 import ssl
 import time
 import copy
 
-from tornado.escape import native_str, parse_qs_bytes
+from tornado.concurrent import TracebackFuture, chain_future
+from tornado.escape import native_str, parse_qs_bytes, utf8
 from tornado import httputil
 from tornado import iostream
 from tornado.log import gen_log
@@ -104,6 +107,64 @@ class HTTPServer(TCPServer):
            "keyfile": os.path.join(data_dir, "mydomain.key"),
        })
 
+    If the request callback has a ``start_request_stream`` method (as
+    `tornado.web.Application` does), it is called with the `HTTPRequest`
+    as soon as the headers of a request with a body have been read.
+    It may return ``None`` to have the body read into memory as usual
+    (the request callback is then called once it is complete), or an
+    object with ``data_received(chunk)`` and ``finish()`` methods, which
+    receives the body in pieces of at most
+    `HTTPConnection.body_chunk_size` bytes instead; the request callback
+    is not called.  If ``data_received`` returns a `.Future`, no more of
+    the body is read until it has resolved.  Streamed bodies are not
+    limited by ``max_buffer_size``.
+
+    Request bodies are normally read into memory, so their size is
+    limited by ``max_buffer_size``.  If ``multipart_spool_size`` is set,
+    ``multipart/form-data`` bodies are instead parsed as they arrive
+    with `.MultipartFormDataParser`, and uploaded files larger than
+    that many bytes are spooled to temporary files (see `.HTTPFile`);
+    ``HTTPRequest.body`` is then empty.  Such bodies are not limited by
+    ``max_buffer_size``.  ``max_body_size``, if given, rejects requests
+    whose ``Content-Length`` is larger, whichever way the body is read.
+
+    HTTP/1.1 clients may pipeline requests, sending several before the
+    first response arrives.  By default each request is only read once
+    the response to the previous one has been written.  With
+    ``max_pipelined_requests`` set, up to that many ``GET`` and
+    ``HEAD`` requests behind the current one are read and passed to the
+    request callback while it is still running, so they can be
+    processed concurrently; their output is buffered until the
+    responses before them are finished, so responses are still sent in
+    the order the requests arrived.  A pipelined request with a body
+    (or any other request that is not safe to run early) is held until
+    its turn comes, and the server stops reading ahead behind it.  The
+    buffered output counts towards ``write_high_water_mark`` (see
+    `.RequestHandler.flush`), and once a request has buffered more than
+    that, no more requests are started until its turn comes.
+
+    Connections can be limited in time and use:
+
+    * ``idle_connection_timeout``: seconds a connection may wait for
+      a request to begin, whether it is new or has already been used
+    * ``header_timeout``: seconds allowed to receive the rest of a
+      request's headers once it has begun.  Idle connections are
+      checked this often, so it may take up to twice this long to
+      time out.
+    * ``body_timeout``: seconds allowed to receive a request's body
+    * ``max_requests_per_connection``: the connection is closed after
+      the response to this many requests
+
+    A connection that times out is closed.  Each connection uses at
+    most one `.IOLoop` timeout, which is only moved when its deadline
+    comes nearer; on a busy server, consider giving the `.IOLoop` a
+    ``timer_resolution`` or ``timer_slack`` so these are cheaper still.
+    ``max_connections`` (see `.TCPServer`) limits the number of
+    connections open at once.  ``write_high_water_mark`` and
+    ``write_low_water_mark`` are passed to each connection's
+    `.IOStream`; they set when the `.Future` returned by
+    `.RequestHandler.flush` waits and when it resolves.
+
     `HTTPServer` initialization follows one of three patterns (the
     initialization methods are defined on `tornado.tcpserver.TCPServer`):
 
@@ -143,19 +204,44 @@ class HTTPServer(TCPServer):
        servers if you want to create your listening sockets in some
        way other than `tornado.netutil.bind_sockets`.
 
+    .. versionchanged:: 3.2
+       Added support for streaming request bodies via
+       ``start_request_stream``, and the ``multipart_spool_size``,
+       ``max_body_size``, ``max_pipelined_requests``,
+       ``idle_connection_timeout``, ``header_timeout``, ``body_timeout``,
+       and ``max_requests_per_connection`` arguments.
     """
     def __init__(self, request_callback, no_keep_alive=False, io_loop=None,
-                 xheaders=False, ssl_options=None, protocol=None, **kwargs):
+                 xheaders=False, ssl_options=None, protocol=None,
+                 multipart_spool_size=None, max_body_size=None,
+                 max_pipelined_requests=0, idle_connection_timeout=None,
+                 header_timeout=None, body_timeout=None,
+                 max_requests_per_connection=None, **kwargs):
         self.request_callback = request_callback
         self.no_keep_alive = no_keep_alive
         self.xheaders = xheaders
         self.protocol = protocol
+        self.multipart_spool_size = multipart_spool_size
+        self.max_body_size = max_body_size
+        self.max_pipelined_requests = max_pipelined_requests
+        self.idle_connection_timeout = idle_connection_timeout
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.max_requests_per_connection = max_requests_per_connection
         TCPServer.__init__(self, io_loop=io_loop, ssl_options=ssl_options,
                            **kwargs)
 
     def handle_stream(self, stream, address):
         HTTPConnection(stream, address, self.request_callback,
-                       self.no_keep_alive, self.xheaders, self.protocol)
+                       self.no_keep_alive, self.xheaders, self.protocol,
+                       multipart_spool_size=self.multipart_spool_size,
+                       max_body_size=self.max_body_size,
+                       max_pipelined_requests=self.max_pipelined_requests,
+                       idle_connection_timeout=self.idle_connection_timeout,
+                       header_timeout=self.header_timeout,
+                       body_timeout=self.body_timeout,
+                       max_requests_per_connection=(
+                           self.max_requests_per_connection))
 
 
 class _BadRequestException(Exception):
@@ -169,8 +255,15 @@ class HTTPConnection(object):
     We parse HTTP headers and bodies, and execute the request callback
     until the HTTP conection is closed.
     """
+    #: The largest piece of a streamed request body passed to
+    #: ``data_received`` at once.
+    body_chunk_size = 64 * 1024
+
     def __init__(self, stream, address, request_callback, no_keep_alive=False,
-                 xheaders=False, protocol=None):
+                 xheaders=False, protocol=None, multipart_spool_size=None,
+                 max_body_size=None, max_pipelined_requests=0,
+                 idle_connection_timeout=None, header_timeout=None,
+                 body_timeout=None, max_requests_per_connection=None):
         self.stream = stream
         self.address = address
         # Save the socket's address family now so we know how to
@@ -181,12 +274,36 @@ class HTTPConnection(object):
         self.no_keep_alive = no_keep_alive
         self.xheaders = xheaders
         self.protocol = protocol
+        self.multipart_spool_size = multipart_spool_size
+        self.max_body_size = max_body_size
+        self.max_pipelined_requests = max_pipelined_requests
+        # Requests read ahead of the current one, in order, as
+        # _PipelinedRequestConnections.
+        self._pipeline = collections.deque()
+        self._reading_ahead = False
+        self.idle_connection_timeout = idle_connection_timeout
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.max_requests_per_connection = max_requests_per_connection
+        self._request_count = 0
+        # The connection is closed when _deadline passes (unless
+        # _timeout_phase is "idle"; see _check_idle).  _timeout is the
+        # IOLoop timeout that checks it, set for _timeout_at; it is
+        # only moved when the deadline comes earlier.
+        self._timeout_phase = None
+        self._deadline = None
+        self._idle_deadline = None
+        self._timeout = None
+        self._timeout_at = None
         self._clear_request_state()
         # Save stack context here, outside of any request.  This keeps
         # contexts from one request from leaking into the next.
         self._header_callback = stack_context.wrap(self._on_headers)
+        self._pipelined_header_callback = stack_context.wrap(
+            self._on_pipelined_headers)
         self.stream.set_close_callback(self._on_connection_close)
         self.stream.read_until(b"\r\n\r\n", self._header_callback)
+        self._wait_for_request()
 
     def _clear_request_state(self):
         """Clears the per-request state.
@@ -198,6 +315,8 @@ class HTTPConnection(object):
         """
         self._request = None
         self._request_finished = False
+        self._body_stream = None
+        self._body_remaining = 0
         self._write_callback = None
         self._close_callback = None
 
@@ -216,8 +335,12 @@ class HTTPConnection(object):
             callback = self._close_callback
             self._close_callback = None
             callback()
+        while self._pipeline:
+            self._pipeline.popleft()._on_connection_close()
         # Delete any unfinished callbacks to break up reference cycles.
         self._header_callback = None
+        self._pipelined_header_callback = None
+        self._cancel_timeout()
         self._clear_request_state()
 
     def close(self):
@@ -225,14 +348,113 @@ class HTTPConnection(object):
         # Remove this reference to self, which would otherwise cause a
         # cycle and delay garbage collection of this connection.
         self._header_callback = None
+        self._pipelined_header_callback = None
+        self._cancel_timeout()
         self._clear_request_state()
 
+    def _set_deadline(self, phase, timeout):
+        """Closes the connection if ``phase`` lasts ``timeout`` seconds.
+
+        ``timeout`` may be None to clear the deadline.
+        """
+        self._timeout_phase = phase
+        if timeout is None:
+            # Leave any IOLoop timeout in place; it will find no deadline.
+            self._deadline = None
+            return
+        self._deadline = deadline = self.stream.io_loop.time() + timeout
+        if self._timeout is not None:
+            if self._timeout_at <= deadline:
+                # _on_timeout will move it along when it runs.
+                return
+            self.stream.io_loop.remove_timeout(self._timeout)
+        self._schedule_timeout(deadline)
+
+    def _schedule_timeout(self, deadline):
+        self._timeout_at = deadline
+        # The timeout belongs to the connection, not the current request.
+        with stack_context.NullContext():
+            self._timeout = self.stream.io_loop.add_timeout(
+                deadline, self._on_timeout)
+
+    def _cancel_timeout(self):
+        self._deadline = None
+        if self._timeout is not None:
+            self.stream.io_loop.remove_timeout(self._timeout)
+            self._timeout = None
+
+    def _on_timeout(self):
+        self._timeout = None
+        if self._deadline is None or self.stream.closed():
+            return
+        now = self.stream.io_loop.time()
+        if self._timeout_phase == "idle":
+            self._check_idle(now)
+        elif now < self._deadline:
+            self._schedule_timeout(self._deadline)
+        else:
+            gen_log.info("Timeout reading request %s from %r",
+                         self._timeout_phase, self.address)
+            self.close()
+
+    def _wait_for_request(self):
+        """Starts the idle and header timeouts for the next request."""
+        if self.idle_connection_timeout is None:
+            if self.header_timeout is None:
+                self._set_deadline(None, None)
+                return
+            self._idle_deadline = None
+        else:
+            self._idle_deadline = (self.stream.io_loop.time() +
+                                   self.idle_connection_timeout)
+        self._check_idle(self.stream.io_loop.time())
+
+    def _check_idle(self, now):
+        if self.stream.get_read_buffer_size():
+            # The next request has begun to arrive.
+            self._set_deadline("headers", self.header_timeout)
+            return
+        if self._idle_deadline is not None and now >= self._idle_deadline:
+            self.close()
+            return
+        # There is no cheap way to be told when the first byte arrives,
+        # so look again after header_timeout.
+        timeout = self.header_timeout
+        if self._idle_deadline is not None:
+            remaining = self._idle_deadline - now
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+        self._set_deadline("idle", timeout)
+
+    def wait_for_drain(self):
+        """Returns a `.Future` for write-side flow control.
+
+        See `.BaseIOStream.wait_for_drain`; `.RequestHandler.flush`
+        returns this.
+
+        .. versionadded:: 3.2
+        """
+        return self.stream.wait_for_drain()
+
     def write(self, chunk, callback=None):
         """Writes a chunk of output to the stream."""
         if not self.stream.closed():
             self._write_callback = stack_context.wrap(callback)
             self.stream.write(chunk, self._on_write_complete)
 
+    def write_file(self, fileobj, offset=0, count=None, callback=None):
+        """Writes part of a file to the stream.
+
+        See `.BaseIOStream.write_file`; ``fileobj`` is closed once it
+        has been written.
+        """
+        if self.stream.closed():
+            fileobj.close()
+            return
+        self._write_callback = stack_context.wrap(callback)
+        self.stream.write_file(fileobj, offset, count,
+                               self._on_write_complete)
+
     def finish(self):
         """Finishes the request."""
         self._request_finished = True
@@ -271,15 +493,33 @@ class HTTPConnection(object):
                 disconnect = connection_header != "keep-alive"
             else:
                 disconnect = True
+        if self._body_remaining:
+            # The request was finished before its streamed body was
+            # read, so the rest of the body is still on the wire.
+            disconnect = True
+        if (self.max_requests_per_connection is not None and
+                self._request_count >= self.max_requests_per_connection and
+                not self._pipeline):
+            disconnect = True
         self._clear_request_state()
         if disconnect:
             self.close()
             return
+        if self._pipeline:
+            self._start_pipelined_request(self._pipeline.popleft())
+            return
+        if self._reading_ahead:
+            # The next request's headers are already being read;
+            # _on_pipelined_headers will start it.
+            self.stream.set_nodelay(False)
+            self._wait_for_request()
+            return
         try:
             # Use a try/except instead of checking stream.closed()
             # directly, because in some cases the stream doesn't discover
             # that it's closed until you try to read from it.
             self.stream.read_until(b"\r\n\r\n", self._header_callback)
+            self._wait_for_request()
 
             # Turn Nagle's algorithm back on, leaving the stream in its
             # default state for the next request.
@@ -287,52 +527,238 @@ class HTTPConnection(object):
         except iostream.StreamClosedError:
             self.close()
 
+    def _parse_request(self, data, connection):
+        try:
+            method, uri, version, headers = httputil.parse_request_head(data)
+        except ValueError as e:
+            raise _BadRequestException(str(e))
+
+        # HTTPRequest wants an IP, not a full socket address
+        if self.address_family in (socket.AF_INET, socket.AF_INET6):
+            remote_ip = self.address[0]
+        else:
+            # Unix (or other) socket; fake the remote address
+            remote_ip = '0.0.0.0'
+
+        return HTTPRequest(
+            connection=connection, method=method, uri=uri, version=version,
+            headers=headers, remote_ip=remote_ip, protocol=self.protocol)
+
     def _on_headers(self, data):
+        self._request_count += 1
+        self._set_deadline(None, None)
         try:
-            data = native_str(data.decode('latin1'))
-            eol = data.find("\r\n")
-            start_line = data[:eol]
-            try:
-                method, uri, version = start_line.split(" ")
-            except ValueError:
-                raise _BadRequestException("Malformed HTTP request line")
-            if not version.startswith("HTTP/"):
-                raise _BadRequestException("Malformed HTTP version in HTTP Request-Line")
-            try:
-                headers = httputil.HTTPHeaders.parse(data[eol:])
-            except ValueError:
-                # Probably from split() if there was no ':' in the line
-                raise _BadRequestException("Malformed HTTP headers")
-
-            # HTTPRequest wants an IP, not a full socket address
-            if self.address_family in (socket.AF_INET, socket.AF_INET6):
-                remote_ip = self.address[0]
+            self._request = self._parse_request(data, self)
+            self._start_request()
+        except _BadRequestException as e:
+            gen_log.info("Malformed HTTP request from %r: %s",
+                         self.address, e)
+            self.close()
+
+    def _start_request(self):
+        """Reads the body of ``self._request`` (if any) and runs the
+        request callback."""
+        request = self._request
+        headers = request.headers
+        content_length = headers.get("Content-Length")
+        if content_length:
+            content_length = int(content_length)
+            if (self.max_body_size is not None and
+                    content_length > self.max_body_size):
+                raise _BadRequestException("Content-Length too long")
+            start_stream = getattr(self.request_callback,
+                                   "start_request_stream", None)
+            if start_stream is not None:
+                self._body_remaining = content_length
+                body_stream = start_stream(request)
+                if body_stream is None:
+                    self._body_remaining = 0
+                elif self._request is not request or self._request_finished:
+                    # The request was answered (e.g. with an error)
+                    # without reading the body.
+                    return
+                self._body_stream = body_stream
+            if (self._body_stream is None and
+                    self.multipart_spool_size is not None):
+                self._body_stream = self._start_multipart_spooling()
+                if self._body_stream is not None:
+                    self._body_remaining = content_length
+            if (self._body_stream is None and
+                    content_length > self.stream.max_buffer_size):
+                raise _BadRequestException("Content-Length too long")
+            if headers.get("Expect") == "100-continue":
+                self.stream.write(b"HTTP/1.1 100 (Continue)\r\n\r\n")
+            self._set_deadline("body", self.body_timeout)
+            if self._body_stream is not None:
+                self._read_body_chunk()
             else:
-                # Unix (or other) socket; fake the remote address
-                remote_ip = '0.0.0.0'
-
-            self._request = HTTPRequest(
-                connection=self, method=method, uri=uri, version=version,
-                headers=headers, remote_ip=remote_ip, protocol=self.protocol)
-
-            content_length = headers.get("Content-Length")
-            if content_length:
-                content_length = int(content_length)
-                if content_length > self.stream.max_buffer_size:
-                    raise _BadRequestException("Content-Length too long")
-                if headers.get("Expect") == "100-continue":
-                    self.stream.write(b"HTTP/1.1 100 (Continue)\r\n\r\n")
-                self.stream.read_bytes(content_length, self._on_request_body)
+                self.stream.read_bytes(content_length,
+                                       self._on_request_body)
+            return
+
+        self.request_callback(request)
+        self._read_ahead()
+
+    @staticmethod
+    def _can_pipeline(request):
+        """Returns True if ``request`` may run before the requests ahead
+        of it have finished, and the next request may be read after it.
+        """
+        headers = request.headers
+        return (request.supports_http_1_1() and
+                request.method in ("GET", "HEAD") and
+                "Content-Length" not in headers and
+                "Transfer-Encoding" not in headers and
+                "Upgrade" not in headers and
+                headers.get("Connection", "").lower() != "close")
+
+    def _read_ahead(self):
+        """Starts reading the next pipelined request, if there is room
+        for it and the requests before it allow it."""
+        if (self._request is None or self._reading_ahead or
+                self.no_keep_alive or
+                len(self._pipeline) >= self.max_pipelined_requests):
+            return
+        if (self.max_requests_per_connection is not None and
+                self._request_count >= self.max_requests_per_connection):
+            return
+        if self._pipeline:
+            if (not self._pipeline[-1].dispatched or
+                    self._pipeline_over_high_water_mark()):
                 return
+        elif not self._can_pipeline(self._request):
+            return
+        if self.stream.reading():
+            return
+        self._reading_ahead = True
+        try:
+            self.stream.read_until(b"\r\n\r\n",
+                                   self._pipelined_header_callback)
+        except iostream.StreamClosedError:
+            self._reading_ahead = False
 
-            self.request_callback(self._request)
+    def _on_pipelined_headers(self, data):
+        self._reading_ahead = False
+        if self._request is None:
+            # Every request before this one has already finished.
+            self._on_headers(data)
+            return
+        self._request_count += 1
+        connection = _PipelinedRequestConnection(self)
+        self._pipeline.append(connection)
+        try:
+            connection.request = self._parse_request(data, connection)
         except _BadRequestException as e:
+            # Answer the requests before this one, then give up.
+            connection.error = e
+            return
+        if (self._can_pipeline(connection.request) and
+                not self._pipeline_over_high_water_mark()):
+            connection.dispatched = True
+            self.request_callback(connection.request)
+            self._read_ahead()
+
+    def _pipeline_over_high_water_mark(self):
+        """Returns True if a request that was read ahead has buffered
+        more output than ``write_high_water_mark``.
+
+        Requests after it are then left until it starts, so that
+        pipelining doesn't hold an unlimited amount of output in memory.
+        """
+        limit = self.stream.write_high_water_mark
+        if limit is None:
+            return False
+        for connection in self._pipeline:
+            if connection._buffered_size > limit:
+                return True
+        return False
+
+    def _start_pipelined_request(self, connection):
+        """Makes a request that was read ahead of the current one, sending
+        any output it has buffered."""
+        if connection.error is not None:
             gen_log.info("Malformed HTTP request from %r: %s",
-                         self.address, e)
+                         self.address, connection.error)
             self.close()
             return
+        self.stream.set_nodelay(False)
+        self._request = connection.request
+        self._close_callback = connection._close_callback
+        writes = connection._activate()
+        if not connection.dispatched:
+            try:
+                self._start_request()
+            except _BadRequestException as e:
+                gen_log.info("Malformed HTTP request from %r: %s",
+                             self.address, e)
+                self.close()
+            return
+        callbacks = [callback for chunk, file_args, callback in writes
+                     if callback is not None]
+        for i, (chunk, file_args, callback) in enumerate(writes):
+            if i < len(writes) - 1 or not callbacks:
+                callback = None
+            else:
+                callback = functools.partial(_run_callbacks, callbacks)
+            if file_args is not None:
+                self.write_file(*file_args, callback=callback)
+            else:
+                self.write(chunk, callback=callback)
+        connection._release_drain_futures()
+        if connection.finished:
+            self.finish()
+        else:
+            self._read_ahead()
+
+    def _read_body_chunk(self):
+        try:
+            self.stream.read_bytes(
+                min(self._body_remaining, self.body_chunk_size),
+                self._on_body_chunk)
+        except iostream.StreamClosedError:
+            self.close()
+
+    def _on_body_chunk(self, data):
+        self._body_remaining -= len(data)
+        result = self._body_stream.data_received(data)
+        if result is not None and not result.done():
+            # Apply backpressure: don't read any more of the body
+            # until the consumer is ready for it.
+            self.stream.io_loop.add_future(
+                result, lambda future: self._continue_body_stream())
+        else:
+            self._continue_body_stream()
+
+    def _continue_body_stream(self):
+        if self._body_stream is None or self._request_finished:
+            # The connection was closed or the request was answered
+            # before the whole body was read.
+            return
+        if self._body_remaining:
+            self._read_body_chunk()
+        else:
+            self._set_deadline(None, None)
+            body_stream = self._body_stream
+            self._body_stream = None
+            body_stream.finish()
+
+    def _start_multipart_spooling(self):
+        request = self._request
+        content_type = request.headers.get("Content-Type", "")
+        if (request.method not in ("POST", "PATCH", "PUT") or
+                not content_type.startswith("multipart/form-data")):
+            return None
+        for field in content_type.split(";"):
+            k, sep, v = field.strip().partition("=")
+            if k == "boundary" and v:
+                parser = httputil.MultipartFormDataParser(
+                    utf8(v), request.body_arguments, request.files,
+                    spool_size=self.multipart_spool_size)
+                return _MultipartBodyStream(self, parser)
+        return None
 
     def _on_request_body(self, data):
+        self._set_deadline(None, None)
         self._request.body = data
         if self._request.method in ("POST", "PATCH", "PUT"):
             httputil.parse_body_arguments(
@@ -344,6 +770,132 @@ class HTTPConnection(object):
         self.request_callback(self._request)
 
 
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        callback()
+
+
+class _PipelinedRequestConnection(object):
+    """Stands in for the `HTTPConnection` of a pipelined request that
+    was read ahead of the one currently being answered.
+
+    Output is buffered here until the requests before it have finished;
+    after that everything is passed through to the `HTTPConnection`,
+    whose other attributes (such as ``stream``) are available here too.
+    `wait_for_drain` treats the buffered output as if it were in the
+    stream's write buffer.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.request = None
+        self.error = None
+        self.dispatched = False
+        self.finished = False
+        self._active = False
+        self._writes = []
+        # Bytes in _writes, not counting files.
+        self._buffered_size = 0
+        self._drain_futures = []
+        self._close_callback = None
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def _activate(self):
+        self._active = True
+        writes = self._writes
+        self._writes = None
+        self._close_callback = None
+        return writes
+
+    def _release_drain_futures(self):
+        """Hands the `wait_for_drain` futures on to the stream, once the
+        buffered output has been written to it."""
+        futures, self._drain_futures = self._drain_futures, None
+        for future in futures:
+            chain_future(self.connection.wait_for_drain(), future)
+
+    def _on_connection_close(self):
+        for chunk, file_args, callback in self._writes or ():
+            if file_args is not None:
+                file_args[0].close()
+        self._writes = None
+        futures, self._drain_futures = self._drain_futures, None
+        for future in futures or ():
+            future.set_exception(
+                iostream.StreamClosedError("Stream is closed"))
+        if self._close_callback is not None:
+            callback = self._close_callback
+            self._close_callback = None
+            callback()
+
+    def set_close_callback(self, callback):
+        if self._active:
+            self.connection.set_close_callback(callback)
+        else:
+            self._close_callback = stack_context.wrap(callback)
+
+    def wait_for_drain(self):
+        if self._active:
+            return self.connection.wait_for_drain()
+        future = TracebackFuture()
+        if self._writes is None:
+            future.set_exception(
+                iostream.StreamClosedError("Stream is closed"))
+            return future
+        stream = self.connection.stream
+        limit = stream.write_high_water_mark
+        if limit is None:
+            limit = stream.write_low_water_mark
+        if self._buffered_size <= limit:
+            future.set_result(None)
+        else:
+            self._drain_futures.append(future)
+        return future
+
+    def write(self, chunk, callback=None):
+        if self._active:
+            self.connection.write(chunk, callback=callback)
+        elif self._writes is not None:
+            self._writes.append(
+                (chunk, None, stack_context.wrap(callback)))
+            self._buffered_size += len(chunk)
+
+    def write_file(self, fileobj, offset=0, count=None, callback=None):
+        if self._active:
+            self.connection.write_file(fileobj, offset, count,
+                                       callback=callback)
+        elif self._writes is not None:
+            self._writes.append((None, (fileobj, offset, count),
+                                 stack_context.wrap(callback)))
+        else:
+            fileobj.close()
+
+    def finish(self):
+        if self._active:
+            self.connection.finish()
+        else:
+            self.finished = True
+
+
+class _MultipartBodyStream(object):
+    """Feeds a request body to a `.MultipartFormDataParser` as it is read,
+    then runs the request callback."""
+    def __init__(self, connection, parser):
+        self.connection = connection
+        self.parser = parser
+
+    def data_received(self, chunk):
+        self.parser.feed(chunk)
+
+    def finish(self):
+        self.parser.close()
+        request = self.connection._request
+        for k, v in request.body_arguments.items():
+            request.arguments.setdefault(k, []).extend(v)
+        self.connection.request_callback(request)
+
+
 class HTTPRequest(object):
     """A single HTTP request.
 
@@ -500,6 +1052,17 @@ class HTTPRequest(object):
         assert isinstance(chunk, bytes_type)
         self.connection.write(chunk, callback=callback)
 
+    def write_file(self, fileobj, offset=0, count=None, callback=None):
+        """Writes ``count`` bytes of ``fileobj`` from ``offset`` to the
+        response stream.
+
+        ``fileobj`` is closed once it has been written.
+
+        .. versionadded:: 3.2
+        """
+        self.connection.write_file(fileobj, offset, count,
+                                   callback=callback)
+
     def finish(self):
         """Finishes this HTTP request on the open connection."""
         self.connection.finish()
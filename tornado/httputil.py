@@ -23,6 +23,8 @@ import collections
 import datetime
 import email.utils
 import numbers
+import os
+import tempfile
 import time
 
 from tornado.escape import native_str, parse_qs_bytes, utf8
@@ -43,6 +45,11 @@ try:
 except ImportError:
     from urllib.parse import urlencode  # py3
 
+try:
+    from io import BytesIO  # python 3
+except ImportError:
+    from cStringIO import StringIO as BytesIO  # python 2
+
 
 class _NormalizedHeaderCache(dict):
     """Dynamic cached mapping of header names to Http-Header-Case.
@@ -74,6 +81,20 @@ class _NormalizedHeaderCache(dict):
 
 _normalized_headers = _NormalizedHeaderCache(1000)
 
+# Headers seen in most requests.  These are stored outside the cache's
+# eviction queue, so looking them up never falls back to __missing__.
+_COMMON_HEADERS = (
+    "Accept", "Accept-Charset", "Accept-Encoding", "Accept-Language",
+    "Authorization", "Cache-Control", "Connection", "Content-Length",
+    "Content-Type", "Cookie", "Expect", "Host", "If-Modified-Since",
+    "If-None-Match", "Origin", "Pragma", "Range", "Referer",
+    "Transfer-Encoding", "Upgrade", "User-Agent", "X-Forwarded-For",
+    "X-Forwarded-Proto", "X-Real-Ip", "X-Requested-With", "X-Scheme")
+for _name in _COMMON_HEADERS:
+    dict.__setitem__(_normalized_headers, _name, _name)
+    dict.__setitem__(_normalized_headers, _name.lower(), _name)
+del _name
+
 
 class HTTPHeaders(dict):
     """A dictionary that maintains ``Http-Header-Case`` for all keys.
@@ -180,6 +201,26 @@ class HTTPHeaders(dict):
                 h.parse_line(line)
         return h
 
+    def _add_pairs(self, pairs):
+        """Adds a list of ``(name, value)`` pairs, as returned by the
+        request head parser.
+
+        Equivalent to calling `add` for each pair, but faster.
+        """
+        as_list = self._as_list
+        normalized = _normalized_headers
+        setitem = dict.__setitem__
+        norm_name = None
+        for name, value in pairs:
+            norm_name = normalized[name]
+            if norm_name in as_list:
+                self.add(norm_name, value)
+            else:
+                setitem(self, norm_name, value)
+                as_list[norm_name] = [value]
+        if norm_name is not None:
+            self._last_key = norm_name
+
     # dict implementation overrides
 
     def __setitem__(self, name, value):
@@ -212,6 +253,86 @@ class HTTPHeaders(dict):
         return HTTPHeaders(self)
 
 
+def parse_request_head(data):
+    """Parses the start line and headers of an HTTP request.
+
+    ``data`` is the byte string up to and including the blank line
+    that ends the headers.  Returns a tuple ``(method, uri, version,
+    headers)``, where ``headers`` is an `HTTPHeaders`.  Raises
+    `ValueError` if the request is malformed.
+
+    Uses the C implementation in ``tornado.speedups`` if it has been
+    built.
+
+    >>> method, uri, version, headers = parse_request_head(
+    ...     b"GET /index.html HTTP/1.1\\r\\nHost: example.com\\r\\n"
+    ...     b"Accept: */*\\r\\n\\r\\n")
+    >>> method, uri, version
+    ('GET', '/index.html', 'HTTP/1.1')
+    >>> sorted(headers.items())
+    [('Accept', '*/*'), ('Host', 'example.com')]
+
+    .. versionadded:: 3.2
+    """
+    method, uri, version, pairs = _parse_request_head(data)
+    headers = HTTPHeaders()
+    headers._add_pairs(pairs)
+    return method, uri, version, headers
+
+
+def _parse_request_head_python(data):
+    """Splits an HTTP request head without building `HTTPHeaders`.
+
+    Returns ``(method, uri, version, pairs)`` as native strings, where
+    ``pairs`` is a list of ``(name, value)`` tuples with continuation
+    lines already joined to the header they continue.  Header names
+    are not normalized.  ``tornado.speedups.parse_request_head`` must
+    behave exactly the same.
+
+    In pure Python, decoding the whole head once and splitting the
+    text is faster than decoding each field separately.
+    """
+    data = native_str(data.decode('latin1'))
+    eol = data.find("\r\n")
+    if eol == -1:
+        eol = len(data)
+    start_line = data[:eol].split(" ")
+    if len(start_line) != 3:
+        raise ValueError("Malformed HTTP request line")
+    method, uri, version = start_line
+    if not version.startswith("HTTP/"):
+        raise ValueError("Malformed HTTP version in HTTP Request-Line")
+    pairs = []
+    for line in data[eol:].splitlines():
+        if not line:
+            continue
+        if line[0] in _HEADER_WHITESPACE:
+            # continuation of a multi-line header
+            if not pairs:
+                raise ValueError("Malformed HTTP headers")
+            name, value = pairs[-1]
+            pairs[-1] = (name, value + " " + line.lstrip(_HEADER_WHITESPACE))
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError("Malformed HTTP headers")
+        pairs.append((name, value.strip(_HEADER_WHITESPACE)))
+    return method, uri, version, pairs
+
+# What bytes.strip() would remove; str.strip() would also remove
+# non-ASCII whitespace such as a latin1 non-breaking space.
+_HEADER_WHITESPACE = " \t\n\r\x0b\x0c"
+
+if os.environ.get('TORNADO_NO_EXTENSION'):
+    # See the comment in tornado.websocket.
+    _parse_request_head = _parse_request_head_python
+else:
+    try:
+        from tornado.speedups import parse_request_head as _parse_request_head
+    except ImportError:
+        _parse_request_head = _parse_request_head_python
+
+
 def url_concat(url, args):
     """Concatenate url and argument dictionary regardless of whether
     url has existing query parameters.
@@ -235,8 +356,46 @@ class HTTPFile(ObjectDict):
     * ``filename``
     * ``body``
     * ``content_type``
+
+    An `HTTPFile` is also a read-only file-like object over its contents
+    (with `read`, `seek`, `tell` and `close` methods).  Large uploads
+    that `MultipartFormDataParser` spooled to disk have an additional
+    ``file`` attribute, an anonymous temporary file holding the
+    contents, which is deleted when it is closed or garbage collected.
+    Accessing ``body`` on such an upload reads the whole file into
+    memory, so prefer the file-like methods for them.
+
+    .. versionchanged:: 3.2
+       Added the file-like methods and the ``file`` attribute.
     """
-    pass
+    def __missing__(self, key):
+        if key == "body" and "file" in self:
+            f = self["file"]
+            pos = f.tell()
+            f.seek(0)
+            try:
+                return f.read()
+            finally:
+                f.seek(pos)
+        raise KeyError(key)
+
+    def _file(self):
+        if "file" not in self:
+            self["file"] = BytesIO(self["body"])
+        return self["file"]
+
+    def read(self, size=-1):
+        return self._file().read(size)
+
+    def seek(self, offset, whence=0):
+        return self._file().seek(offset, whence)
+
+    def tell(self):
+        return self._file().tell()
+
+    def close(self):
+        if "file" in self:
+            self["file"].close()
 
 
 def _parse_request_range(range_header):
@@ -345,44 +504,259 @@ def parse_multipart_form_data(boundary, data, arguments, files):
     The ``boundary`` and ``data`` parameters are both byte strings.
     The dictionaries given in the arguments and files parameters
     will be updated with the contents of the body.
+
+    See `MultipartFormDataParser` to parse a body incrementally.
     """
-    # The standard allows for the boundary to be quoted in the header,
-    # although it's rare (it happens at least for google app engine
-    # xmpp).  I think we're also supposed to handle backslash-escapes
-    # here but I'll save that until we see a client that uses them
-    # in the wild.
-    if boundary.startswith(b'"') and boundary.endswith(b'"'):
-        boundary = boundary[1:-1]
-    final_boundary_index = data.rfind(b"--" + boundary + b"--")
-    if final_boundary_index == -1:
-        gen_log.warning("Invalid multipart/form-data: no final boundary")
-        return
-    parts = data[:final_boundary_index].split(b"--" + boundary + b"\r\n")
-    for part in parts:
-        if not part:
-            continue
-        eoh = part.find(b"\r\n\r\n")
-        if eoh == -1:
+    parser = MultipartFormDataParser(boundary, arguments, files)
+    parser.feed(data)
+    parser.close()
+
+
+class MultipartFormDataParser(object):
+    """Incremental ``multipart/form-data`` parser.
+
+    Feed the body to it in pieces of any size with `feed`, then call
+    `close`; the ``arguments`` and ``files`` dictionaries are then
+    updated as by `parse_multipart_form_data` (if the body was invalid
+    a warning is logged and they are left unchanged).  ``boundary`` is
+    the boundary parameter of the ``Content-Type`` header, as a byte
+    string.
+
+    File uploads larger than ``spool_size`` bytes are written to
+    temporary files instead of being kept in memory (see `HTTPFile`),
+    so the memory used does not depend on the size of the uploads.
+    With the default of None, nothing is spooled.  Other form fields
+    are always kept in memory.
+
+    This can be used from a `~tornado.web.stream_request_body` handler::
+
+        def prepare(self):
+            self.parser = MultipartFormDataParser(
+                boundary, self.request.body_arguments, self.request.files,
+                spool_size=1024 * 1024)
+
+        def data_received(self, chunk):
+            self.parser.feed(chunk)
+
+        def post(self):
+            self.parser.close()
+
+    .. versionadded:: 3.2
+    """
+    _PREAMBLE, _HEADERS, _BODY, _DONE, _ERROR = range(5)
+
+    #: Parts whose headers are longer than this are rejected.
+    max_header_size = 65536
+
+    def __init__(self, boundary, arguments, files, spool_size=None):
+        # The standard allows for the boundary to be quoted in the header,
+        # although it's rare (it happens at least for google app engine
+        # xmpp).  I think we're also supposed to handle backslash-escapes
+        # here but I'll save that until we see a client that uses them
+        # in the wild.
+        if boundary.startswith(b'"') and boundary.endswith(b'"'):
+            boundary = boundary[1:-1]
+        self.arguments = arguments
+        self.files = files
+        self.spool_size = spool_size
+        # The CRLF before each boundary belongs to the boundary, not
+        # to the part before it.
+        self._delimiter = b"\r\n--" + boundary
+        # Unparsed data is self._buffer[self._pos:].
+        self._buffer = b""
+        self._pos = 0
+        self._state = self._PREAMBLE
+        self._part_name = None
+        self._part_file = None
+        self._part_chunks = None
+        # Parsed fields, which are only added to arguments and files
+        # once the final boundary has been seen.
+        self._arguments = []
+        self._files = []
+
+    def feed(self, data):
+        """Parses the next piece of the body."""
+        if self._state >= self._DONE:
+            return
+        if self._pos < len(self._buffer):
+            self._buffer = self._buffer[self._pos:] + data
+        else:
+            # Parse the new data in place; when the whole body is fed
+            # at once it is never copied.
+            self._buffer = data
+        self._pos = 0
+        while self._state < self._DONE:
+            if self._state == self._PREAMBLE:
+                if not self._parse_preamble():
+                    break
+            elif self._state == self._HEADERS:
+                if not self._parse_headers():
+                    break
+            elif not self._parse_body():
+                break
+
+    def close(self):
+        """Finishes parsing and updates ``arguments`` and ``files``."""
+        self._buffer = None
+        if self._state != self._DONE:
+            if self._state != self._ERROR:
+                gen_log.warning(
+                    "Invalid multipart/form-data: no final boundary")
+                self._state = self._ERROR
+            if self._part_file is not None:
+                self._part_file.close()
+            for name, f in self._files:
+                f.close()
+            return
+        for name, value in self._arguments:
+            self.arguments.setdefault(name, []).append(value)
+        for name, f in self._files:
+            self.files.setdefault(name, []).append(f)
+
+    def _parse_preamble(self):
+        # The body normally starts with a boundary, but for
+        # compatibility with older versions it may also start directly
+        # with the headers of the first part.  This also runs after
+        # each delimiter, skipping any boundary lines that follow it
+        # as empty parts.
+        buf, pos = self._buffer, self._pos
+        boundary = self._delimiter[2:]
+        end = pos + len(boundary)
+        if len(buf) < end + 2:
+            head = buf[pos:]
+            if ((boundary + b"\r\n").startswith(head) or
+                    (boundary + b"--").startswith(head)):
+                return False
+        elif buf.startswith(boundary, pos):
+            suffix = buf[end:end + 2]
+            if suffix == b"--":
+                self._state = self._DONE
+                return True
+            if suffix == b"\r\n":
+                self._pos = end + 2
+                return True
+        self._state = self._HEADERS
+        return True
+
+    def _parse_headers(self):
+        buf, pos = self._buffer, self._pos
+        # The headers end at a blank line before the next delimiter
+        # (the two may share a CRLF, leaving the part empty).
+        next_delimiter = buf.find(self._delimiter, pos)
+        if next_delimiter == -1:
+            eoh = buf.find(b"\r\n\r\n", pos)
+        else:
+            eoh = buf.find(b"\r\n\r\n", pos, next_delimiter + 2)
+        if eoh == -1 and next_delimiter != -1:
             gen_log.warning("multipart/form-data missing headers")
-            continue
-        headers = HTTPHeaders.parse(part[:eoh].decode("utf-8"))
-        disp_header = headers.get("Content-Disposition", "")
-        disposition, disp_params = _parse_header(disp_header)
-        if disposition != "form-data" or not part.endswith(b"\r\n"):
+            # Skip to the delimiter.
+            self._pos -= 2
+            self._start_part(None)
+            return True
+        if eoh == -1:
+            if len(buf) - pos > self.max_header_size:
+                gen_log.warning("multipart/form-data headers too long")
+                self._state = self._ERROR
+            return False
+        if next_delimiter == eoh + 2:
+            # No data; _start_part must leave the delimiter's CRLF.
+            self._pos = eoh
+        else:
+            self._pos = eoh + 2
+        try:
+            headers = HTTPHeaders.parse(buf[pos:eoh].decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            gen_log.warning("multipart/form-data invalid headers")
+            self._start_part(None)
+            return True
+        disposition, disp_params = _parse_header(
+            headers.get("Content-Disposition", ""))
+        if disposition != "form-data":
             gen_log.warning("Invalid multipart/form-data")
-            continue
-        value = part[eoh + 4:-2]
-        if not disp_params.get("name"):
+            self._start_part(None)
+        elif not disp_params.get("name"):
             gen_log.warning("multipart/form-data value missing name")
-            continue
-        name = disp_params["name"]
-        if disp_params.get("filename"):
-            ctype = headers.get("Content-Type", "application/unknown")
-            files.setdefault(name, []).append(HTTPFile(
-                filename=disp_params["filename"], body=value,
-                content_type=ctype))
+            self._start_part(None)
+        elif disp_params.get("filename"):
+            self._start_part(disp_params["name"], HTTPFile(
+                filename=disp_params["filename"],
+                content_type=headers.get("Content-Type",
+                                         "application/unknown")))
+        else:
+            self._start_part(disp_params["name"])
+        return True
+
+    def _start_part(self, name, upload=None):
+        # A part with no name is skipped.  The data starts with the
+        # CRLF that ends the part's headers.
+        self._pos += 2
+        self._part_name = name
+        self._part_file = upload
+        self._part_chunks = []
+        self._part_size = 0
+        self._state = self._BODY
+
+    def _parse_body(self):
+        buf, pos = self._buffer, self._pos
+        delimiter = self._delimiter
+        start = pos
+        while True:
+            found = buf.find(delimiter, start)
+            if found == -1:
+                # Keep enough to recognize a delimiter that is split
+                # between this piece and the next.
+                self._pos = max(pos, len(buf) - len(delimiter) - 1)
+                self._part_data(pos, self._pos)
+                return False
+            end = found + len(delimiter)
+            if len(buf) < end + 2:
+                self._part_data(pos, found)
+                self._pos = found
+                return False
+            suffix = buf[end:end + 2]
+            if suffix == b"\r\n" or suffix == b"--":
+                break
+            # Not a boundary, just data that starts like one.
+            start = found + 1
+        self._part_data(pos, found)
+        self._end_part()
+        if suffix == b"--":
+            self._state = self._DONE
+        else:
+            self._state = self._PREAMBLE
+            self._pos = end + 2
+        return True
+
+    def _part_data(self, start, end):
+        if self._part_name is None or start == end:
+            return
+        if self._part_chunks is None:
+            self._part_file["file"].write(self._buffer[start:end])
+            return
+        self._part_chunks.append(self._buffer[start:end])
+        self._part_size += end - start
+        if (self._part_file is not None and self.spool_size is not None and
+                self._part_size > self.spool_size):
+            f = tempfile.TemporaryFile()
+            for chunk in self._part_chunks:
+                f.write(chunk)
+            self._part_file["file"] = f
+            self._part_chunks = None
+
+    def _end_part(self):
+        name, upload = self._part_name, self._part_file
+        self._part_name = self._part_file = None
+        if name is None:
+            return
+        if upload is None:
+            self._arguments.append((name, b"".join(self._part_chunks)))
+        elif self._part_chunks is None:
+            upload["file"].seek(0)
+            self._files.append((name, upload))
         else:
-            arguments.setdefault(name, []).append(value)
+            upload["body"] = b"".join(self._part_chunks)
+            self._files.append((name, upload))
+        self._part_chunks = None
 
 
 def format_timestamp(ts):
@@ -28,11 +28,15 @@ In addition to I/O events, the `IOLoop` can also schedule time-based events.
 
 from __future__ import absolute_import, division, print_function, with_statement
 
+import bisect
+import collections
 import datetime
 import errno
 import functools
 import heapq
+import itertools
 import logging
+import math
 import numbers
 import os
 import select
@@ -40,8 +44,9 @@ import sys
 import threading
 import time
 import traceback
+import types
 
-from tornado.concurrent import Future, TracebackFuture
+from tornado.concurrent import Future, TracebackFuture, ThreadPool
 from tornado.log import app_log, gen_log
 from tornado import stack_context
 from tornado.util import Configurable
@@ -56,7 +61,7 @@ try:
 except ImportError:
     import _thread as thread  # py3
 
-from tornado.platform.auto import set_close_exec, Waker
+from tornado.platform.auto import set_close_exec, Waker, monotonic_time
 
 
 _POLL_TIMEOUT = 3600.0
@@ -120,12 +125,20 @@ class IOLoop(Configurable):
     READ = _EPOLLIN
     WRITE = _EPOLLOUT
     ERROR = _EPOLLERR | _EPOLLHUP
+    EDGE = _EPOLLET
+
+    # True if this IOLoop accepts the EDGE flag in add_handler.
+    edge_triggered = False
 
     # Global lock for creating global IOLoop instance
     _instance_lock = threading.Lock()
 
     _current = threading.local()
 
+    # Set by enable_callback_timing; see _run_callback.
+    _callback_timings = None
+    _executor = None
+
     @staticmethod
     def instance():
         """Returns a global `IOLoop` instance.
@@ -250,11 +263,29 @@ class IOLoop(Configurable):
         ``IOLoop.READ``, ``IOLoop.WRITE``, and ``IOLoop.ERROR``.
 
         When an event occurs, ``handler(fd, events)`` will be run.
+
+        If the `IOLoop`'s ``edge_triggered`` attribute is true, ``events``
+        may also include ``IOLoop.EDGE``.  The handler is then only run
+        when the fd *becomes* readable or writable, so it must read or
+        write until the operation would block before it can expect to
+        be run again.
+
+        .. versionchanged:: 3.2
+           Added ``IOLoop.EDGE``.
         """
         raise NotImplementedError()
 
     def update_handler(self, fd, events):
-        """Changes the events we listen for fd."""
+        """Changes the events we listen for fd.
+
+        The change may not be passed on to the underlying poller until
+        the `IOLoop` next waits for events, so that several updates in
+        the same iteration cost at most one system call.
+
+        .. versionchanged:: 3.2
+           ``PollIOLoop`` now applies updates lazily and skips updates
+           that do not change the event mask.
+        """
         raise NotImplementedError()
 
     def remove_handler(self, fd):
@@ -293,6 +324,85 @@ class IOLoop(Configurable):
                         self._blocking_signal_threshold,
                         ''.join(traceback.format_stack(frame)))
 
+    def enable_stats(self, callback=None):
+        """Starts collecting statistics about each iteration of the loop.
+
+        While enabled, `get_stats` returns running totals.  If
+        ``callback`` is given, it is run at the end of every loop
+        iteration with a dict describing that iteration:
+
+        * ``callbacks``, ``timeouts``: number of callbacks and timeouts run
+        * ``ready_fds``: number of file descriptors returned by the poll
+        * ``poll_time``: seconds spent waiting in the poll
+        * ``callback_time``, ``timeout_time``, ``handler_time``: seconds
+          spent running callbacks, timeouts, and fd handlers
+        * ``pending_timeouts``: number of timeouts still scheduled
+        * ``lag``: how late the most overdue timeout of this iteration ran
+
+        Statistics add a little overhead to every iteration, so they are
+        off by default.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
+    def disable_stats(self):
+        """Stops collecting statistics and discards those collected so far.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
+    def get_stats(self):
+        """Returns a dict of statistics collected since `enable_stats`.
+
+        The dict has the same keys as the one passed to the
+        `enable_stats` callback, summed over all iterations, plus
+        ``iterations`` and ``max_lag``.  ``pending_timeouts`` is the
+        current number of scheduled timeouts.  Returns None if
+        statistics are not enabled.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
+    def enable_callback_timing(self, log_threshold=None):
+        """Starts measuring how long each callback takes to run.
+
+        Unlike `set_blocking_signal_threshold`, this does not use signals,
+        so it works on any thread and is cheap enough to leave enabled in
+        production.  Every callback, timeout, and fd handler run by the
+        loop is timed, and the results are collected in a latency
+        histogram per callback (identified by the qualified name of the
+        underlying function; see `get_callback_timings`).
+
+        If ``log_threshold`` is given, a warning is logged for each
+        callback that runs for at least that many seconds.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
+    def disable_callback_timing(self):
+        """Stops timing callbacks and discards the collected timings.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
+    def get_callback_timings(self, limit=None):
+        """Returns the timings collected since `enable_callback_timing`.
+
+        The result is a list of dicts, worst offenders (by slowest single
+        run) first, with at most ``limit`` entries.  Each dict has the keys
+        ``name``, ``count``, ``total_time``, ``max_time``, and
+        ``histogram``, a list of ``(upper_bound, count)`` pairs whose last
+        bound is infinite.  Returns None if timing is not enabled.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
     def start(self):
         """Starts the I/O loop.
 
@@ -387,7 +497,7 @@ class IOLoop(Configurable):
         """
         return time.time()
 
-    def add_timeout(self, deadline, callback):
+    def add_timeout(self, deadline, callback, slack=None):
         """Runs the ``callback`` at the time ``deadline`` from the I/O loop.
 
         Returns an opaque handle that may be passed to
@@ -398,9 +508,19 @@ class IOLoop(Configurable):
         `datetime.timedelta` object for a deadline relative to the
         current time.
 
+        ``slack`` is the number of seconds the callback may be delayed
+        past ``deadline`` so that it can run in the same wakeup as other
+        timeouts, instead of waking the `IOLoop` on its own.  If it is
+        ``None``, the `IOLoop`'s default (the ``timer_slack`` argument of
+        ``PollIOLoop``, normally zero) is used.  This is only a hint,
+        which some `IOLoop` implementations ignore.
+
         Note that it is not safe to call `add_timeout` from other threads.
         Instead, you must use `add_callback` to transfer control to the
         `IOLoop`'s thread, and then call `add_timeout` from there.
+
+        .. versionchanged:: 3.2
+           Added the ``slack`` argument.
         """
         raise NotImplementedError()
 
@@ -452,15 +572,64 @@ class IOLoop(Configurable):
         future.add_done_callback(
             lambda future: self.add_callback(callback, future))
 
+    def run_in_executor(self, executor, func, *args):
+        """Runs ``func(*args)`` on ``executor`` and returns a `.Future`.
+
+        ``executor`` may be any object with a ``submit`` method like
+        `concurrent.futures.Executor`.  If it is ``None``, this
+        `IOLoop`'s default executor is used (see
+        `get_default_executor`).  Use `functools.partial` to pass
+        keyword arguments.
+
+        .. versionadded:: 3.2
+        """
+        if executor is None:
+            executor = self.get_default_executor()
+        return executor.submit(func, *args)
+
+    def get_default_executor(self):
+        """Returns the default executor used by `run_in_executor` (and
+        by `.run_on_executor` when the object has no ``executor``).
+
+        Unless `set_default_executor` has been called, this is a
+        `.ThreadPool` named ``IOLoop-executor``, created on first use,
+        with five threads per core and no limit on its queue.
+
+        .. versionadded:: 3.2
+        """
+        if self._executor is None:
+            self._executor = ThreadPool(self, name="IOLoop-executor")
+        return self._executor
+
+    def set_default_executor(self, executor):
+        """Sets the default executor for `run_in_executor`.
+
+        This is typically a `.ThreadPool` with settings tuned for the
+        application, e.g. to reject work once too much of it is queued::
+
+            io_loop.set_default_executor(ThreadPool(
+                io_loop, max_workers=20, max_queue_size=100))
+
+        The default executor is shut down when the `IOLoop` is closed.
+
+        .. versionadded:: 3.2
+        """
+        self._executor = executor
+
     def _run_callback(self, callback):
         """Runs a callback with error handling.
 
         For use in subclasses.
         """
+        timings = self._callback_timings
+        if timings is not None:
+            start = timings.clock()
         try:
             callback()
         except Exception:
             self.handle_callback_exception(callback)
+        if timings is not None:
+            timings.record(callback, timings.clock() - start)
 
     def handle_callback_exception(self, callback):
         """This method is called whenever a callback run by the `IOLoop`
@@ -481,8 +650,30 @@ class PollIOLoop(IOLoop):
     For concrete implementations, see `tornado.platform.epoll.EPollIOLoop`
     (Linux), `tornado.platform.kqueue.KQueueIOLoop` (BSD and Mac), or
     `tornado.platform.select.SelectIOLoop` (all platforms).
+
+    By default timeouts are kept in a heap.  If ``timer_resolution`` is
+    given (in seconds), they are kept in a hierarchical timing wheel
+    instead, which makes `add_timeout` and `remove_timeout` constant-time
+    operations and frees cancelled timeouts immediately.  Timeouts
+    stored in the wheel may run up to ``timer_resolution`` seconds
+    late.  This is a good trade-off for servers with many connections
+    that each set (and usually cancel) one or more timeouts::
+
+        IOLoop.configure(None, timer_resolution=0.01)
+
+    ``timer_slack`` (in seconds) is the default ``slack`` for
+    `add_timeout`.  Deadlines are rounded up to a multiple of the slack,
+    so all the timeouts that fall in the same window run in a single
+    wakeup.  Servers with many mostly-idle connections can use this to
+    wake up less often::
+
+        IOLoop.configure(None, timer_slack=0.05)
+
+    .. versionadded:: 3.2
+       The ``timer_resolution`` and ``timer_slack`` arguments.
     """
-    def initialize(self, impl, time_func=None):
+    def initialize(self, impl, time_func=None, timer_resolution=None,
+                   timer_slack=None):
         super(PollIOLoop, self).initialize()
         self._impl = impl
         if hasattr(self._impl, 'fileno'):
@@ -490,15 +681,28 @@ class PollIOLoop(IOLoop):
         self.time_func = time_func or time.time
         self._handlers = {}
         self._events = {}
-        self._callbacks = []
+        # The event mask each fd is registered with in self._impl, and
+        # changes to those masks that will be applied (in one call per
+        # fd) just before the next poll.
+        self._masks = {}
+        self._pending_masks = {}
+        self._callbacks = collections.deque()
         self._callback_lock = threading.Lock()
         self._timeouts = []
         self._cancellations = 0
+        if timer_resolution is not None:
+            self._timer_wheel = _TimingWheel(timer_resolution, self.time())
+        else:
+            self._timer_wheel = None
+        if timer_slack is not None and timer_slack < 0:
+            raise ValueError("timer_slack must not be negative")
+        self._timer_slack = timer_slack
         self._running = False
         self._stopped = False
         self._closing = False
         self._thread_ident = None
         self._blocking_signal_threshold = None
+        self._stats = None
 
         # Create a pipe that we send bogus data to when we want to wake
         # the I/O loop when it is idle
@@ -523,22 +727,46 @@ class PollIOLoop(IOLoop):
                     gen_log.debug("error closing fd %s", fd, exc_info=True)
         self._waker.close()
         self._impl.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
 
     def add_handler(self, fd, handler, events):
         self._handlers[fd] = stack_context.wrap(handler)
         self._impl.register(fd, events | self.ERROR)
+        self._masks[fd] = events | self.ERROR
 
     def update_handler(self, fd, events):
-        self._impl.modify(fd, events | self.ERROR)
+        events |= self.ERROR
+        mask = self._masks.get(fd)
+        if mask is None:
+            # Not registered; let the poller raise the appropriate error.
+            self._impl.modify(fd, events)
+        elif mask == events:
+            self._pending_masks.pop(fd, None)
+        else:
+            self._pending_masks[fd] = events
 
     def remove_handler(self, fd):
         self._handlers.pop(fd, None)
         self._events.pop(fd, None)
+        self._masks.pop(fd, None)
+        self._pending_masks.pop(fd, None)
         try:
             self._impl.unregister(fd)
         except Exception:
             gen_log.debug("Error deleting fd from IOLoop", exc_info=True)
 
+    def _apply_pending_masks(self):
+        pending, self._pending_masks = self._pending_masks, {}
+        for fd, events in pending.items():
+            try:
+                self._impl.modify(fd, events)
+            except Exception:
+                gen_log.warning("Error updating fd %s in IOLoop", fd,
+                                exc_info=True)
+            else:
+                self._masks[fd] = events
+
     def set_blocking_signal_threshold(self, seconds, action):
         if not hasattr(signal, "setitimer"):
             gen_log.error("set_blocking_signal_threshold requires a signal module "
@@ -549,6 +777,40 @@ class PollIOLoop(IOLoop):
             signal.signal(signal.SIGALRM,
                           action if action is not None else signal.SIG_DFL)
 
+    def enable_stats(self, callback=None):
+        self._stats = _LoopStats(callback)
+
+    def disable_stats(self):
+        self._stats = None
+
+    def get_stats(self):
+        if self._stats is None:
+            return None
+        totals = dict(self._stats.totals)
+        totals['pending_timeouts'] = self._pending_timeouts()
+        return totals
+
+    def enable_callback_timing(self, log_threshold=None):
+        self._callback_timings = _CallbackTimings(log_threshold)
+
+    def disable_callback_timing(self):
+        self._callback_timings = None
+
+    def get_callback_timings(self, limit=None):
+        if self._callback_timings is None:
+            return None
+        return self._callback_timings.report(limit)
+
+    def _end_stats_iteration(self, stats):
+        iteration = stats.end(self._pending_timeouts())
+        if stats.callback is not None:
+            self._run_callback(functools.partial(stats.callback, iteration))
+
+    def _pending_timeouts(self):
+        if self._timer_wheel is not None:
+            return len(self._timer_wheel)
+        return len(self._timeouts) - self._cancellations
+
     def start(self):
         if not logging.getLogger().handlers:
             # The IOLoop catches and logs exceptions, so it's
@@ -583,12 +845,17 @@ class PollIOLoop(IOLoop):
         # SIGCHILD processing in response to its own wakeup fd being
         # written to.  As long as the wakeup fd is registered on the IOLoop,
         # the loop will still wake up and everything should work.
+        #
+        # Wakers that don't support this (write_fileno() is None) are
+        # woken by add_callback_from_signal instead.
         old_wakeup_fd = None
-        if hasattr(signal, 'set_wakeup_fd') and os.name == 'posix':
+        wakeup_fd = self._waker.write_fileno()
+        if (hasattr(signal, 'set_wakeup_fd') and os.name == 'posix' and
+                wakeup_fd is not None):
             # requires python 2.6+, unix.  set_wakeup_fd exists but crashes
             # the python process on windows.
             try:
-                old_wakeup_fd = signal.set_wakeup_fd(self._waker.write_fileno())
+                old_wakeup_fd = signal.set_wakeup_fd(wakeup_fd)
                 if old_wakeup_fd != -1:
                     # Already set, restore previous value.  This is a little racy,
                     # but there's no clean get_wakeup_fd and in real use the
@@ -600,19 +867,46 @@ class PollIOLoop(IOLoop):
 
         while True:
             poll_timeout = _POLL_TIMEOUT
+            stats = self._stats
+            if stats is not None:
+                stats.begin()
 
             # Prevent IO event starvation by delaying new callbacks
-            # to the next iteration of the event loop.
-            with self._callback_lock:
-                callbacks = self._callbacks
-                self._callbacks = []
-            for callback in callbacks:
-                self._run_callback(callback)
-            # Closures may be holding on to a lot of memory, so allow
-            # them to be freed before we go into our poll wait.
-            callbacks = callback = None
-
-            if self._timeouts:
+            # to the next iteration of the event loop.  The queue is
+            # swapped under the lock so that other threads can tell
+            # when they need to wake us up (see add_callback).
+            ncallbacks = 0
+            if self._callbacks:
+                with self._callback_lock:
+                    callbacks = self._callbacks
+                    self._callbacks = collections.deque()
+                ncallbacks = len(callbacks)
+                # Closures may be holding on to a lot of memory, so
+                # pop them as we go to allow them to be freed before we
+                # go into our poll wait.
+                while callbacks:
+                    self._run_callback(callbacks.popleft())
+                callbacks = None
+            if stats is not None:
+                stats.iteration['callbacks'] = ncallbacks
+                stats.lap('callback_time')
+
+            if self._timer_wheel is not None:
+                if self._timer_wheel:
+                    now = self.time()
+                    for timeout in self._timer_wheel.expire(now):
+                        # An earlier callback in this batch may have
+                        # cancelled this one.
+                        if timeout.callback is not None:
+                            if stats is not None:
+                                stats.ran_timeout(now - timeout.deadline)
+                            self._run_callback(timeout.callback)
+                    timeout = None
+                    deadline = self._timer_wheel.next_deadline()
+                    if deadline is not None:
+                        poll_timeout = min(max(deadline - now, 0.0),
+                                           poll_timeout)
+            elif self._timeouts:
                 now = self.time()
                 while self._timeouts:
                     if self._timeouts[0].callback is None:
@@ -621,6 +915,8 @@ class PollIOLoop(IOLoop):
                         self._cancellations -= 1
                     elif self._timeouts[0].deadline <= now:
                         timeout = heapq.heappop(self._timeouts)
+                        if stats is not None:
+                            stats.ran_timeout(now - timeout.deadline)
                         self._run_callback(timeout.callback)
                         del timeout
                     else:
@@ -635,6 +931,8 @@ class PollIOLoop(IOLoop):
                     self._timeouts = [x for x in self._timeouts
                                       if x.callback is not None]
                     heapq.heapify(self._timeouts)
+            if stats is not None:
+                stats.lap('timeout_time')
 
             if self._callbacks:
                 # If any callbacks or timeouts called add_callback,
@@ -642,6 +940,8 @@ class PollIOLoop(IOLoop):
                 poll_timeout = 0.0
 
             if not self._running:
+                if stats is not None:
+                    self._end_stats_iteration(stats)
                 break
 
             if self._blocking_signal_threshold is not None:
@@ -649,6 +949,9 @@ class PollIOLoop(IOLoop):
                 # events.
                 signal.setitimer(signal.ITIMER_REAL, 0, 0)
 
+            if self._pending_masks:
+                self._apply_pending_masks()
+
             try:
                 event_pairs = self._impl.poll(poll_timeout)
             except Exception as e:
@@ -667,14 +970,21 @@ class PollIOLoop(IOLoop):
             if self._blocking_signal_threshold is not None:
                 signal.setitimer(signal.ITIMER_REAL,
                                  self._blocking_signal_threshold, 0)
+            if stats is not None:
+                stats.iteration['ready_fds'] = len(event_pairs)
+                stats.lap('poll_time')
 
             # Pop one fd at a time from the set of pending fds and run
             # its handler. Since that handler may perform actions on
             # other file descriptors, there may be reentrant calls to
             # this IOLoop that update self._events
             self._events.update(event_pairs)
+            timings = self._callback_timings
             while self._events:
                 fd, events = self._events.popitem()
+                if timings is not None:
+                    handler = self._handlers.get(fd)
+                    handler_start = timings.clock()
                 try:
                     self._handlers[fd](fd, events)
                 except (OSError, IOError) as e:
@@ -685,6 +995,13 @@ class PollIOLoop(IOLoop):
                         self.handle_callback_exception(self._handlers.get(fd))
                 except Exception:
                     self.handle_callback_exception(self._handlers.get(fd))
+                if timings is not None:
+                    timings.record(handler, timings.clock() - handler_start)
+                    handler = None
+            timings = None
+            if stats is not None:
+                stats.lap('handler_time')
+                self._end_stats_iteration(stats)
         # reset the stopped flag so another start/stop pair can be issued
         self._stopped = False
         if self._blocking_signal_threshold is not None:
@@ -701,12 +1018,27 @@ class PollIOLoop(IOLoop):
     def time(self):
         return self.time_func()
 
-    def add_timeout(self, deadline, callback):
+    def add_timeout(self, deadline, callback, slack=None):
+        if slack is None:
+            slack = self._timer_slack
+        if self._timer_wheel is not None:
+            timeout = _WheelTimeout(deadline, stack_context.wrap(callback),
+                                    self)
+            if slack:
+                timeout.add_slack(slack)
+            self._timer_wheel.add(timeout)
+            return timeout
         timeout = _Timeout(deadline, stack_context.wrap(callback), self)
+        if slack:
+            timeout.add_slack(slack)
         heapq.heappush(self._timeouts, timeout)
         return timeout
 
     def remove_timeout(self, timeout):
+        if self._timer_wheel is not None:
+            self._timer_wheel.remove(timeout)
+            timeout.callback = None
+            return
         # Removing from a heap is complicated, so just leave the defunct
         # timeout object in the queue (see discussion in
         # http://docs.python.org/library/heapq.html).
@@ -716,45 +1048,197 @@ class PollIOLoop(IOLoop):
         self._cancellations += 1
 
     def add_callback(self, callback, *args, **kwargs):
+        if thread.get_ident() == self._thread_ident:
+            # If we're in the IOLoop's thread, we know it's not currently
+            # polling, so there is no one to wake up and no need for the
+            # lock: deque.append is atomic, and the queue is only swapped
+            # out by this same thread.
+            if self._closing:
+                raise RuntimeError("IOLoop is closing")
+            self._callbacks.append(functools.partial(
+                stack_context.wrap(callback), *args, **kwargs))
+            return
         with self._callback_lock:
             if self._closing:
                 raise RuntimeError("IOLoop is closing")
             list_empty = not self._callbacks
             self._callbacks.append(functools.partial(
                 stack_context.wrap(callback), *args, **kwargs))
-            if list_empty and thread.get_ident() != self._thread_ident:
-                # If we're in the IOLoop's thread, we know it's not currently
-                # polling.  If we're not, and we added the first callback to an
-                # empty list, we may need to wake it up (it may wake up on its
-                # own, but an occasional extra wake is harmless).  Waking
-                # up a polling IOLoop is relatively expensive, so we try to
+            if list_empty:
+                # If we added the first callback to an empty queue, we may
+                # need to wake the IOLoop up (it may wake up on its own,
+                # but an occasional extra wake is harmless).  Waking up a
+                # polling IOLoop is relatively expensive, so we try to
                 # avoid it when we can.
                 self._waker.wake()
 
     def add_callback_from_signal(self, callback, *args, **kwargs):
         with stack_context.NullContext():
-            if thread.get_ident() != self._thread_ident:
-                # if the signal is handled on another thread, we can add
-                # it normally (modulo the NullContext)
-                self.add_callback(callback, *args, **kwargs)
-            else:
-                # If we're on the IOLoop's thread, we cannot use
-                # the regular add_callback because it may deadlock on
-                # _callback_lock.  Blindly insert into self._callbacks.
-                # This is safe because the GIL makes list.append atomic.
-                # One subtlety is that if the signal interrupted the
-                # _callback_lock block in IOLoop.start, we may modify
-                # either the old or new version of self._callbacks,
-                # but either way will work.
-                self._callbacks.append(functools.partial(
-                    stack_context.wrap(callback), *args, **kwargs))
+            # On the IOLoop's thread, add_callback does not take
+            # _callback_lock, so it is safe even if the signal interrupted
+            # the _callback_lock block in IOLoop.start.  In that case we
+            # may modify either the old or new version of
+            # self._callbacks, but either way will work.
+            self.add_callback(callback, *args, **kwargs)
+        if self._waker.write_fileno() is None:
+            # There is no wakeup fd, so make sure a poll that was
+            # restarted after the signal doesn't sleep through this.
+            self._waker.wake()
+
+
+class _LoopStats(object):
+    """Statistics collected by `PollIOLoop` when `IOLoop.enable_stats`
+    is active.
+    """
+    clock = staticmethod(monotonic_time or time.time)
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.totals = dict(iterations=0, callbacks=0, timeouts=0,
+                           ready_fds=0, poll_time=0.0, callback_time=0.0,
+                           timeout_time=0.0, handler_time=0.0,
+                           lag=0.0, max_lag=0.0)
+        self.iteration = None
+        self._last = None
+
+    def begin(self):
+        self.iteration = dict(callbacks=0, timeouts=0, ready_fds=0,
+                              poll_time=0.0, callback_time=0.0,
+                              timeout_time=0.0, handler_time=0.0, lag=0.0)
+        self._last = self.clock()
+
+    def lap(self, key):
+        """Charges the time since the previous lap to ``key``."""
+        now = self.clock()
+        self.iteration[key] += now - self._last
+        self._last = now
+
+    def ran_timeout(self, lateness):
+        self.iteration['timeouts'] += 1
+        if lateness > self.iteration['lag']:
+            self.iteration['lag'] = lateness
+
+    def end(self, pending_timeouts):
+        iteration = self.iteration
+        iteration['pending_timeouts'] = pending_timeouts
+        totals = self.totals
+        totals['iterations'] += 1
+        for key in ('callbacks', 'timeouts', 'ready_fds', 'poll_time',
+                    'callback_time', 'timeout_time', 'handler_time', 'lag'):
+            totals[key] += iteration[key]
+        if iteration['lag'] > totals['max_lag']:
+            totals['max_lag'] = iteration['lag']
+        self.iteration = None
+        return iteration
+
+
+def _callback_key(callback):
+    """Returns the code object behind ``callback``, or None.
+
+    Callbacks with the same code object get the same `_callback_name`
+    (except that on Python 2 a method's name uses the class it was
+    first seen on), so the code object can key a cache of names.
+    This only looks at exact types, so it is much cheaper than
+    `_callback_name`; anything else returns None.
+    """
+    while True:
+        cls = type(callback)
+        if cls is types.FunctionType:
+            wrapped = callback.__dict__.get('__wrapped__')
+            if wrapped is None:
+                return callback.__code__
+            callback = wrapped
+        elif cls is types.MethodType:
+            callback = callback.__func__
+        elif cls is functools.partial:
+            callback = callback.func
+        else:
+            return None
+
+
+def _callback_name(callback):
+    """Returns a readable name for the function behind ``callback``.
+
+    Looks through `functools.partial` objects and `.stack_context`
+    wrappers.
+    """
+    while True:
+        if isinstance(callback, functools.partial):
+            callback = callback.func
+        elif hasattr(callback, '__wrapped__'):
+            callback = callback.__wrapped__
+        else:
+            break
+    name = getattr(callback, '__qualname__', None)
+    if name is None:
+        name = getattr(callback, '__name__', None)
+        if name is None:
+            name = type(callback).__name__
+        else:
+            cls = getattr(callback, 'im_class', None)  # py2 methods
+            if cls is not None:
+                name = '%s.%s' % (cls.__name__, name)
+    module = getattr(callback, '__module__', None)
+    if module:
+        name = '%s.%s' % (module, name)
+    return name
+
+
+class _CallbackTimings(object):
+    """Per-callback latency histograms for `IOLoop.enable_callback_timing`."""
+    clock = staticmethod(monotonic_time or time.time)
+
+    # Upper bounds of the histogram buckets, in seconds.
+    BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, float('inf'))
+
+    def __init__(self, log_threshold):
+        self.log_threshold = log_threshold
+        # name -> [count, total_time, max_time, histogram]
+        self.entries = {}
+        # _callback_key -> name; formatting a name every time would
+        # cost more than the rest of record().
+        self.names = {}
+
+    def record(self, callback, elapsed):
+        key = _callback_key(callback)
+        name = self.names.get(key)
+        if name is None:
+            name = _callback_name(callback)
+            if key is not None:
+                self.names[key] = name
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = [0, 0.0, 0.0,
+                                          [0] * len(self.BUCKETS)]
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+        entry[3][bisect.bisect_left(self.BUCKETS, elapsed)] += 1
+        if self.log_threshold is not None and elapsed >= self.log_threshold:
+            gen_log.warning("Callback %s took %.3f seconds", name, elapsed)
+
+    def report(self, limit):
+        result = [dict(name=name, count=count, total_time=total,
+                       max_time=max_time,
+                       histogram=list(zip(self.BUCKETS, histogram)))
+                  for name, (count, total, max_time, histogram)
+                  in self.entries.items()]
+        result.sort(key=lambda entry: entry['max_time'], reverse=True)
+        if limit is not None:
+            del result[limit:]
+        return result
 
 
 class _Timeout(object):
     """An IOLoop timeout, a UNIX timestamp and a callback"""
 
     # Reduce memory overhead when there are lots of pending callbacks
-    __slots__ = ['deadline', 'callback']
+    __slots__ = ['deadline', 'callback', 'requested_deadline', 'sequence']
+
+    # Numbers timeouts in the order they were created, to break ties
+    # between equal deadlines.  next() on a count is atomic in CPython.
+    _sequence = itertools.count()
 
     def __init__(self, deadline, callback, io_loop):
         if isinstance(deadline, numbers.Real):
@@ -763,24 +1247,225 @@ class _Timeout(object):
             self.deadline = io_loop.time() + _Timeout.timedelta_to_seconds(deadline)
         else:
             raise TypeError("Unsupported deadline %r" % deadline)
+        # The deadline before add_slack rounded it.
+        self.requested_deadline = self.deadline
+        self.sequence = next(_Timeout._sequence)
         self.callback = callback
 
+    def add_slack(self, slack):
+        """Rounds the deadline up to the next multiple of ``slack``.
+
+        Every timeout whose deadline falls in the same window then has
+        the same deadline, so they all run in one loop iteration.
+        """
+        self.deadline = max(math.ceil(self.deadline / slack) * slack,
+                            self.deadline)
+
     @staticmethod
     def timedelta_to_seconds(td):
         """Equivalent to td.total_seconds() (introduced in python 2.7)."""
         return (td.microseconds + (td.seconds + td.days * 24 * 3600) * 10 ** 6) / float(10 ** 6)
 
-    # Comparison methods to sort by deadline, with object id as a tiebreaker
-    # to guarantee a consistent ordering.  The heapq module uses __le__
-    # in python2.5, and __lt__ in 2.6+ (sort() and most other comparisons
-    # use __lt__).
+    # Comparison methods to sort by deadline.  Timeouts whose deadlines
+    # were made equal by add_slack keep the order of the deadlines they
+    # asked for, and otherwise the order they were created in.  The
+    # heapq module uses __le__ in python2.5, and __lt__ in 2.6+ (sort()
+    # and most other comparisons use __lt__).
     def __lt__(self, other):
-        return ((self.deadline, id(self)) <
-                (other.deadline, id(other)))
+        return ((self.deadline, self.requested_deadline, self.sequence) <
+                (other.deadline, other.requested_deadline, other.sequence))
 
     def __le__(self, other):
-        return ((self.deadline, id(self)) <=
-                (other.deadline, id(other)))
+        return ((self.deadline, self.requested_deadline, self.sequence) <=
+                (other.deadline, other.requested_deadline, other.sequence))
+
+
+class _WheelTimeout(_Timeout):
+    """A `_Timeout` that remembers which `_TimingWheel` slot holds it."""
+
+    __slots__ = ['slot']
+
+    def __init__(self, deadline, callback, io_loop):
+        super(_WheelTimeout, self).__init__(deadline, callback, io_loop)
+        self.slot = None
+
+
+class _WheelSlot(set):
+    """A set of timeouts that knows which level of the wheel it is on."""
+
+    __slots__ = ['level']
+
+    def __init__(self, level):
+        super(_WheelSlot, self).__init__()
+        self.level = level
+
+
+class _TimingWheel(object):
+    """A hierarchical timing wheel of `_WheelTimeout` objects.
+
+    Time is divided into ticks of ``resolution`` seconds.  The first
+    wheel has one slot for each of the next 256 ticks; each of the four
+    outer wheels has 64 slots that each cover a whole revolution of the
+    wheel inside it.  Whenever the inner wheel wraps around, the next
+    slot of the outer wheel is cascaded into it.  Slots are sets, so
+    adding and removing a timeout are O(1) and cancelled timeouts are
+    released immediately instead of lingering in a heap.
+
+    A timeout never runs before its deadline, but may run up to one
+    tick after it.
+    """
+    _ROOT_BITS = 8
+    _LEVEL_BITS = 6
+    _LEVELS = 5
+
+    def __init__(self, resolution, now):
+        if resolution <= 0:
+            raise ValueError("timer_resolution must be positive")
+        self.resolution = resolution
+        self._wheels = [[None] * (1 << self._ROOT_BITS)]
+        for i in range(self._LEVELS - 1):
+            self._wheels.append([None] * (1 << self._LEVEL_BITS))
+        # Number of timeouts on each level.
+        self._counts = [0] * self._LEVELS
+        # The first tick that has not been expired yet.
+        self._tick = int(now / resolution)
+        self._count = 0
+        self._max_delta = (1 << (self._ROOT_BITS +
+                                 self._LEVEL_BITS * (self._LEVELS - 1))) - 1
+
+    def __len__(self):
+        return self._count
+
+    def add(self, timeout):
+        """Adds ``timeout`` to the slot for its deadline."""
+        self._insert(timeout, int(math.ceil(timeout.deadline /
+                                            self.resolution)))
+        self._count += 1
+
+    def remove(self, timeout):
+        """Removes ``timeout``; a no-op if it has already expired."""
+        slot = timeout.slot
+        if slot is not None:
+            slot.discard(timeout)
+            timeout.slot = None
+            self._counts[slot.level] -= 1
+            self._count -= 1
+
+    def _insert(self, timeout, expires):
+        delta = expires - self._tick
+        if delta < 0:
+            expires = self._tick
+            delta = 0
+        elif delta > self._max_delta:
+            # Parked in the outermost wheel; expire() will notice that
+            # the deadline hasn't passed and put it back.
+            expires = self._tick + self._max_delta
+            delta = self._max_delta
+        if delta < (1 << self._ROOT_BITS):
+            level = 0
+            index = expires & ((1 << self._ROOT_BITS) - 1)
+        else:
+            level = 1
+            shift = self._ROOT_BITS
+            while delta >= (1 << (shift + self._LEVEL_BITS)):
+                level += 1
+                shift += self._LEVEL_BITS
+            index = (expires >> shift) & ((1 << self._LEVEL_BITS) - 1)
+        wheel = self._wheels[level]
+        slot = wheel[index]
+        if slot is None:
+            slot = wheel[index] = _WheelSlot(level)
+        slot.add(timeout)
+        timeout.slot = slot
+        self._counts[level] += 1
+
+    def _cascade(self, level, index):
+        wheel = self._wheels[level]
+        slot = wheel[index]
+        if slot is not None:
+            wheel[index] = None
+            self._counts[level] -= len(slot)
+            for timeout in slot:
+                self._insert(timeout, int(math.ceil(timeout.deadline /
+                                                    self.resolution)))
+
+    def _next_cascade(self):
+        """Returns the next tick at which an outer wheel will cascade
+        into the (currently empty) innermost wheel.
+        """
+        bits = self._ROOT_BITS
+        for level in range(1, self._LEVELS):
+            if self._counts[level]:
+                break
+            bits += self._LEVEL_BITS
+        return ((self._tick >> bits) + 1) << bits
+
+    def expire(self, now):
+        """Removes and returns the timeouts that are due at time ``now``.
+
+        The result is sorted by deadline.
+        """
+        last_tick = int(now / self.resolution)
+        root = self._wheels[0]
+        root_mask = (1 << self._ROOT_BITS) - 1
+        level_mask = (1 << self._LEVEL_BITS) - 1
+        due = []
+        while self._tick <= last_tick:
+            if not self._count:
+                self._tick = last_tick + 1
+                break
+            index = self._tick & root_mask
+            if index == 0:
+                shift = self._ROOT_BITS
+                for level in range(1, self._LEVELS):
+                    level_index = (self._tick >> shift) & level_mask
+                    self._cascade(level, level_index)
+                    if level_index != 0:
+                        break
+                    shift += self._LEVEL_BITS
+            elif not self._counts[0]:
+                # Nothing can expire before the next cascade.
+                self._tick = min(self._next_cascade(), last_tick + 1)
+                continue
+            slot = root[index]
+            self._tick += 1
+            if slot is not None:
+                root[index] = None
+                self._counts[0] -= len(slot)
+                self._count -= len(slot)
+                for timeout in slot:
+                    timeout.slot = None
+                    if timeout.deadline > now:
+                        # Rounding error or a very distant deadline.
+                        self.add(timeout)
+                    else:
+                        due.append(timeout)
+        due.sort()
+        return due
+
+    def next_deadline(self):
+        """Returns the time at which `expire` should next be called.
+
+        This is the time of the next occupied slot in the innermost
+        wheel, or of the next cascade if that comes first.  Returns
+        None if the wheel is empty.
+        """
+        if not self._count:
+            return None
+        root = self._wheels[0]
+        root_mask = (1 << self._ROOT_BITS) - 1
+        tick = self._tick
+        if not tick & root_mask:
+            # A cascade is due before anything else can be known.
+            return tick * self.resolution
+        if not self._counts[0]:
+            return self._next_cascade() * self.resolution
+        boundary = (tick | root_mask) + 1
+        while tick < boundary:
+            if root[tick & root_mask]:
+                break
+            tick += 1
+        return tick * self.resolution
 
 
 class PeriodicCallback(object):
@@ -34,8 +34,10 @@ import socket
 import ssl
 import sys
 import re
+import threading
 
 from tornado import ioloop
+from tornado.concurrent import TracebackFuture
 from tornado.log import gen_log, app_log
 from tornado.netutil import ssl_wrap_socket, ssl_match_hostname, SSLCertificateError
 from tornado import stack_context
@@ -55,6 +57,51 @@ _ERRNO_WOULDBLOCK = (errno.EWOULDBLOCK, errno.EAGAIN)
 # They should be caught and handled less noisily than other errors.
 _ERRNO_CONNRESET = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
 
+try:
+    memoryview
+except NameError:
+    # python 2.6
+    def _slice_bytes(buf, start, end):
+        return bytes(buf[start:end])
+else:
+    def _slice_bytes(buf, start, end):
+        return memoryview(buf)[start:end].tobytes()
+
+try:
+    buffer
+except NameError:
+    # python 3
+    def _buffer_from(buf, start):
+        return memoryview(buf)[start:]
+else:
+    # re can't search a memoryview on python 2.
+    _buffer_from = buffer
+
+# The most buffers we will pass to a single sendmsg or writev call.
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    # The minimum POSIX allows.
+    _IOV_MAX = 16
+
+# Totals over all streams, see get_read_chunk_stats().
+_read_chunk_totals = dict(reads=0, bytes=0, grows=0, shrinks=0)
+
+
+def get_read_chunk_stats():
+    """Returns read counters summed over all streams in this process.
+
+    The result is a dict with the number of ``reads`` that returned
+    data, the ``bytes`` they returned, and how many times a stream's
+    read chunk size ``grows`` or ``shrinks`` (see `BaseIOStream`).
+
+    .. versionadded:: 3.2
+    """
+    return dict(_read_chunk_totals)
+
+
 class StreamClosedError(IOError):
     """Exception raised by `IOStream` methods when the stream is closed.
 
@@ -65,6 +112,30 @@ class StreamClosedError(IOError):
     pass
 
 
+class StreamBufferFullError(StreamClosedError):
+    """Exception raised by `BaseIOStream.write` when the write buffer
+    would grow past ``max_write_buffer_size``.
+
+    The stream is closed before this is raised, so this is a subclass
+    of `StreamClosedError`.
+
+    .. versionadded:: 3.2
+    """
+    pass
+
+
+class UnsatisfiableReadError(Exception):
+    """Exception used when a read cannot be satisfied.
+
+    Set as the ``error`` attribute of a stream that was closed because
+    ``read_until`` or ``read_until_regex`` reached its ``max_bytes``
+    limit without finding a match.
+
+    .. versionadded:: 3.2
+    """
+    pass
+
+
 class BaseIOStream(object):
     """A utility class to write to and read from a non-blocking file or socket.
 
@@ -77,20 +148,115 @@ class BaseIOStream(object):
 
     Subclasses must implement `fileno`, `close_fd`, `write_to_fd`,
     `read_from_fd`, and optionally `get_fd_error`.
+
+    Writes are buffered without limit unless ``max_write_buffer_size``
+    is given, in which case a write that would grow the buffer past it
+    closes the stream and raises `StreamBufferFullError`.  Producers
+    that may outrun the other end should use `wait_for_drain` for
+    flow control: it waits while more than ``write_high_water_mark``
+    bytes are buffered, until no more than ``write_low_water_mark``
+    (by default a quarter of the high water mark) remain.
+
+    Reads start at ``read_chunk_size`` bytes.  Each time a read fills
+    the whole chunk the size doubles, up to ``max_read_chunk_size``, and
+    each time one comes back less than half full it halves again (but
+    not below ``read_chunk_size``), so bulk transfers use fewer, larger
+    reads while idle connections stay small.  Pass the same value for
+    both to disable this.
+
+    Applications that make many small writes in one callback can
+    call `set_cork` so they are sent together at the end of the
+    `.IOLoop` iteration instead of one system call at a time.
+
+    Streams use ``__slots__`` to keep the cost of many idle connections
+    down.  They still have a ``__dict__`` (only allocated when something
+    is stored in it), so methods can be replaced on an instance and
+    other attributes set as before, but that memory is then spent
+    again; subclasses can define ``__slots__`` for their own state.
+
+    .. versionchanged:: 3.2
+       Added the ``max_write_buffer_size``, ``write_high_water_mark``,
+       ``write_low_water_mark`` and ``max_read_chunk_size`` arguments.
+       Added ``__slots__``.
     """
+    __slots__ = (
+        "io_loop", "max_buffer_size", "read_chunk_size",
+        "min_read_chunk_size", "max_read_chunk_size",
+        "max_write_buffer_size", "write_high_water_mark",
+        "write_low_water_mark", "error",
+        "_read_count", "_read_byte_count", "_read_chunk_grows",
+        "_read_chunk_shrinks",
+        "_read_buffer", "_read_buffer_pos", "_read_buffer_size",
+        "_write_buffer", "_write_buffer_frozen", "_write_buffer_size",
+        "_drain_futures", "_vectored_writes", "_write_buffer_pos",
+        "_sendfile", "_corked", "_cork_flush_pending",
+        "_read_delimiter", "_read_regex", "_read_max_bytes",
+        "_read_scan_pos", "_read_bytes", "_read_target",
+        "_read_target_pos", "_read_partial", "_read_until_close",
+        "_read_callback", "_streaming_callback", "_write_callback",
+        "_close_callback", "_connect_callback", "_connecting", "_state",
+        "_pending_callbacks", "_closed", "_edge_triggered", "_readable",
+        "_writable", "_stats", "_close_hook", "__dict__", "__weakref__")
+
     def __init__(self, io_loop=None, max_buffer_size=None,
-                 read_chunk_size=4096):
+                 read_chunk_size=4096, max_write_buffer_size=None,
+                 write_high_water_mark=None, write_low_water_mark=None,
+                 max_read_chunk_size=65536):
         self.io_loop = io_loop or ioloop.IOLoop.current()
         self.max_buffer_size = max_buffer_size or 104857600
         self.read_chunk_size = read_chunk_size
+        self.min_read_chunk_size = read_chunk_size
+        self.max_read_chunk_size = max(read_chunk_size, max_read_chunk_size)
+        self._read_count = 0
+        self._read_byte_count = 0
+        self._read_chunk_grows = 0
+        self._read_chunk_shrinks = 0
+        self.max_write_buffer_size = max_write_buffer_size
+        if write_low_water_mark is None:
+            write_low_water_mark = (write_high_water_mark or 0) // 4
+        if (write_high_water_mark is not None and
+                write_low_water_mark > write_high_water_mark):
+            raise ValueError("write_low_water_mark must not be greater "
+                             "than write_high_water_mark")
+        self.write_high_water_mark = write_high_water_mark
+        self.write_low_water_mark = write_low_water_mark
         self.error = None
-        self._read_buffer = collections.deque()
-        self._write_buffer = collections.deque()
+        # Data read from the fd is appended to _read_buffer and
+        # consumed from _read_buffer_pos; the consumed prefix is only
+        # deleted once it is larger than the unread data.  Both
+        # buffers (and _drain_futures) are None while empty, so that
+        # idle connections don't hold on to them.
+        self._read_buffer = None
+        self._read_buffer_pos = 0
         self._read_buffer_size = 0
+        self._write_buffer = None
         self._write_buffer_frozen = False
+        # Bytes held in _write_buffer (parts of files queued by
+        # write_file only count once they have been read into memory).
+        self._write_buffer_size = 0
+        self._drain_futures = None
+        # Subclasses that implement _write_to_fd_vectored set this, in
+        # which case _write_buffer_pos is the number of bytes of the
+        # first chunk in _write_buffer that have already been written.
+        self._vectored_writes = False
+        self._write_buffer_pos = 0
+        # Set by subclasses whose fd can be the target of os.sendfile;
+        # otherwise write_file reads the file in chunks.
+        self._sendfile = False
+        # See set_cork.  _cork_flush_pending is true while a callback
+        # to write the buffer out is scheduled.
+        self._corked = False
+        self._cork_flush_pending = False
         self._read_delimiter = None
         self._read_regex = None
+        self._read_max_bytes = None
+        # How many bytes at the start of the read buffer have already
+        # been searched for _read_delimiter without finding it.
+        self._read_scan_pos = 0
         self._read_bytes = None
+        self._read_target = None
+        self._read_target_pos = 0
+        self._read_partial = False
         self._read_until_close = False
         self._read_callback = None
         self._streaming_callback = None
@@ -101,6 +267,18 @@ class BaseIOStream(object):
         self._state = None
         self._pending_callbacks = 0
         self._closed = False
+        # In edge-triggered mode we register for reads and writes once,
+        # and remember whether the fd is known to be readable/writable
+        # (i.e. whether we have seen EWOULDBLOCK since the last event).
+        self._edge_triggered = self.io_loop.edge_triggered
+        self._readable = True
+        self._writable = True
+        # A _StreamStats while enable_stats is in effect.
+        self._stats = None
+        # Called (with no arguments) when the stream is closed, in
+        # addition to the close callback; used by TCPServer to count
+        # open connections.
+        self._close_hook = None
 
     def fileno(self):
         """Returns the file descriptor for this stream."""
@@ -121,6 +299,14 @@ class BaseIOStream(object):
         """
         raise NotImplementedError()
 
+    def _write_to_fd_vectored(self, buffers):
+        """Attempts to write a list of buffers with one system call.
+
+        Returns the number of bytes written.  Only used when
+        ``self._vectored_writes`` is true.
+        """
+        raise NotImplementedError()
+
     def read_from_fd(self):
         """Attempts to read from the underlying file.
 
@@ -131,6 +317,27 @@ class BaseIOStream(object):
         """
         raise NotImplementedError()
 
+    def read_from_fd_into(self, buf):
+        """Attempts to read from the underlying file into ``buf``.
+
+        ``buf`` is a writable `memoryview`.  Returns ``None`` if there
+        was nothing to read, otherwise the number of bytes read.
+
+        The default implementation calls `read_from_fd` and copies the
+        result, keeping anything that doesn't fit in the read buffer.
+        Subclasses may override this to read into ``buf`` directly.
+
+        .. versionadded:: 3.2
+        """
+        chunk = self.read_from_fd()
+        if chunk is None:
+            return None
+        num_bytes = min(len(chunk), len(buf))
+        buf[:num_bytes] = chunk[:num_bytes]
+        if num_bytes < len(chunk):
+            self._append_read_buffer(chunk[num_bytes:])
+        return num_bytes
+
     def get_fd_error(self):
         """Returns information about any error on the underlying file.
 
@@ -141,25 +348,42 @@ class BaseIOStream(object):
         """
         return None
 
-    def read_until_regex(self, regex, callback):
+    def read_until_regex(self, regex, callback, max_bytes=None):
         """Run ``callback`` when we read the given regex pattern.
 
         The callback will get the data read (including the data that
         matched the regex and anything that came before it) as an argument.
+
+        If ``max_bytes`` is not None, the connection will be closed
+        if more than ``max_bytes`` bytes have been read and the regex is
+        not satisfied.
+
+        .. versionchanged:: 3.2
+           Added the ``max_bytes`` argument.
         """
         self._set_read_callback(callback)
         self._read_regex = re.compile(regex)
-        self._try_inline_read()
+        self._read_max_bytes = max_bytes
+        self._try_inline_read_until()
 
-    def read_until(self, delimiter, callback):
+    def read_until(self, delimiter, callback, max_bytes=None):
         """Run ``callback`` when we read the given delimiter.
 
         The callback will get the data read (including the delimiter)
         as an argument.
+
+        If ``max_bytes`` is not None, the connection will be closed
+        if more than ``max_bytes`` bytes have been read and the delimiter
+        is not found.
+
+        .. versionchanged:: 3.2
+           Added the ``max_bytes`` argument.
         """
         self._set_read_callback(callback)
         self._read_delimiter = delimiter
-        self._try_inline_read()
+        self._read_max_bytes = max_bytes
+        self._read_scan_pos = 0
+        self._try_inline_read_until()
 
     def read_bytes(self, num_bytes, callback, streaming_callback=None):
         """Run callback when we read the given number of bytes.
@@ -175,6 +399,36 @@ class BaseIOStream(object):
         self._streaming_callback = stack_context.wrap(streaming_callback)
         self._try_inline_read()
 
+    def read_into(self, buf, callback, partial=False):
+        """Run ``callback`` when we have read enough data to fill ``buf``.
+
+        ``buf`` must be a writable buffer such as a `bytearray` or
+        `memoryview`.  The callback is run with the number of bytes
+        read, which is ``len(buf)`` unless ``partial`` is true, in which
+        case the callback is run as soon as any data has been read.
+
+        Data already in the stream's read buffer is copied into ``buf``;
+        beyond that, `IOStream` reads from the socket straight into
+        ``buf`` with `socket.recv_into <socket.socket.recv_into>`, so a
+        caller that reuses one buffer avoids allocating a new string for
+        every read.
+
+        ``buf`` must not be modified or resized until the callback has
+        run.
+
+        Not available on Python 2.6, which lacks `memoryview`.
+
+        .. versionadded:: 3.2
+        """
+        self._set_read_callback(callback)
+        buf = memoryview(buf)
+        if buf.readonly:
+            raise TypeError("read_into requires a writable buffer")
+        self._read_target = buf
+        self._read_target_pos = 0
+        self._read_partial = partial
+        self._try_inline_read()
+
     def read_until_close(self, callback, streaming_callback=None):
         """Reads all data from the socket until it is closed.
 
@@ -211,25 +465,211 @@ class BaseIOStream(object):
         """
         assert isinstance(data, bytes_type)
         self._check_closed()
+        if (self.max_write_buffer_size is not None and
+                self._write_buffer_size + len(data) >
+                self.max_write_buffer_size):
+            gen_log.error("Reached maximum write buffer size")
+            error = StreamBufferFullError("Reached maximum write buffer size")
+            self.close(exc_info=(StreamBufferFullError, error, None))
+            raise error
         # We use bool(_write_buffer) as a proxy for write_buffer_size>0,
         # so never put empty strings in the buffer.
+        # _handle_write only leaves data behind when the fd would
+        # block, so if there is already data waiting there is no point
+        # trying again until the IOLoop says the fd is writable.
+        write_pending = bool(self._write_buffer)
         if data:
+            if self._write_buffer is None:
+                self._write_buffer = collections.deque()
             # Break up large contiguous strings before inserting them in the
             # write buffer, so we don't have to recopy the entire thing
-            # as we slice off pieces to send to the socket.
+            # as we slice off pieces to send to the socket.  Vectored
+            # writes send from an offset into the string instead.
             WRITE_BUFFER_CHUNK_SIZE = 128 * 1024
-            if len(data) > WRITE_BUFFER_CHUNK_SIZE:
+            if (len(data) > WRITE_BUFFER_CHUNK_SIZE and
+                    not self._vectored_writes):
                 for i in range(0, len(data), WRITE_BUFFER_CHUNK_SIZE):
                     self._write_buffer.append(data[i:i + WRITE_BUFFER_CHUNK_SIZE])
             else:
                 self._write_buffer.append(data)
+            self._write_buffer_size += len(data)
+            if self._stats is not None:
+                self._stats.note_write_buffer(self._write_buffer_size)
+        self._start_write(write_pending, callback)
+
+    def write_file(self, fileobj, offset=0, count=None, callback=None):
+        """Write ``count`` bytes of ``fileobj``, starting at ``offset``.
+
+        ``fileobj`` must be a regular file opened for reading in binary
+        mode; if ``count`` is None everything from ``offset`` to the end
+        of the file is sent.  The data is queued behind any earlier
+        writes, and ``callback`` behaves as it does for `write`.
+
+        `IOStream` uses `os.sendfile` where it is available, so the
+        file's contents never pass through Python; other streams (and
+        `SSLIOStream`) read the file 64KB at a time as the write buffer
+        drains.  Either way the stream takes ownership of ``fileobj``
+        and closes it once it has been sent or the stream is closed.
+
+        .. versionadded:: 3.2
+        """
+        try:
+            self._check_closed()
+        except StreamClosedError:
+            fileobj.close()
+            raise
+        if count is None:
+            count = os.fstat(fileobj.fileno()).st_size - offset
+        write_pending = bool(self._write_buffer)
+        if count > 0:
+            if self._write_buffer is None:
+                self._write_buffer = collections.deque()
+            self._write_buffer.append(_FileSegment(fileobj, offset, count))
+        else:
+            fileobj.close()
+        self._start_write(write_pending, callback)
+
+    def wait_for_drain(self):
+        """Returns a `.Future` for write-side flow control.
+
+        If more than ``write_high_water_mark`` bytes are waiting to be
+        written (or, without a high water mark, more than
+        ``write_low_water_mark``), the `.Future` resolves once the
+        buffer has drained to ``write_low_water_mark`` or less;
+        otherwise it is already resolved.  If the stream is closed first
+        it fails with `StreamClosedError`.
+
+        A producer can write as fast as the other end reads with::
+
+            while True:
+                stream.write(produce_chunk())
+                yield stream.wait_for_drain()
+
+        .. versionadded:: 3.2
+        """
+        future = TracebackFuture()
+        if self.closed():
+            future.set_exception(StreamClosedError("Stream is closed"))
+            return future
+        limit = self.write_high_water_mark
+        if limit is None:
+            limit = self.write_low_water_mark
+        if self._write_buffer_size <= limit:
+            future.set_result(None)
+        elif self._drain_futures is None:
+            self._drain_futures = [future]
+        else:
+            self._drain_futures.append(future)
+        return future
+
+    def get_read_buffer_size(self):
+        """Returns the number of bytes read but not yet consumed.
+
+        .. versionadded:: 3.2
+        """
+        return self._read_buffer_size
+
+    def get_write_buffer_size(self):
+        """Returns the number of bytes waiting to be written.
+
+        .. versionadded:: 3.2
+        """
+        return self._write_buffer_size
+
+    def get_read_chunk_stats(self):
+        """Returns this stream's read counters.
+
+        The same counters as `get_read_chunk_stats` (the module-level
+        function), plus the current ``read_chunk_size``.
+
+        .. versionadded:: 3.2
+        """
+        return dict(reads=self._read_count,
+                    bytes=self._read_byte_count,
+                    grows=self._read_chunk_grows,
+                    shrinks=self._read_chunk_shrinks,
+                    read_chunk_size=self.read_chunk_size)
+
+    def enable_stats(self, collector=None):
+        """Starts counting this stream's traffic; see `get_stats`.
+
+        If ``collector`` (a `StreamStatsCollector`) is given, the stream
+        is added to it until it is closed.
+
+        .. versionadded:: 3.2
+        """
+        if self._stats is None:
+            self._stats = _StreamStats(collector)
+            if collector is not None:
+                collector._add(self)
+
+    def get_stats(self):
+        """Returns a dict of counters collected since `enable_stats`.
+
+        * ``bytes_read``, ``bytes_written``: bytes moved through the fd
+        * ``reads``, ``writes``: system calls that moved data
+        * ``read_eagain``, ``write_eagain``: system calls that would
+          have blocked
+        * ``max_read_buffer_size``, ``max_write_buffer_size``: the
+          most bytes held in each buffer at once
+
+        Returns None if statistics are not enabled.
+
+        .. versionadded:: 3.2
+        """
+        if self._stats is None:
+            return None
+        return self._stats.as_dict()
+
+    def set_cork(self, value):
+        """Sets the cork flag for this stream.
+
+        While the stream is corked, `write` only queues data, and
+        everything queued during one `.IOLoop` iteration is written
+        together once the current callbacks have run (with a single
+        system call on streams that support vectored writes).  This
+        trades a little latency for far fewer system calls when a
+        protocol sends many small messages at once.  Clearing the flag
+        writes out anything still queued immediately, as does `close`.
+
+        .. versionadded:: 3.2
+        """
+        self._corked = bool(value)
+        if not self._corked and self._cork_flush_pending:
+            self._flush_cork()
+
+    def _start_write(self, write_pending, callback):
         self._write_callback = stack_context.wrap(callback)
         if not self._connecting:
-            self._handle_write()
-            if self._write_buffer:
+            if self._corked:
+                if (self._writable and not write_pending and
+                        self._write_buffer):
+                    self._cork_flush_pending = True
+                    with stack_context.NullContext():
+                        self.io_loop.add_callback(self._flush_cork)
+                elif not self._write_buffer:
+                    # Nothing to wait for (e.g. a zero-byte write), so
+                    # just run the callback.
+                    self._handle_write()
+            else:
+                if self._writable and not write_pending:
+                    self._handle_write()
+            if self._write_buffer and not self._cork_flush_pending:
                 self._add_io_state(self.io_loop.WRITE)
             self._maybe_add_error_listener()
 
+    def _flush_cork(self):
+        if not self._cork_flush_pending:
+            # Already flushed by set_cork(False) or close.
+            return
+        self._cork_flush_pending = False
+        if self.closed():
+            return
+        self._handle_write()
+        if self._write_buffer:
+            self._add_io_state(self.io_loop.WRITE)
+        self._maybe_add_error_listener()
+
     def set_close_callback(self, callback):
         """Call the given callback when the stream is closed."""
         self._close_callback = stack_context.wrap(callback)
@@ -241,6 +681,11 @@ class BaseIOStream(object):
         exception from `sys.exc_info` (or if ``exc_info`` is a tuple,
         use that instead of `sys.exc_info`).
         """
+        if self._cork_flush_pending and not exc_info and not self.closed():
+            # Make the same attempt to send data held back by set_cork
+            # that an uncorked write would have made.
+            self._cork_flush_pending = False
+            self._handle_write()
         if not self.closed():
             if exc_info:
                 if not isinstance(exc_info, tuple):
@@ -262,6 +707,19 @@ class BaseIOStream(object):
                 self._state = None
             self.close_fd()
             self._closed = True
+            for chunk in self._write_buffer or ():
+                if isinstance(chunk, _FileSegment):
+                    chunk.fileobj.close()
+            if self._drain_futures:
+                futures, self._drain_futures = self._drain_futures, None
+                for future in futures:
+                    future.set_exception(StreamClosedError("Stream is closed"))
+            if self._stats is not None and self._stats.collector is not None:
+                self._stats.collector._remove(self)
+            if self._close_hook is not None:
+                hook = self._close_hook
+                self._close_hook = None
+                hook()
         self._maybe_run_close_callback()
 
     def _maybe_run_close_callback(self):
@@ -274,6 +732,7 @@ class BaseIOStream(object):
                 self._run_callback(cb)
             # Delete any unfinished callbacks to break up reference cycles.
             self._read_callback = self._write_callback = None
+            self._read_target = None
             # Clear the buffers so they can be cleared immediately even
             # if the IOStream object is kept alive by a reference cycle.
             # TODO: Clear the read buffer too; it currently breaks some tests.
@@ -312,10 +771,12 @@ class BaseIOStream(object):
             return
         try:
             if events & self.io_loop.READ:
+                self._readable = True
                 self._handle_read()
             if self.closed():
                 return
             if events & self.io_loop.WRITE:
+                self._writable = True
                 if self._connecting:
                     self._handle_connect()
                 self._handle_write()
@@ -328,12 +789,27 @@ class BaseIOStream(object):
                 # callbacks have had a chance to run.
                 self.io_loop.add_callback(self.close)
                 return
+            if self._edge_triggered:
+                # We won't get another event until the socket has
+                # blocked, so finish any read or write that couldn't
+                # start yet (e.g. while an SSL handshake was in progress).
+                if self._readable and self.reading():
+                    self._handle_read()
+                if self.closed():
+                    return
+                if (self._writable and self.writing() and
+                        not self._connecting):
+                    self._handle_write()
+                return
             state = self.io_loop.ERROR
             if self.reading():
                 state |= self.io_loop.READ
             if self.writing():
                 state |= self.io_loop.WRITE
-            if state == self.io_loop.ERROR:
+            if (state == self.io_loop.ERROR and
+                    self._read_buffer_size < self.max_read_chunk_size):
+                # Listen for the connection closing, unless a lot of
+                # unread data is buffered already (see _read_ahead_done).
                 state |= self.io_loop.READ
             if state != self._state:
                 assert self._state is not None, \
@@ -363,6 +839,8 @@ class BaseIOStream(object):
                 # can see it and log the error
                 raise
             self._maybe_add_error_listener()
+        # Lets IOLoop.enable_callback_timing report the real callback.
+        wrapper.__wrapped__ = callback
         # We schedule callbacks to be run on the next IOLoop iteration
         # rather than running them directly for several reasons:
         # * Prevents unbounded stack growth when a callback calls an
@@ -402,21 +880,41 @@ class BaseIOStream(object):
                     # try to read it.
                     if self._read_to_buffer() == 0:
                         break
+                    if (self._read_max_bytes is not None and
+                            self._read_buffer_size > self._read_max_bytes):
+                        # Stop reading and let _read_from_buffer decide
+                        # whether the read can still succeed.
+                        break
+                    if self._read_ahead_done():
+                        break
             finally:
                 self._pending_callbacks -= 1
         except Exception:
             gen_log.warning("error on read", exc_info=True)
             self.close(exc_info=True)
             return
-        if self._read_from_buffer():
+        try:
+            if self._read_from_buffer():
+                return
+        except UnsatisfiableReadError as e:
+            self._close_unsatisfiable(e)
             return
-        else:
-            self._maybe_run_close_callback()
+        self._maybe_run_close_callback()
 
     def _set_read_callback(self, callback):
         assert not self._read_callback, "Already reading"
         self._read_callback = stack_context.wrap(callback)
 
+    def _try_inline_read_until(self):
+        try:
+            self._try_inline_read()
+        except UnsatisfiableReadError as e:
+            self._close_unsatisfiable(e)
+
+    def _close_unsatisfiable(self, error):
+        gen_log.info("Unsatisfiable read, closing connection: %s", error)
+        self.close(exc_info=(UnsatisfiableReadError, error, None))
+
     def _try_inline_read(self):
         """Attempt to complete the current read operation from buffered data.
 
@@ -432,9 +930,13 @@ class BaseIOStream(object):
             try:
                 # See comments in _handle_read about incrementing _pending_callbacks
                 self._pending_callbacks += 1
-                while not self.closed():
+                # In edge-triggered mode, don't bother with a read that
+                # is known to block; the next event will do it.
+                while self._readable and not self.closed():
                     if self._read_to_buffer() == 0:
                         break
+                    if self._read_ahead_done():
+                        return
             finally:
                 self._pending_callbacks -= 1
         except Exception:
@@ -446,7 +948,29 @@ class BaseIOStream(object):
             raise
         if self._read_from_buffer():
             return
-        self._maybe_add_error_listener()
+        if self._state is not None:
+            # We may have stopped listening for reads while unread
+            # data was buffered (see _read_ahead_done).
+            self._add_io_state(ioloop.IOLoop.READ)
+        else:
+            self._maybe_add_error_listener()
+
+    def _read_ahead_done(self):
+        """Returns True if we should stop reading from the socket.
+
+        Once at least ``max_read_chunk_size`` bytes are buffered and
+        the pending read is satisfied (or there is none), the rest is
+        left in the socket until it is asked for, so that a slow reader
+        pushes back on the sender instead of filling the read buffer.
+        Satisfied reads have their callbacks scheduled.
+        """
+        if self._read_buffer_size < self.max_read_chunk_size:
+            return False
+        if not self.reading():
+            return True
+        # Regexes are searched from the start of the buffer each time,
+        # so leave them to _read_from_buffer once reading stops.
+        return self._read_regex is None and self._read_from_buffer()
 
     def _read_to_buffer(self):
         """Reads from the socket and appends the result to the read buffer.
@@ -455,8 +979,22 @@ class BaseIOStream(object):
         to read (i.e. the read returns EWOULDBLOCK or equivalent).  On
         error closes the socket and raises an exception.
         """
+        target = self._read_target
         try:
-            chunk = self.read_from_fd()
+            if (target is not None and not self._read_buffer_size and
+                    self._read_target_pos < len(target)):
+                # Nothing buffered, so read straight into the target.
+                num_bytes = self.read_from_fd_into(
+                    target[self._read_target_pos:])
+                if num_bytes is None:
+                    chunk = None
+                else:
+                    self._read_target_pos += num_bytes
+                    if self._stats is not None:
+                        self._stats.count_read(num_bytes, self._read_buffer_size)
+                    return num_bytes
+            else:
+                chunk = self.read_from_fd()
         except (socket.error, IOError, OSError) as e:
             # ssl.SSLError is a subclass of socket.error
             if e.args[0] in _ERRNO_CONNRESET:
@@ -468,20 +1006,67 @@ class BaseIOStream(object):
             self.close(exc_info=True)
             raise
         if chunk is None:
+            if self._edge_triggered:
+                self._readable = False
+            if self._stats is not None and not self.closed():
+                self._stats.read_eagain += 1
             return 0
-        self._read_buffer.append(chunk)
-        self._read_buffer_size += len(chunk)
+        self._append_read_buffer(chunk)
+        self._adjust_read_chunk_size(len(chunk))
+        if self._stats is not None:
+            self._stats.count_read(len(chunk), self._read_buffer_size)
         if self._read_buffer_size >= self.max_buffer_size:
             gen_log.error("Reached maximum read buffer size")
             self.close()
             raise IOError("Reached maximum read buffer size")
         return len(chunk)
 
+    def _append_read_buffer(self, data):
+        if self._read_buffer is None:
+            self._read_buffer = bytearray(data)
+        else:
+            self._read_buffer += data
+        self._read_buffer_size += len(data)
+
+    def _adjust_read_chunk_size(self, num_bytes):
+        """Updates the read counters and ``read_chunk_size`` after a read
+        that returned ``num_bytes`` bytes."""
+        self._read_count += 1
+        self._read_byte_count += num_bytes
+        _read_chunk_totals["reads"] += 1
+        _read_chunk_totals["bytes"] += num_bytes
+        size = self.read_chunk_size
+        if num_bytes >= size:
+            if size < self.max_read_chunk_size:
+                self.read_chunk_size = min(size * 2, self.max_read_chunk_size)
+                self._read_chunk_grows += 1
+                _read_chunk_totals["grows"] += 1
+        elif num_bytes < size // 2 and size > self.min_read_chunk_size:
+            self.read_chunk_size = max(size // 2, self.min_read_chunk_size)
+            self._read_chunk_shrinks += 1
+            _read_chunk_totals["shrinks"] += 1
+
     def _read_from_buffer(self):
         """Attempts to complete the currently-pending read from the buffer.
 
         Returns True if the read was completed.
         """
+        if self._read_target is not None:
+            target = self._read_target
+            if self._read_buffer_size:
+                self._read_target_pos += self._consume_into(
+                    target[self._read_target_pos:])
+            if (self._read_target_pos == len(target) or
+                    (self._read_partial and self._read_target_pos)):
+                num_bytes = self._read_target_pos
+                callback = self._read_callback
+                self._read_callback = None
+                self._read_target = None
+                self._read_target_pos = 0
+                self._read_partial = False
+                self._run_callback(callback, num_bytes)
+                return True
+            return False
         if self._streaming_callback is not None and self._read_buffer_size:
             bytes_to_consume = self._read_buffer_size
             if self._read_bytes is not None:
@@ -498,48 +1083,80 @@ class BaseIOStream(object):
             self._run_callback(callback, self._consume(num_bytes))
             return True
         elif self._read_delimiter is not None:
-            # Multi-byte delimiters (e.g. '\r\n') may straddle two
-            # chunks in the read buffer, so we can't easily find them
-            # without collapsing the buffer.  However, since protocols
-            # using delimited reads (as opposed to reads of a known
-            # length) tend to be "line" oriented, the delimiter is likely
-            # to be in the first few chunks.  Merge the buffer gradually
-            # since large merges are relatively expensive and get undone in
-            # consume().
-            if self._read_buffer:
-                while True:
-                    loc = self._read_buffer[0].find(self._read_delimiter)
-                    if loc != -1:
-                        callback = self._read_callback
-                        delimiter_len = len(self._read_delimiter)
-                        self._read_callback = None
-                        self._streaming_callback = None
-                        self._read_delimiter = None
-                        self._run_callback(callback,
-                                           self._consume(loc + delimiter_len))
-                        return True
-                    if len(self._read_buffer) == 1:
-                        break
-                    _double_prefix(self._read_buffer)
+            if self._read_buffer_size:
+                delimiter_len = len(self._read_delimiter)
+                # Only search the new data, plus enough of the old data
+                # to catch a delimiter that was split between reads.
+                start = max(0, self._read_scan_pos - delimiter_len + 1)
+                loc = self._read_buffer.find(self._read_delimiter,
+                                             self._read_buffer_pos + start)
+                if loc != -1:
+                    size = loc - self._read_buffer_pos + delimiter_len
+                    self._check_max_bytes(size)
+                    callback = self._read_callback
+                    self._read_callback = None
+                    self._streaming_callback = None
+                    self._read_delimiter = None
+                    self._read_max_bytes = None
+                    self._read_scan_pos = 0
+                    self._run_callback(callback, self._consume(size))
+                    return True
+                else:
+                    self._read_scan_pos = self._read_buffer_size
+                    self._check_max_bytes(self._read_buffer_size)
         elif self._read_regex is not None:
-            if self._read_buffer:
-                while True:
-                    m = self._read_regex.search(self._read_buffer[0])
-                    if m is not None:
-                        callback = self._read_callback
-                        self._read_callback = None
-                        self._streaming_callback = None
-                        self._read_regex = None
-                        self._run_callback(callback, self._consume(m.end()))
-                        return True
-                    if len(self._read_buffer) == 1:
-                        break
-                    _double_prefix(self._read_buffer)
+            if self._read_buffer_size:
+                # Search a view that starts at the unread data, so that
+                # ``^`` matches there and lookbehinds can't see
+                # consumed bytes.
+                view = _buffer_from(self._read_buffer, self._read_buffer_pos)
+                m = self._read_regex.search(view)
+                size = None if m is None else m.end()
+                # The buffer can't be resized while a memoryview exists.
+                del view, m
+                if size is not None:
+                    self._check_max_bytes(size)
+                    callback = self._read_callback
+                    self._read_callback = None
+                    self._streaming_callback = None
+                    self._read_regex = None
+                    self._read_max_bytes = None
+                    self._run_callback(callback, self._consume(size))
+                    return True
+                else:
+                    self._check_max_bytes(self._read_buffer_size)
         return False
 
+    def _check_max_bytes(self, size):
+        """Raises `UnsatisfiableReadError` if a read of ``size`` bytes
+        would exceed the current ``max_bytes`` limit."""
+        if self._read_max_bytes is not None and size > self._read_max_bytes:
+            if self._read_delimiter is not None:
+                what = "delimiter %r" % (self._read_delimiter,)
+            else:
+                what = "regex %r" % (self._read_regex.pattern,)
+            raise UnsatisfiableReadError("%s not found within %d bytes" % (
+                what, self._read_max_bytes))
+
     def _handle_write(self):
         while self._write_buffer:
             try:
+                if isinstance(self._write_buffer[0], _FileSegment):
+                    num_bytes = self._write_file_segment()
+                    if num_bytes == 0:
+                        self._write_blocked()
+                        break
+                    if self._sendfile and self._stats is not None:
+                        self._stats.count_write(num_bytes)
+                    continue
+                if self._vectored_writes:
+                    num_bytes = self._write_vectored()
+                    if num_bytes == 0:
+                        self._write_blocked()
+                        break
+                    if self._stats is not None:
+                        self._stats.count_write(num_bytes)
+                    continue
                 if not self._write_buffer_frozen:
                     # On windows, socket.send blows up if given a
                     # write buffer that's too large, instead of just
@@ -558,13 +1175,18 @@ class BaseIOStream(object):
                     # not yet accessible from python
                     # (http://bugs.python.org/issue8240)
                     self._write_buffer_frozen = True
+                    self._write_blocked()
                     break
                 self._write_buffer_frozen = False
                 _merge_prefix(self._write_buffer, num_bytes)
                 self._write_buffer.popleft()
+                self._write_buffer_size -= num_bytes
+                if self._stats is not None:
+                    self._stats.count_write(num_bytes)
             except (socket.error, IOError, OSError) as e:
                 if e.args[0] in _ERRNO_WOULDBLOCK:
                     self._write_buffer_frozen = True
+                    self._write_blocked()
                     break
                 else:
                     if e.args[0] not in _ERRNO_CONNRESET:
@@ -575,17 +1197,126 @@ class BaseIOStream(object):
                                         self.fileno(), e)
                     self.close(exc_info=True)
                     return
+        if (self._drain_futures and
+                self._write_buffer_size <= self.write_low_water_mark):
+            futures, self._drain_futures = self._drain_futures, None
+            for future in futures:
+                future.set_result(None)
+        if not self._write_buffer:
+            self._write_buffer = None
         if not self._write_buffer and self._write_callback:
             callback = self._write_callback
             self._write_callback = None
             self._run_callback(callback)
 
+    def _write_blocked(self):
+        """Notes that a write could not make progress."""
+        if self._edge_triggered:
+            self._writable = False
+        if self._stats is not None:
+            self._stats.write_eagain += 1
+
+    def _write_vectored(self):
+        """Writes as much of the write buffer as possible without joining
+        the chunks together.
+
+        Returns the number of bytes written.
+        """
+        buffers = []
+        pos = self._write_buffer_pos
+        for chunk in self._write_buffer:
+            if isinstance(chunk, _FileSegment):
+                break
+            if pos:
+                chunk = memoryview(chunk)[pos:]
+                pos = 0
+            buffers.append(chunk)
+            if len(buffers) == _IOV_MAX:
+                break
+        num_bytes = self._write_to_fd_vectored(buffers)
+        # Drop everything that was completely written and remember how
+        # far we got into the first remaining chunk.
+        pos = self._write_buffer_pos + num_bytes
+        write_buffer = self._write_buffer
+        while write_buffer and pos >= len(write_buffer[0]):
+            pos -= len(write_buffer.popleft())
+        self._write_buffer_pos = pos
+        self._write_buffer_size -= num_bytes
+        return num_bytes
+
+    def _write_file_segment(self):
+        """Makes progress on the `_FileSegment` at the head of the write
+        buffer.
+
+        With sendfile, returns the number of bytes sent.  Otherwise the
+        next piece of the file is read into the write buffer ahead of
+        the segment, to be written like any other data.
+        """
+        segment = self._write_buffer[0]
+        if self._sendfile:
+            num_bytes = os.sendfile(self.fileno(), segment.fileobj.fileno(),
+                                    segment.offset, segment.remaining)
+            if num_bytes == 0:
+                # sendfile only returns zero at the end of the file.
+                raise IOError("File was truncated while being written")
+        else:
+            segment.fileobj.seek(segment.offset)
+            chunk = segment.fileobj.read(min(segment.remaining, 64 * 1024))
+            if not chunk:
+                raise IOError("File was truncated while being written")
+            num_bytes = len(chunk)
+        segment.offset += num_bytes
+        segment.remaining -= num_bytes
+        if not segment.remaining:
+            self._write_buffer.popleft()
+            segment.fileobj.close()
+        if not self._sendfile:
+            self._write_buffer.appendleft(chunk)
+            self._write_buffer_size += num_bytes
+        return num_bytes
+
     def _consume(self, loc):
         if loc == 0:
             return b""
-        _merge_prefix(self._read_buffer, loc)
+        assert loc <= self._read_buffer_size
+        pos = self._read_buffer_pos
+        data = _slice_bytes(self._read_buffer, pos, pos + loc)
+        self._read_buffer_pos = pos + loc
+        self._read_buffer_size -= loc
+        self._compact_read_buffer()
+        return data
+
+    def _consume_into(self, buf):
+        """Moves as much of the read buffer as fits into ``buf``.
+
+        Returns the number of bytes moved.
+        """
+        loc = min(len(buf), self._read_buffer_size)
+        if loc == 0:
+            return 0
+        pos = self._read_buffer_pos
+        view = memoryview(self._read_buffer)
+        try:
+            buf[:loc] = view[pos:pos + loc]
+        finally:
+            # The buffer can't be resized while a memoryview exists.
+            del view
+        self._read_buffer_pos = pos + loc
         self._read_buffer_size -= loc
-        return self._read_buffer.popleft()
+        self._compact_read_buffer()
+        return loc
+
+    def _compact_read_buffer(self):
+        if not self._read_buffer_size:
+            # Drop the buffer entirely (it may have grown large) rather
+            # than keep it around on an idle connection.
+            self._read_buffer = None
+            self._read_buffer_pos = 0
+        elif self._read_buffer_pos > self._read_buffer_size:
+            # Compact lazily, so that consuming a little at a time from
+            # a large buffer doesn't move the rest of it every time.
+            del self._read_buffer[:self._read_buffer_pos]
+            self._read_buffer_pos = 0
 
     def _check_closed(self):
         if self.closed():
@@ -623,10 +1354,16 @@ class BaseIOStream(object):
             # connection has been closed, so there can be no future events
             return
         if self._state is None:
-            self._state = ioloop.IOLoop.ERROR | state
+            if self._edge_triggered:
+                self._state = (ioloop.IOLoop.ERROR | ioloop.IOLoop.READ |
+                               ioloop.IOLoop.WRITE | ioloop.IOLoop.EDGE)
+            else:
+                self._state = ioloop.IOLoop.ERROR | state
             with stack_context.NullContext():
                 self.io_loop.add_handler(
                     self.fileno(), self._handle_events, self._state)
+        elif self._edge_triggered:
+            return
         elif not self._state & state:
             self._state = self._state | state
             self.io_loop.update_handler(self.fileno(), self._state)
@@ -673,10 +1410,14 @@ class IOStream(BaseIOStream):
         stream.connect(("friendfeed.com", 80), send_request)
         tornado.ioloop.IOLoop.instance().start()
     """
+    __slots__ = ("socket",)
+
     def __init__(self, socket, *args, **kwargs):
         self.socket = socket
         self.socket.setblocking(False)
         super(IOStream, self).__init__(*args, **kwargs)
+        self._vectored_writes = hasattr(self.socket, "sendmsg")
+        self._sendfile = hasattr(os, "sendfile")
 
     def fileno(self):
         return self.socket.fileno()
@@ -703,9 +1444,25 @@ class IOStream(BaseIOStream):
             return None
         return chunk
 
+    def read_from_fd_into(self, buf):
+        try:
+            num_bytes = self.socket.recv_into(buf)
+        except socket.error as e:
+            if e.args[0] in _ERRNO_WOULDBLOCK:
+                return None
+            else:
+                raise
+        if not num_bytes:
+            self.close()
+            return None
+        return num_bytes
+
     def write_to_fd(self, data):
         return self.socket.send(data)
 
+    def _write_to_fd_vectored(self, buffers):
+        return self.socket.sendmsg(buffers)
+
     def connect(self, address, callback=None, server_hostname=None):
         """Connects the socket to a remote address without blocking.
 
@@ -789,6 +1546,10 @@ class SSLIOStream(IOStream):
     before constructing the `SSLIOStream`.  Unconnected sockets will be
     wrapped when `IOStream.connect` is finished.
     """
+    __slots__ = ("_ssl_options", "_ssl_accepting", "_handshake_reading",
+                 "_handshake_writing", "_ssl_connect_callback",
+                 "_server_hostname")
+
     def __init__(self, *args, **kwargs):
         """The ``ssl_options`` keyword argument may either be a dictionary
         of keywords arguments for `ssl.wrap_socket`, or an `ssl.SSLContext`
@@ -796,6 +1557,10 @@ class SSLIOStream(IOStream):
         """
         self._ssl_options = kwargs.pop('ssl_options', {})
         super(SSLIOStream, self).__init__(*args, **kwargs)
+        # OpenSSL has no vectored write, and a partially-written buffer
+        # must be passed again unchanged (see _write_buffer_frozen).
+        self._vectored_writes = False
+        self._sendfile = False
         self._ssl_accepting = True
         self._handshake_reading = False
         self._handshake_writing = False
@@ -828,9 +1593,13 @@ class SSLIOStream(IOStream):
         except ssl.SSLError as err:
             if err.args[0] == ssl.SSL_ERROR_WANT_READ:
                 self._handshake_reading = True
+                if self._edge_triggered:
+                    self._readable = False
                 return
             elif err.args[0] == ssl.SSL_ERROR_WANT_WRITE:
                 self._handshake_writing = True
+                if self._edge_triggered:
+                    self._writable = False
                 return
             elif err.args[0] in (ssl.SSL_ERROR_EOF,
                                  ssl.SSL_ERROR_ZERO_RETURN):
@@ -854,6 +1623,9 @@ class SSLIOStream(IOStream):
             return self.close(exc_info=True)
         else:
             self._ssl_accepting = False
+            # read_from_fd refuses to read during the handshake, so
+            # that doesn't tell us whether the socket is drained.
+            self._readable = True
             if not self._verify_cert(self.socket.getpeercert()):
                 self.close()
                 return
@@ -950,6 +1722,11 @@ class SSLIOStream(IOStream):
             return None
         return chunk
 
+    def read_from_fd_into(self, buf):
+        # SSLSocket.recv_into has the same blocking problems as recv(),
+        # so go through read_from_fd instead.
+        return BaseIOStream.read_from_fd_into(self, buf)
+
 
 class PipeIOStream(BaseIOStream):
     """Pipe-based `IOStream` implementation.
@@ -959,10 +1736,13 @@ class PipeIOStream(BaseIOStream):
     one-way, so a `PipeIOStream` can be used for reading or writing but not
     both.
     """
+    __slots__ = ("fd",)
+
     def __init__(self, fd, *args, **kwargs):
         self.fd = fd
         _set_nonblocking(fd)
         super(PipeIOStream, self).__init__(*args, **kwargs)
+        self._vectored_writes = hasattr(os, "writev")
 
     def fileno(self):
         return self.fd
@@ -973,6 +1753,9 @@ class PipeIOStream(BaseIOStream):
     def write_to_fd(self, data):
         return os.write(self.fd, data)
 
+    def _write_to_fd_vectored(self, buffers):
+        return os.writev(self.fd, buffers)
+
     def read_from_fd(self):
         try:
             chunk = os.read(self.fd, self.read_chunk_size)
@@ -992,15 +1775,6 @@ class PipeIOStream(BaseIOStream):
         return chunk
 
 
-def _double_prefix(deque):
-    """Grow by doubling, but don't split the second chunk just because the
-    first one is small.
-    """
-    new_len = max(len(deque[0]) * 2,
-                  (len(deque[0]) + len(deque[1])))
-    _merge_prefix(deque, new_len)
-
-
 def _merge_prefix(deque, size):
     """Replace the first entries in a deque of strings with a single
     string of up to size bytes.
@@ -1024,6 +1798,9 @@ def _merge_prefix(deque, size):
     prefix = []
     remaining = size
     while deque and remaining > 0:
+        if isinstance(deque[0], _FileSegment):
+            # Files are written separately by write_file.
+            break
         chunk = deque.popleft()
         if len(chunk) > remaining:
             deque.appendleft(chunk[remaining:])
@@ -1039,6 +1816,127 @@ def _merge_prefix(deque, size):
         deque.appendleft(b"")
 
 
+class _StreamStats(object):
+    """Counters kept by a stream while `BaseIOStream.enable_stats` is in
+    effect.
+    """
+    __slots__ = ("bytes_read", "bytes_written", "reads", "writes",
+                 "read_eagain", "write_eagain", "max_read_buffer_size",
+                 "max_write_buffer_size", "collector")
+
+    fields = __slots__[:-1]
+
+    def __init__(self, collector):
+        for name in self.fields:
+            setattr(self, name, 0)
+        self.collector = collector
+
+    def count_read(self, num_bytes, buffer_size):
+        self.reads += 1
+        self.bytes_read += num_bytes
+        if buffer_size > self.max_read_buffer_size:
+            self.max_read_buffer_size = buffer_size
+
+    def count_write(self, num_bytes):
+        self.writes += 1
+        self.bytes_written += num_bytes
+
+    def note_write_buffer(self, buffer_size):
+        if buffer_size > self.max_write_buffer_size:
+            self.max_write_buffer_size = buffer_size
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.fields)
+
+
+class StreamStatsCollector(object):
+    """Combines the statistics of many streams.
+
+    Streams are added with `BaseIOStream.enable_stats` and leave when
+    they are closed; `.TCPServer` uses one of these for its
+    connections when created with ``stream_stats=True``.  The
+    collector may be shared by streams on different threads.
+
+    .. versionadded:: 3.2
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._live = set()
+        self._closed_totals = dict.fromkeys(_StreamStats.fields, 0)
+        self._closed_count = 0
+
+    def _add(self, stream):
+        with self._lock:
+            self._live.add(stream)
+
+    def _remove(self, stream):
+        stats = stream.get_stats()
+        with self._lock:
+            self._live.discard(stream)
+            self._closed_count += 1
+            _add_stream_stats(self._closed_totals, stats)
+
+    def get_stats(self):
+        """Returns a dict describing all the streams seen so far.
+
+        * ``totals``: the counters of `BaseIOStream.get_stats`, summed
+          over every stream, open or closed (the ``max_*`` counters are
+          the largest seen on any stream)
+        * ``open_streams``, ``closed_streams``: how many of each there
+          are
+        * ``distribution``: for each counter, a dict with its ``min``,
+          ``median``, ``p90``, ``p99`` and ``max`` over the open streams
+          (empty if there are none)
+        """
+        with self._lock:
+            live = list(self._live)
+            totals = dict(self._closed_totals)
+            closed_count = self._closed_count
+        per_stream = [stream.get_stats() for stream in live]
+        for stats in per_stream:
+            _add_stream_stats(totals, stats)
+        distribution = {}
+        if per_stream:
+            for name in _StreamStats.fields:
+                values = sorted(stats[name] for stats in per_stream)
+                distribution[name] = dict(
+                    min=values[0],
+                    median=_percentile(values, 0.5),
+                    p90=_percentile(values, 0.9),
+                    p99=_percentile(values, 0.99),
+                    max=values[-1])
+        return dict(totals=totals, open_streams=len(per_stream),
+                    closed_streams=closed_count, distribution=distribution)
+
+
+def _add_stream_stats(totals, stats):
+    for name, value in stats.items():
+        if name.startswith("max_"):
+            totals[name] = max(totals[name], value)
+        else:
+            totals[name] += value
+
+
+def _percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of a non-empty sorted list."""
+    index = int(fraction * len(sorted_values) + 0.5) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+class _FileSegment(object):
+    """A part of a file queued in the write buffer by `BaseIOStream.write_file`.
+    """
+    __slots__ = ("fileobj", "offset", "remaining")
+
+    def __init__(self, fileobj, offset, count):
+        self.fileobj = fileobj
+        self.offset = offset
+        self.remaining = count
+
+    def __len__(self):
+        return self.remaining
+
+
 def doctests():
     import doctest
     return doctest.DocTestSuite()
@@ -37,7 +37,8 @@ else:
     ssl_match_hostname = backports.ssl_match_hostname.match_hostname
     SSLCertificateError = backports.ssl_match_hostname.CertificateError
 
-def bind_sockets(port, address=None, family=socket.AF_UNSPEC, backlog=128, flags=None):
+def bind_sockets(port, address=None, family=socket.AF_UNSPEC, backlog=128, flags=None,
+                 reuse_port=False):
     """Creates listening sockets bound to the given port and address.
 
     Returns a list of socket objects (multiple sockets are returned if
@@ -56,7 +57,18 @@ def bind_sockets(port, address=None, family=socket.AF_UNSPEC, backlog=128, flags
 
     ``flags`` is a bitmask of AI_* flags to `~socket.getaddrinfo`, like
     ``socket.AI_PASSIVE | socket.AI_NUMERICHOST``.
+
+    ``reuse_port`` sets the ``SO_REUSEPORT`` option on every socket, so
+    that several sockets (in this or other processes) can be bound to
+    the same port and the kernel will balance incoming connections
+    between them.  Raises `ValueError` if the platform does not support
+    ``SO_REUSEPORT``.
+
+    .. versionadded:: 3.2
+       The ``reuse_port`` argument.
     """
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("the platform doesn't support SO_REUSEPORT")
     sockets = []
     if address == "":
         address = None
@@ -81,6 +93,8 @@ def bind_sockets(port, address=None, family=socket.AF_UNSPEC, backlog=128, flags
         set_close_exec(sock.fileno())
         if os.name != 'nt':
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         if af == socket.AF_INET6:
             # On linux, ipv6 sockets accept ipv4 too by default,
             # but this makes it impossible to bind to both
@@ -195,6 +209,7 @@ class Resolver(Configurable):
 
     * `tornado.netutil.BlockingResolver`
     * `tornado.netutil.ThreadedResolver`
+    * `tornado.netutil.DefaultExecutorResolver`
     * `tornado.netutil.OverrideResolver`
     * `tornado.platform.twisted.TwistedResolver`
     * `tornado.platform.caresresolver.CaresResolver`
@@ -279,6 +294,23 @@ class BlockingResolver(ExecutorResolver):
         super(BlockingResolver, self).initialize(io_loop=io_loop)
 
 
+class DefaultExecutorResolver(ExecutorResolver):
+    """Non-blocking `Resolver` using the `.IOLoop`'s default executor.
+
+    Lookups run on the thread pool returned by
+    `.IOLoop.get_default_executor`, so they share its size and queue
+    limits with any other work submitted with `.IOLoop.run_in_executor`.
+    Unlike `ThreadedResolver`, this does not require the
+    `concurrent.futures` package.
+
+    .. versionadded:: 3.2
+    """
+    def initialize(self, io_loop=None):
+        self.io_loop = io_loop or IOLoop.current()
+        self.executor = None
+        self.close_executor = False
+
+
 class ThreadedResolver(ExecutorResolver):
     """Multithreaded non-blocking `Resolver` implementation.
 
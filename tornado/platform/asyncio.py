@@ -36,6 +36,8 @@ class BaseAsyncIOLoop(IOLoop):
                 os.close(fd)
         if self.close_loop:
             self.asyncio_loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
 
     def add_handler(self, fd, handler, events):
         if fd in self.handlers:
@@ -96,7 +98,7 @@ class BaseAsyncIOLoop(IOLoop):
         except Exception:
             self.handle_callback_exception(callback)
 
-    def add_timeout(self, deadline, callback):
+    def add_timeout(self, deadline, callback, slack=None):
         if isinstance(deadline, (int, float)):
             delay = max(deadline - self.time(), 0)
         elif isinstance(deadline, datetime.timedelta):
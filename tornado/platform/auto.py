@@ -31,7 +31,9 @@ if os.name == 'nt':
     from tornado.platform.common import Waker
     from tornado.platform.windows import set_close_exec
 else:
-    from tornado.platform.posix import set_close_exec, Waker
+    from tornado.platform.posix import set_close_exec, Waker, EventFDWaker
+    if EventFDWaker.available():
+        Waker = EventFDWaker
 
 try:
     # monotime monkey-patches the time module to have a monotonic function
@@ -22,5 +22,20 @@ from tornado.ioloop import PollIOLoop
 
 
 class EPollIOLoop(PollIOLoop):
-    def initialize(self, **kwargs):
+    """An `.IOLoop` using ``epoll``.
+
+    If ``edge_triggered`` is true, `.IOStream` objects on this loop
+    register their file descriptor once for both reads and writes in
+    edge-triggered mode and keep track of readiness themselves, instead
+    of calling `~.IOLoop.update_handler` (and ``epoll_ctl``) every time
+    they start or stop writing::
+
+        IOLoop.configure('tornado.platform.epoll.EPollIOLoop',
+                         edge_triggered=True)
+
+    .. versionadded:: 3.2
+       The ``edge_triggered`` argument.
+    """
+    def initialize(self, edge_triggered=False, **kwargs):
         super(EPollIOLoop, self).initialize(impl=select.epoll(), **kwargs)
+        self.edge_triggered = edge_triggered
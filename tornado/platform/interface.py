@@ -47,7 +47,11 @@ class Waker(object):
         raise NotImplementedError()
 
     def write_fileno(self):
-        """Returns the write file descriptor for this waker."""
+        """Returns the write file descriptor for this waker.
+
+        May return None if the file descriptor is not suitable for
+        `signal.set_wakeup_fd`.
+        """
         raise NotImplementedError()
 
     def wake(self):
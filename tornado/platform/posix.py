@@ -18,8 +18,11 @@
 
 from __future__ import absolute_import, division, print_function, with_statement
 
+import errno
 import fcntl
 import os
+import struct
+import sys
 
 from tornado.platform import interface
 
@@ -68,3 +71,90 @@ class Waker(interface.Waker):
     def close(self):
         self.reader.close()
         self.writer.close()
+
+
+def _load_eventfd():
+    """Returns a function that creates an eventfd, or None."""
+    if hasattr(os, 'eventfd'):
+        # Python 3.10+
+        return lambda: os.eventfd(0)
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        func = ctypes.CDLL(None, use_errno=True).eventfd
+    except (ImportError, OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_uint, ctypes.c_int]
+
+    def eventfd():
+        fd = func(0, 0)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return fd
+    return eventfd
+
+_eventfd = _load_eventfd()
+
+
+class EventFDWaker(interface.Waker):
+    """A `Waker` using a Linux ``eventfd``.
+
+    This uses one file descriptor instead of two for a pipe, and a
+    waker that has already been woken does not write to it again until
+    the `.IOLoop` has called `consume`.
+
+    ``eventfd`` only accepts 8-byte writes, so this waker cannot be
+    used with `signal.set_wakeup_fd` and `write_fileno` returns None.
+    """
+    _ONE = struct.pack("@Q", 1)
+
+    def __init__(self):
+        self._fd = _eventfd()
+        _set_nonblocking(self._fd)
+        set_close_exec(self._fd)
+        self._pending = False
+
+    @classmethod
+    def available(cls):
+        """Returns True if eventfd is supported on this system."""
+        if _eventfd is None:
+            return False
+        try:
+            os.close(_eventfd())
+        except OSError:
+            return False
+        return True
+
+    def fileno(self):
+        return self._fd
+
+    def write_fileno(self):
+        return None
+
+    def wake(self):
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            os.write(self._fd, self._ONE)
+        except OSError:
+            pass
+
+    def consume(self):
+        # Read before clearing the flag.  A wake() that runs in between
+        # sees the flag still set and skips its write, which is safe
+        # because the IOLoop runs its callbacks before polling again.
+        # Clearing the flag first would let this read swallow the
+        # write of such a wake() and leave the flag set with nothing
+        # to read, so no later wake() would write either.
+        try:
+            os.read(self._fd, 8)
+        except OSError as e:
+            if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+        self._pending = False
+
+    def close(self):
+        os.close(self._fd)
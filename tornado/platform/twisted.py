@@ -415,6 +415,8 @@ class TwistedIOLoop(tornado.ioloop.IOLoop):
         self.reactor.removeAll()
         for c in self.reactor.getDelayedCalls():
             c.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
 
     def add_handler(self, fd, handler, events):
         if fd in self.fds:
@@ -467,7 +469,7 @@ class TwistedIOLoop(tornado.ioloop.IOLoop):
         except Exception:
             self.handle_callback_exception(callback)
 
-    def add_timeout(self, deadline, callback):
+    def add_timeout(self, deadline, callback, slack=None):
         if isinstance(deadline, (int, long, float)):
             delay = max(deadline - self.time(), 0)
         elif isinstance(deadline, datetime.timedelta):
@@ -1,11 +1,13 @@
+#define PY_SSIZE_T_CLEAN
 #include <Python.h>
+#include <string.h>
 
 static PyObject* websocket_mask(PyObject* self, PyObject* args) {
     const char* mask;
-    int mask_len;
+    Py_ssize_t mask_len;
     const char* data;
-    int data_len;
-    int i;
+    Py_ssize_t data_len;
+    Py_ssize_t i;
 
     if (!PyArg_ParseTuple(args, "s#s#", &mask, &mask_len, &data, &data_len)) {
         return NULL;
@@ -23,8 +25,218 @@ static PyObject* websocket_mask(PyObject* self, PyObject* args) {
     return result;
 }
 
+/* Returns a native string (str on both Python 2 and 3) for latin1 data,
+ * matching native_str(data.decode('latin1')). */
+static PyObject* latin1_native(const char* data, Py_ssize_t len) {
+    PyObject* u = PyUnicode_DecodeLatin1(data, len, NULL);
+#if PY_MAJOR_VERSION >= 3
+    return u;
+#else
+    PyObject* b;
+    if (!u) {
+        return NULL;
+    }
+    b = PyUnicode_AsUTF8String(u);
+    Py_DECREF(u);
+    return b;
+#endif
+}
+
+/* The characters in httputil._HEADER_WHITESPACE. */
+static int is_space(char c) {
+    return c == ' ' || c == '\t' || c == '\n' || c == '\r' ||
+        c == '\v' || c == '\f';
+}
+
+/* The latin1 characters that end a line for str.splitlines() on the
+ * native str type (\r\n counts as one line break).  On Python 2 that
+ * is a byte string, which only breaks on \r and \n. */
+static int is_line_break(char c) {
+    switch ((unsigned char)c) {
+    case '\n': case '\r':
+#if PY_MAJOR_VERSION >= 3
+    case '\v': case '\f':
+    case 0x1c: case 0x1d: case 0x1e: case 0x85:
+#endif
+        return 1;
+    default:
+        return 0;
+    }
+}
+
+/* The same as tornado.httputil._parse_request_head_python. */
+static PyObject* parse_request_head(PyObject* self, PyObject* args) {
+    PyObject* data_obj;
+    char* data;
+    Py_ssize_t len;
+    Py_ssize_t eol, pos, start, end, sp1, sp2, i;
+    PyObject* method = NULL;
+    PyObject* uri = NULL;
+    PyObject* version = NULL;
+    PyObject* pairs = NULL;
+    PyObject* name;
+    PyObject* value;
+    PyObject* pair;
+    PyObject* result = NULL;
+
+    if (!PyArg_ParseTuple(args, "O", &data_obj)) {
+        return NULL;
+    }
+    if (PyBytes_AsStringAndSize(data_obj, &data, &len) < 0) {
+        return NULL;
+    }
+
+    /* Start line: exactly three space-separated parts. */
+    for (eol = 0; eol < len - 1; eol++) {
+        if (data[eol] == '\r' && data[eol + 1] == '\n') {
+            break;
+        }
+    }
+    if (eol >= len - 1) {
+        eol = len;
+    }
+    sp1 = sp2 = -1;
+    for (i = 0; i < eol; i++) {
+        if (data[i] == ' ') {
+            if (sp1 < 0) {
+                sp1 = i;
+            } else if (sp2 < 0) {
+                sp2 = i;
+            } else {
+                sp2 = -1;
+                break;
+            }
+        }
+    }
+    if (sp1 < 0 || sp2 < 0) {
+        PyErr_SetString(PyExc_ValueError, "Malformed HTTP request line");
+        return NULL;
+    }
+    if (eol - (sp2 + 1) < 5 || memcmp(data + sp2 + 1, "HTTP/", 5) != 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "Malformed HTTP version in HTTP Request-Line");
+        return NULL;
+    }
+    method = latin1_native(data, sp1);
+    uri = latin1_native(data + sp1 + 1, sp2 - sp1 - 1);
+    version = latin1_native(data + sp2 + 1, eol - sp2 - 1);
+    pairs = PyList_New(0);
+    if (!method || !uri || !version || !pairs) {
+        goto done;
+    }
+
+    /* Header lines, split like str.splitlines(). */
+    pos = eol;
+    while (pos < len) {
+        start = pos;
+        while (pos < len && !is_line_break(data[pos])) {
+            pos++;
+        }
+        end = pos;
+        if (pos < len) {
+            if (data[pos] == '\r' && pos + 1 < len && data[pos + 1] == '\n') {
+                pos += 2;
+            } else {
+                pos++;
+            }
+        }
+        if (end == start) {
+            continue;
+        }
+        if (is_space(data[start])) {
+            /* continuation of a multi-line header */
+            Py_ssize_t n = PyList_GET_SIZE(pairs);
+            PyObject* last;
+            PyObject* sep;
+            PyObject* joined;
+            PyObject* rest;
+            if (n == 0) {
+                PyErr_SetString(PyExc_ValueError, "Malformed HTTP headers");
+                goto done;
+            }
+            while (start < end && is_space(data[start])) {
+                start++;
+            }
+            last = PyList_GET_ITEM(pairs, n - 1);
+            sep = latin1_native(" ", 1);
+            if (!sep) {
+                goto done;
+            }
+            joined = PySequence_Concat(PyTuple_GET_ITEM(last, 1), sep);
+            Py_DECREF(sep);
+            if (!joined) {
+                goto done;
+            }
+            rest = latin1_native(data + start, end - start);
+            if (!rest) {
+                Py_DECREF(joined);
+                goto done;
+            }
+            value = PySequence_Concat(joined, rest);
+            Py_DECREF(joined);
+            Py_DECREF(rest);
+            if (!value) {
+                goto done;
+            }
+            pair = PyTuple_Pack(2, PyTuple_GET_ITEM(last, 0), value);
+            Py_DECREF(value);
+            if (!pair) {
+                goto done;
+            }
+            /* PyList_SetItem steals the reference to pair. */
+            if (PyList_SetItem(pairs, n - 1, pair) < 0) {
+                goto done;
+            }
+            continue;
+        }
+        for (i = start; i < end && data[i] != ':'; i++) {
+        }
+        if (i == end) {
+            PyErr_SetString(PyExc_ValueError, "Malformed HTTP headers");
+            goto done;
+        }
+        name = latin1_native(data + start, i - start);
+        if (!name) {
+            goto done;
+        }
+        /* Strip the value. */
+        start = i + 1;
+        while (start < end && is_space(data[start])) {
+            start++;
+        }
+        while (end > start && is_space(data[end - 1])) {
+            end--;
+        }
+        value = latin1_native(data + start, end - start);
+        if (!value) {
+            Py_DECREF(name);
+            goto done;
+        }
+        pair = PyTuple_Pack(2, name, value);
+        Py_DECREF(name);
+        Py_DECREF(value);
+        if (!pair) {
+            goto done;
+        }
+        if (PyList_Append(pairs, pair) < 0) {
+            Py_DECREF(pair);
+            goto done;
+        }
+        Py_DECREF(pair);
+    }
+    result = PyTuple_Pack(4, method, uri, version, pairs);
+
+done:
+    Py_XDECREF(method);
+    Py_XDECREF(uri);
+    Py_XDECREF(version);
+    Py_XDECREF(pairs);
+    return result;
+}
+
 static PyMethodDef methods[] = {
     {"websocket_mask",  websocket_mask, METH_VARARGS, ""},
+    {"parse_request_head",  parse_request_head, METH_VARARGS, ""},
     {NULL, NULL, 0, NULL}
 };
 
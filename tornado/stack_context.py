@@ -334,6 +334,7 @@ def wrap(fn):
         return ret
 
     wrapped._wrapped = True
+    wrapped.__wrapped__ = fn
     return wrapped
 
 
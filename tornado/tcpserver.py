@@ -21,10 +21,11 @@ import errno
 import os
 import socket
 import ssl
+import threading
 
-from tornado.log import app_log
+from tornado.log import app_log, gen_log
 from tornado.ioloop import IOLoop
-from tornado.iostream import IOStream, SSLIOStream
+from tornado.iostream import IOStream, SSLIOStream, StreamStatsCollector
 from tornado.netutil import bind_sockets, add_accept_handler, ssl_wrap_socket
 from tornado import process
 
@@ -78,14 +79,57 @@ class TCPServer(object):
        your listening sockets in some way other than
        `~tornado.netutil.bind_sockets`.
 
+    4. `start_threads`: multi-threaded::
+
+            server = TCPServer()
+            server.start_threads(8888)  # One IOLoop per core
+            # ... the server runs in the background until
+            server.stop()
+
+       Each thread runs its own `.IOLoop` and listens on its own
+       ``SO_REUSEPORT`` socket, so the kernel spreads new connections
+       across the threads.  `start_threads` returns once all the
+       threads are accepting connections.
+
     .. versionadded:: 3.1
        The ``max_buffer_size`` argument.
+
+    If ``stream_stats`` is true, every connection's `.IOStream` counts
+    its traffic (see `.BaseIOStream.get_stats`), and
+    `get_stream_stats` reports the totals and their distribution over
+    the open connections.
+
+    ``max_connections`` limits the number of connections open at once
+    (over all threads, with `start_threads`).  While the limit is
+    reached, new connections are closed as soon as they are accepted.
+
+    .. versionadded:: 3.2
+       `start_threads`, and the ``max_write_buffer_size``,
+       ``write_high_water_mark`` and ``write_low_water_mark`` arguments
+       (passed to each connection's `.IOStream`).  The ``stream_stats``
+       and ``max_connections`` arguments.
     """
-    def __init__(self, io_loop=None, ssl_options=None, max_buffer_size=None):
+    def __init__(self, io_loop=None, ssl_options=None, max_buffer_size=None,
+                 max_write_buffer_size=None, stream_stats=False,
+                 max_connections=None, write_high_water_mark=None,
+                 write_low_water_mark=None):
         self.io_loop = io_loop
         self.ssl_options = ssl_options
+        self.max_write_buffer_size = max_write_buffer_size
+        self.write_high_water_mark = write_high_water_mark
+        self.write_low_water_mark = write_low_water_mark
+        self.max_connections = max_connections
+        # Connections are counted on the threads' IOLoops with
+        # start_threads, so the count is guarded by a lock.
+        self._connection_count = 0
+        self._connection_lock = threading.Lock()
+        if stream_stats:
+            self._stream_stats = StreamStatsCollector()
+        else:
+            self._stream_stats = None
         self._sockets = {}  # fd -> socket object
         self._pending_sockets = []
+        self._threads = []
         self._started = False
         self.max_buffer_size = max_buffer_size
 
@@ -193,12 +237,111 @@ class TCPServer(object):
         self._pending_sockets = []
         self.add_sockets(sockets)
 
+    def start_threads(self, port, address=None, num_threads=None,
+                      family=socket.AF_UNSPEC, backlog=128, stats=False):
+        """Starts this server on ``num_threads`` new threads.
+
+        Each thread gets a new `.IOLoop` and its own listening sockets,
+        bound to ``port`` and ``address`` with ``SO_REUSEPORT`` (see
+        `~tornado.netutil.bind_sockets`), so the kernel balances
+        incoming connections between the threads.  If ``num_threads``
+        is ``None`` or <= 0, one thread is started for each core.
+
+        Unlike `start` with multiple processes, all the threads share
+        memory, but only one of them runs Python code at a time.  This
+        is most useful when much of the work releases the GIL, as SSL,
+        ``zlib``, and ``hashlib`` do.
+
+        Connections are handled on the `.IOLoop` of the thread that
+        accepted them, so `handle_stream` should use ``stream.io_loop``
+        rather than ``self.io_loop`` (which is not set in this mode).
+
+        If ``stats`` is true, `.IOLoop.enable_stats` is called on every
+        thread's `.IOLoop`; see `get_thread_stats`.
+
+        This method returns once every thread is accepting connections.
+        Call `stop` to shut the threads down.
+
+        .. versionadded:: 3.2
+        """
+        assert not self._started
+        assert self.io_loop is None
+        self._started = True
+        if num_threads is None or num_threads <= 0:
+            num_threads = process.cpu_count()
+        threads = []
+        try:
+            for i in range(num_threads):
+                sockets = bind_sockets(port, address=address, family=family,
+                                       backlog=backlog, reuse_port=True)
+                if not port:
+                    # Bind the other threads to the same ephemeral port.
+                    port = sockets[0].getsockname()[1]
+                threads.append(_ServerThread(self, sockets, i, stats))
+        except Exception:
+            for thread in threads:
+                thread.close()
+            raise
+        self._threads = threads
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.accepting.wait()
+
+    def get_thread_stats(self):
+        """Returns a list of statistics for each thread started by
+        `start_threads`.
+
+        Each entry is a dict with the thread's ``name`` and the number
+        of ``connections`` it has accepted.  If `start_threads` was
+        called with ``stats=True``, the dict also includes everything
+        returned by `.IOLoop.get_stats` for the thread's `.IOLoop`.
+
+        .. versionadded:: 3.2
+        """
+        return [thread.get_stats() for thread in self._threads]
+
+    def get_stream_stats(self):
+        """Returns statistics for this server's connections.
+
+        The result is that of `.StreamStatsCollector.get_stats`, covering
+        every connection accepted since the server was created (on all
+        threads, with `start_threads`).  Returns None unless the server
+        was created with ``stream_stats=True``.
+
+        .. versionadded:: 3.2
+        """
+        if self._stream_stats is None:
+            return None
+        return self._stream_stats.get_stats()
+
     def stop(self):
         """Stops listening for new connections.
 
         Requests currently in progress may still continue after the
         server is stopped.
+
+        If the server was started with `start_threads`, this also
+        stops each thread's `.IOLoop` (abandoning any requests in
+        progress) and waits for the threads to exit.
+
+        .. versionchanged:: 3.2
+           Added support for `start_threads`.
         """
+        if self._threads:
+            threads, self._threads = self._threads, []
+            for thread in threads:
+                try:
+                    thread.io_loop.add_callback(thread.stop)
+                except RuntimeError:
+                    # The thread has already exited (e.g. because its
+                    # IOLoop failed to start) and closed its IOLoop.
+                    pass
+            current = threading.current_thread()
+            for thread in threads:
+                if thread is not current:
+                    thread.join()
+            return
         for fd, sock in self._sockets.items():
             self.io_loop.remove_handler(fd)
             sock.close()
@@ -207,7 +350,16 @@ class TCPServer(object):
         """Override to handle a new `.IOStream` from an incoming connection."""
         raise NotImplementedError()
 
-    def _handle_connection(self, connection, address):
+    def _handle_connection(self, connection, address, io_loop=None):
+        if io_loop is None:
+            io_loop = self.io_loop
+        if self.max_connections is not None and not self._add_connection():
+            gen_log.warning("Too many connections (%d), closing "
+                            "connection from %r", self.max_connections,
+                            address)
+            connection.close()
+            return
+        stream = None
         if self.ssl_options is not None:
             assert ssl, "Python 2.6+ and OpenSSL required for SSL"
             try:
@@ -217,8 +369,10 @@ class TCPServer(object):
                                              do_handshake_on_connect=False)
             except ssl.SSLError as err:
                 if err.args[0] == ssl.SSL_ERROR_EOF:
+                    self._remove_connection()
                     return connection.close()
                 else:
+                    self._remove_connection()
                     raise
             except socket.error as err:
                 # If the connection is closed immediately after it is created
@@ -231,15 +385,92 @@ class TCPServer(object):
                 # SSLIOStream._do_ssl_handshake).
                 # To test this behavior, try nmap with the -sT flag.
                 # https://github.com/facebook/tornado/pull/750
+                self._remove_connection()
                 if err.args[0] in (errno.ECONNABORTED, errno.EINVAL):
                     return connection.close()
                 else:
                     raise
         try:
             if self.ssl_options is not None:
-                stream = SSLIOStream(connection, io_loop=self.io_loop, max_buffer_size=self.max_buffer_size)
+                stream = SSLIOStream(connection, io_loop=io_loop,
+                                     max_buffer_size=self.max_buffer_size,
+                                     max_write_buffer_size=self.max_write_buffer_size,
+                                     write_high_water_mark=self.write_high_water_mark,
+                                     write_low_water_mark=self.write_low_water_mark)
             else:
-                stream = IOStream(connection, io_loop=self.io_loop, max_buffer_size=self.max_buffer_size)
+                stream = IOStream(connection, io_loop=io_loop,
+                                  max_buffer_size=self.max_buffer_size,
+                                  max_write_buffer_size=self.max_write_buffer_size,
+                                  write_high_water_mark=self.write_high_water_mark,
+                                  write_low_water_mark=self.write_low_water_mark)
+            if self._stream_stats is not None:
+                stream.enable_stats(self._stream_stats)
+            if self.max_connections is not None:
+                stream._close_hook = self._remove_connection
             self.handle_stream(stream, address)
         except Exception:
             app_log.error("Error in connection callback", exc_info=True)
+            if stream is None:
+                self._remove_connection()
+
+    def _add_connection(self):
+        with self._connection_lock:
+            if self._connection_count >= self.max_connections:
+                return False
+            self._connection_count += 1
+            return True
+
+    def _remove_connection(self):
+        if self.max_connections is not None:
+            with self._connection_lock:
+                self._connection_count -= 1
+
+
+class _ServerThread(threading.Thread):
+    """A thread running one `.IOLoop` for `TCPServer.start_threads`."""
+    def __init__(self, server, sockets, index, stats):
+        super(_ServerThread, self).__init__(
+            name="%s-%d" % (type(server).__name__, index))
+        self.daemon = True
+        self.server = server
+        self.sockets = sockets
+        self.io_loop = IOLoop()
+        self.stats = stats
+        if stats:
+            self.io_loop.enable_stats()
+        self.connections = 0
+        self.accepting = threading.Event()
+
+    def run(self):
+        self.io_loop.make_current()
+        for sock in self.sockets:
+            add_accept_handler(sock, self._handle_connection,
+                               io_loop=self.io_loop)
+        self.io_loop.add_callback(self.accepting.set)
+        try:
+            self.io_loop.start()
+        finally:
+            # Don't leave start_threads waiting if start() failed.
+            self.accepting.set()
+            self.close(all_fds=True)
+
+    def _handle_connection(self, connection, address):
+        self.connections += 1
+        self.server._handle_connection(connection, address, self.io_loop)
+
+    def stop(self):
+        # Runs on this thread's IOLoop.
+        for sock in self.sockets:
+            self.io_loop.remove_handler(sock.fileno())
+        self.io_loop.stop()
+
+    def close(self, all_fds=False):
+        for sock in self.sockets:
+            sock.close()
+        self.io_loop.close(all_fds=all_fds)
+
+    def get_stats(self):
+        stats = dict(name=self.name, connections=self.connections)
+        if self.stats:
+            stats.update(self.io_loop.get_stats())
+        return stats
@@ -19,11 +19,13 @@ import logging
 import re
 import socket
 import sys
+import threading
 import traceback
 
-from tornado.concurrent import Future, return_future, ReturnValueIgnoredError
+from tornado.concurrent import Future, return_future, ReturnValueIgnoredError, ThreadPool, ExecutorSaturatedError, run_on_executor
 from tornado.escape import utf8, to_unicode
 from tornado import gen
+from tornado.ioloop import IOLoop
 from tornado.iostream import IOStream
 from tornado import stack_context
 from tornado.tcpserver import TCPServer
@@ -328,3 +330,72 @@ class DecoratorClientTest(ClientTestMixin, AsyncTestCase, LogTrapTestCase):
 
 class GeneratorClientTest(ClientTestMixin, AsyncTestCase, LogTrapTestCase):
     client_class = GeneratorCapClient
+
+
+class ThreadPoolTest(AsyncTestCase):
+    def setUp(self):
+        super(ThreadPoolTest, self).setUp()
+        self.pool = ThreadPool(self.io_loop, max_workers=2, max_queue_size=1,
+                               name="test-pool")
+        self.io_loop.set_default_executor(self.pool)
+
+    @gen_test
+    def test_result(self):
+        name = yield self.pool.submit(lambda: threading.current_thread().name)
+        self.assertTrue(name.startswith("test-pool-"))
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['submitted'], 1)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['workers'], 1)
+        self.assertTrue(stats['run_time'] >= 0)
+        self.assertTrue(stats['wait_time'] >= 0)
+
+    @gen_test
+    def test_exception(self):
+        with self.assertRaises(ZeroDivisionError):
+            yield self.io_loop.run_in_executor(None, lambda: 1 / 0)
+        self.assertEqual(self.pool.get_stats()['failed'], 1)
+
+    def test_shutdown_on_close(self):
+        io_loop = IOLoop()
+        pool = ThreadPool(io_loop, name="test-close-pool")
+        io_loop.set_default_executor(pool)
+        io_loop.close()
+        self.assertRaises(RuntimeError, pool.submit, lambda: 42)
+
+    @gen_test
+    def test_saturated(self):
+        event = threading.Event()
+        running = [self.pool.submit(event.wait) for i in range(2)]
+        # Both threads are busy, so one more call can queue ...
+        queued = self.pool.submit(lambda: 42)
+        # ... but not two.
+        self.assertRaises(ExecutorSaturatedError, self.pool.submit,
+                          lambda: 43)
+        event.set()
+        yield running
+        result = yield queued
+        self.assertEqual(result, 42)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(stats['workers'], 2)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertTrue(stats['max_wait_time'] > 0)
+
+    def test_shutdown(self):
+        self.pool.shutdown()
+        self.assertRaises(RuntimeError, self.pool.submit, lambda: None)
+
+    @gen_test
+    def test_run_on_executor(self):
+        class Object(object):
+            def __init__(self, io_loop):
+                self.io_loop = io_loop
+
+            @run_on_executor
+            def thread_name(self):
+                return threading.current_thread().name
+
+        name = yield Object(self.io_loop).thread_name()
+        self.assertTrue(name.startswith("test-pool-"))
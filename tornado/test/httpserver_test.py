@@ -2,7 +2,7 @@
 
 
 from __future__ import absolute_import, division, print_function, with_statement
-from tornado import httpclient, simple_httpclient, netutil
+from tornado import gen, httpclient, simple_httpclient, netutil
 from tornado.escape import json_decode, utf8, _unicode, recursive_unicode, native_str
 from tornado.httpserver import HTTPServer
 from tornado.httputil import HTTPHeaders
@@ -22,6 +22,7 @@ import socket
 import ssl
 import sys
 import tempfile
+import threading
 
 
 class HandlerBaseTestCase(AsyncHTTPTestCase):
@@ -497,6 +498,113 @@ class ManualProtocolTest(HandlerBaseTestCase):
         self.assertEqual(self.fetch_json('/')['protocol'], 'https')
 
 
+class StreamStatsTest(HandlerBaseTestCase):
+    class Handler(RequestHandler):
+        def get(self):
+            self.write("hello")
+
+    def get_httpserver_options(self):
+        return dict(stream_stats=True)
+
+    def test_stream_stats(self):
+        self.assertEqual(self.fetch('/').body, b"hello")
+        self.assertEqual(self.fetch('/').body, b"hello")
+        stats = self.http_server.get_stream_stats()
+        self.assertEqual(stats['open_streams'] + stats['closed_streams'], 2)
+        totals = stats['totals']
+        self.assertTrue(totals['reads'] >= 2, totals)
+        self.assertTrue(totals['writes'] >= 2, totals)
+        self.assertTrue(totals['bytes_read'] > 0, totals)
+        self.assertTrue(totals['bytes_written'] > 2 * len(b"hello"), totals)
+        self.assertTrue(totals['max_write_buffer_size'] > 0, totals)
+
+
+class WriteWaterMarkTest(AsyncHTTPTestCase):
+    class Handler(RequestHandler):
+        def initialize(self, results):
+            self.results = results
+
+        @asynchronous
+        def get(self):
+            stream = self.request.connection.stream
+            self.results.append((stream.write_high_water_mark,
+                                 stream.write_low_water_mark))
+            # More than the kernel's socket buffers will take.
+            self.write(b"x" * (16 * 1024 * 1024))
+            future = self.flush()
+            self.results.append(future.done())
+
+            def on_drained(future):
+                future.result()
+                self.results.append(stream.get_write_buffer_size())
+                self.finish()
+            stream.io_loop.add_future(future, on_drained)
+
+    def get_app(self):
+        self.results = []
+        return Application([('/', self.Handler,
+                             dict(results=self.results))])
+
+    def get_httpserver_options(self):
+        return dict(write_high_water_mark=256 * 1024,
+                    write_low_water_mark=128 * 1024)
+
+    def test_flush_waits_for_low_water_mark(self):
+        response = self.fetch('/')
+        self.assertEqual(len(response.body), 16 * 1024 * 1024)
+        marks, done, buffered = self.results
+        self.assertEqual(marks, (256 * 1024, 128 * 1024))
+        self.assertFalse(done)
+        self.assertTrue(buffered <= 128 * 1024, buffered)
+
+
+class MultipartSpoolTest(HandlerBaseTestCase):
+    class Handler(RequestHandler):
+        def post(self):
+            upload = self.request.files["upload"][0]
+            self.finish({"argument": self.get_argument("argument"),
+                         "spooled": "file" in upload,
+                         "size": len(upload.read()),
+                         "request_body": len(self.request.body)})
+
+    def get_httpserver_options(self):
+        # Spooled bodies may be larger than max_buffer_size.
+        return dict(multipart_spool_size=1024, max_buffer_size=200000,
+                    max_body_size=400000)
+
+    def post_upload(self, size):
+        body = b"\r\n".join([
+            b"--1234",
+            b'Content-Disposition: form-data; name="argument"',
+            b"",
+            b"value",
+            b"--1234",
+            b'Content-Disposition: form-data; name="upload"; filename="a"',
+            b"",
+            b"x" * size,
+            b"--1234--",
+            b""])
+        return self.fetch("/", method="POST", body=body, headers={
+            "Content-Type": "multipart/form-data; boundary=1234"})
+
+    def test_small_upload(self):
+        response = self.post_upload(100)
+        self.assertEqual(json_decode(response.body), {
+            "argument": "value", "spooled": False, "size": 100,
+            "request_body": 0})
+
+    def test_large_upload(self):
+        response = self.post_upload(300000)
+        self.assertEqual(json_decode(response.body), {
+            "argument": "value", "spooled": True, "size": 300000,
+            "request_body": 0})
+
+    def test_max_body_size(self):
+        with ExpectLog(gen_log, ".*Content-Length too long"):
+            response = self.post_upload(500000)
+        self.assertEqual(response.code, 599)
+
+
 @unittest.skipIf(not hasattr(socket, 'AF_UNIX') or sys.platform == 'cygwin',
                  "unix sockets not supported on this platform")
 class UnixSocketTest(AsyncTestCase):
@@ -548,6 +656,67 @@ class UnixSocketTest(AsyncTestCase):
         self.assertEqual(response, b"")
 
 
+class ThreadNameHandler(RequestHandler):
+    def get(self):
+        self.write(threading.current_thread().name)
+
+
+@unittest.skipIf(not hasattr(socket, 'SO_REUSEPORT'),
+                 "SO_REUSEPORT not supported on this platform")
+class ThreadedServerTest(AsyncTestCase):
+    def setUp(self):
+        super(ThreadedServerTest, self).setUp()
+        app = Application([("/", ThreadNameHandler)])
+        self.server = HTTPServer(app)
+        self.server.start_threads(0, address='127.0.0.1', num_threads=2,
+                                  stats=True)
+        self.port = self.server._threads[0].sockets[0].getsockname()[1]
+        self.http_client = SimpleAsyncHTTPClient(io_loop=self.io_loop,
+                                                 force_instance=True)
+
+    def tearDown(self):
+        self.http_client.close()
+        self.server.stop()
+        super(ThreadedServerTest, self).tearDown()
+
+    def test_threads(self):
+        threads = self.server._threads
+        self.assertEqual(len(threads), 2)
+        for thread in threads:
+            self.assertEqual(thread.sockets[0].getsockname()[1], self.port)
+        names = set()
+        for i in range(4):
+            self.http_client.fetch('http://127.0.0.1:%d/' % self.port,
+                                   self.stop)
+            response = self.wait()
+            response.rethrow()
+            names.add(native_str(response.body))
+        self.assertTrue(names <= set(thread.name for thread in threads))
+        stats = self.server.get_thread_stats()
+        self.assertEqual(sum(s['connections'] for s in stats), 4)
+        for s in stats:
+            self.assertTrue(s['iterations'] >= 1)
+
+    def test_stop(self):
+        threads = self.server._threads
+        self.server.stop()
+        for thread in threads:
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(self.server.get_thread_stats(), [])
+        with closing(socket.socket()) as sock:
+            self.assertRaises(socket.error, sock.connect,
+                              ('127.0.0.1', self.port))
+
+    def test_stop_after_thread_exited(self):
+        threads = self.server._threads
+        # The thread closes its IOLoop on the way out, as it would if
+        # IOLoop.start had failed.
+        threads[0].io_loop.add_callback(threads[0].io_loop.stop)
+        threads[0].join()
+        self.server.stop()
+        for thread in threads:
+            self.assertFalse(thread.is_alive())
+
 
 class KeepAliveTest(AsyncHTTPTestCase):
     """Tests various scenarios for HTTP 1.1 keep-alive support.
@@ -684,3 +853,190 @@ class KeepAliveTest(AsyncHTTPTestCase):
         self.stream.write(b'GET /finish_on_close HTTP/1.1\r\n\r\n')
         self.read_headers()
         self.close()
+
+
+class PipelineTest(KeepAliveTest):
+    """Runs the keep-alive tests again with pipelining enabled, and tests
+    pipelined requests that are processed concurrently."""
+    def get_httpserver_options(self):
+        return dict(max_pipelined_requests=4,
+                    write_high_water_mark=64 * 1024)
+
+    def get_app(self):
+        test = self
+
+        class DelayHandler(RequestHandler):
+            @asynchronous
+            def get(self, name):
+                test.started.append(name)
+                delay = float(self.get_argument('delay', '0'))
+                test.io_loop.add_timeout(test.io_loop.time() + delay,
+                                         self.done)
+
+            def post(self, name):
+                test.started.append(name)
+                test.finished.append(name)
+                self.finish(self.request.body)
+
+            def done(self):
+                test.finished.append(self.path_args[0])
+                self.finish(self.path_args[0])
+
+            def on_connection_close(self):
+                test.closed.append(self.path_args[0])
+
+        class LargeHandler(RequestHandler):
+            @gen.coroutine
+            def get(self):
+                test.started.append('large')
+                self.set_header('Content-Length', 8 * 1024 * 1024)
+                for i in range(8):
+                    self.write(b'x' * (1024 * 1024))
+                    test.chunks_written += 1
+                    yield self.flush()
+
+        app = super(PipelineTest, self).get_app()
+        app.add_handlers('.*$', [('/delay/(.*)', DelayHandler),
+                                 ('/large', LargeHandler)])
+        return app
+
+    def setUp(self):
+        super(PipelineTest, self).setUp()
+        self.started = []
+        self.finished = []
+        self.closed = []
+        self.chunks_written = 0
+
+    def read_body(self):
+        headers = self.read_headers()
+        self.stream.read_bytes(int(headers['Content-Length']), self.stop)
+        return self.wait()
+
+    def test_concurrent_in_order(self):
+        self.connect()
+        self.stream.write(b'GET /delay/a?delay=0.05 HTTP/1.1\r\n\r\n'
+                          b'GET /delay/b HTTP/1.1\r\n\r\n'
+                          b'GET /delay/c HTTP/1.1\r\n\r\n')
+        self.assertEqual([self.read_body() for i in range(3)],
+                         [b'a', b'b', b'c'])
+        # The later requests ran while the first one was waiting, but
+        # their responses were held back until it was done.
+        self.assertEqual(self.finished, ['b', 'c', 'a'])
+        self.close()
+
+    def test_request_with_body_is_held(self):
+        self.connect()
+        self.stream.write(b'GET /delay/a?delay=0.05 HTTP/1.1\r\n\r\n'
+                          b'POST /delay/post HTTP/1.1\r\n'
+                          b'Content-Length: 5\r\n\r\nhello'
+                          b'GET /delay/b HTTP/1.1\r\n\r\n')
+        self.assertEqual([self.read_body() for i in range(3)],
+                         [b'a', b'hello', b'b'])
+        self.assertEqual(self.started, ['a', 'post', 'b'])
+        self.close()
+
+    def test_pipeline_limit(self):
+        self.connect()
+        self.stream.write(b'GET /delay/a?delay=0.05 HTTP/1.1\r\n\r\n' +
+                          b''.join(utf8('GET /delay/%d HTTP/1.1\r\n\r\n' % i)
+                                   for i in range(6)))
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+        # Only max_pipelined_requests were read behind the first one.
+        self.assertEqual(self.started, ['a', '0', '1', '2', '3'])
+        self.assertEqual([self.read_body() for i in range(7)],
+                         [b'a'] + [utf8(str(i)) for i in range(6)])
+        self.close()
+
+    def test_flush_waits_while_pipelined(self):
+        # A request answered behind a slow one holds its output in
+        # memory, so flush() waits (and no more requests are started)
+        # instead of letting that output grow without limit.
+        self.connect()
+        self.stream.write(b'GET /delay/a?delay=0.1 HTTP/1.1\r\n\r\n'
+                          b'GET /large HTTP/1.1\r\n\r\n'
+                          b'GET /delay/b HTTP/1.1\r\n\r\n')
+        self.io_loop.add_timeout(self.io_loop.time() + 0.05, self.stop)
+        self.wait()
+        self.assertEqual(self.started, ['a', 'large'])
+        self.assertEqual(self.chunks_written, 1)
+        self.assertEqual(self.read_body(), b'a')
+        self.assertEqual(len(self.read_body()), 8 * 1024 * 1024)
+        self.assertEqual(self.chunks_written, 8)
+        self.assertEqual(self.read_body(), b'b')
+        self.assertEqual(self.started, ['a', 'large', 'b'])
+        self.close()
+
+    def test_close_while_pipelined(self):
+        self.connect()
+        self.stream.write(b'GET /delay/a?delay=10 HTTP/1.1\r\n\r\n'
+                          b'GET /delay/b?delay=10 HTTP/1.1\r\n\r\n')
+        while len(self.started) < 2:
+            self.io_loop.add_timeout(self.io_loop.time() + 0.01, self.stop)
+            self.wait()
+        self.close()
+        while len(self.closed) < 2:
+            self.io_loop.add_timeout(self.io_loop.time() + 0.01, self.stop)
+            self.wait()
+        self.assertEqual(sorted(self.closed), ['a', 'b'])
+
+
+class ConnectionLimitsTest(KeepAliveTest):
+    """Runs the keep-alive tests again with timeouts and limits, and
+    tests that they close connections."""
+    def get_httpserver_options(self):
+        return dict(idle_connection_timeout=0.2, header_timeout=0.1,
+                    body_timeout=0.1, max_requests_per_connection=3,
+                    max_connections=2)
+
+    def read_until_close(self):
+        self.stream.read_until_close(self.stop)
+        return self.wait()
+
+    def test_idle_timeout(self):
+        self.connect()
+        self.stream.write(b'GET / HTTP/1.1\r\n\r\n')
+        self.read_response()
+        start = self.io_loop.time()
+        self.assertEqual(self.read_until_close(), b'')
+        self.assertTrue(self.io_loop.time() - start >= 0.15)
+
+    def test_header_timeout(self):
+        self.connect()
+        with ExpectLog(gen_log, 'Timeout reading request headers'):
+            self.stream.write(b'GET / HTTP/1.1\r\n')
+            self.assertEqual(self.read_until_close(), b'')
+
+    def test_body_timeout(self):
+        self.connect()
+        with ExpectLog(gen_log, 'Timeout reading request body'):
+            self.stream.write(b'POST / HTTP/1.1\r\nContent-Length: 10\r\n'
+                              b'\r\nhello')
+            self.assertEqual(self.read_until_close(), b'')
+
+    def test_max_requests_per_connection(self):
+        self.connect()
+        for i in range(3):
+            self.stream.write(b'GET / HTTP/1.1\r\n\r\n')
+            self.read_response()
+        self.assertEqual(self.read_until_close(), b'')
+
+    def test_max_connections(self):
+        self.connect()
+        self.stream.write(b'GET / HTTP/1.1\r\n\r\n')
+        self.read_response()
+        first = self.stream
+        self.connect()
+        second = self.stream
+        with ExpectLog(gen_log, 'Too many connections'):
+            self.connect()
+            self.assertEqual(self.read_until_close(), b'')
+        first.close()
+        self.stream = second
+        self.stream.write(b'GET / HTTP/1.1\r\n\r\n')
+        self.read_response()
+        # The first connection's place is free again.
+        self.connect()
+        self.stream.write(b'GET / HTTP/1.1\r\n\r\n')
+        self.read_response()
+        second.close()
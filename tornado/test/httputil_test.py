@@ -2,16 +2,22 @@
 
 
 from __future__ import absolute_import, division, print_function, with_statement
-from tornado.httputil import url_concat, parse_multipart_form_data, HTTPHeaders, format_timestamp
-from tornado.escape import utf8
+from tornado.httputil import url_concat, parse_multipart_form_data, MultipartFormDataParser, HTTPHeaders, format_timestamp, _parse_request_head_python
+from tornado.escape import utf8, native_str
 from tornado.log import gen_log
 from tornado.testing import ExpectLog
 from tornado.test.util import unittest
+from tornado.util import u
 
 import datetime
 import logging
 import time
 
+try:
+    from tornado import speedups
+except ImportError:
+    speedups = None
+
 
 class TestUrlConcat(unittest.TestCase):
 
@@ -146,6 +152,34 @@ Foo
             parse_multipart_form_data(b"1234", data, args, files)
         self.assertEqual(files, {})
 
+    def test_missing_headers_skips_only_that_part(self):
+        data = b'''\
+--1234
+Content-Disposition: form-data; name="a"
+foo
+--1234
+Content-Disposition: form-data; name="b"
+
+bar
+--1234--'''.replace(b"\n", b"\r\n")
+        args = {}
+        files = {}
+        with ExpectLog(gen_log, "multipart/form-data missing headers"):
+            parse_multipart_form_data(b"1234", data, args, files)
+        self.assertEqual(args, {"b": [b"bar"]})
+
+    def test_invalid_headers(self):
+        for header in [b"garbage", b"X-Foo: \xff"]:
+            data = (b'--1234\r\nContent-Disposition: form-data; name="a"\r\n' +
+                    header + b'\r\n\r\nfoo\r\n--1234\r\n'
+                    b'Content-Disposition: form-data; name="b"\r\n\r\n'
+                    b'bar\r\n--1234--')
+            args = {}
+            files = {}
+            with ExpectLog(gen_log, "multipart/form-data invalid headers"):
+                parse_multipart_form_data(b"1234", data, args, files)
+            self.assertEqual(args, {"b": [b"bar"]})
+
     def test_invalid_content_disposition(self):
         data = b'''\
 --1234
@@ -203,6 +237,76 @@ Foo
         self.assertEqual(file["body"], b"Foo")
 
 
+class MultipartFormDataParserTest(unittest.TestCase):
+    data = b"""\
+--1234
+Content-Disposition: form-data; name="argument"
+
+value
+--1234
+Content-Disposition: form-data; name="files"; filename="ab.txt"
+
+%s
+--1234--""".replace(b"\n", b"\r\n")
+
+    def parse(self, data, **kwargs):
+        args = {}
+        files = {}
+        parser = MultipartFormDataParser(b"1234", args, files, **kwargs)
+        # Feed it one byte at a time to split every delimiter.
+        for i in range(len(data)):
+            parser.feed(data[i:i + 1])
+        parser.close()
+        return args, files
+
+    def test_incremental(self):
+        args, files = self.parse(self.data % b"Foo\r\n--123")
+        self.assertEqual(args, {"argument": [b"value"]})
+        file = files["files"][0]
+        self.assertEqual(file.filename, "ab.txt")
+        self.assertEqual(file.body, b"Foo\r\n--123")
+        self.assertNotIn("file", file)
+        self.assertEqual(file.read(3), b"Foo")
+
+    def test_spool(self):
+        args, files = self.parse(self.data % (b"x" * 1000), spool_size=100)
+        self.assertEqual(args, {"argument": [b"value"]})
+        file = files["files"][0]
+        self.assertIn("file", file)
+        self.assertEqual(file.read(), b"x" * 1000)
+        self.assertEqual(file["body"], b"x" * 1000)
+        file.close()
+
+    def test_malformed_parts(self):
+        # Each bad part is skipped, even when its headers run into the
+        # next part.
+        data = b"""\
+--1234
+Content-Disposition: form-data; name="a"
+foo
+--1234
+Content-Disposition: form-data; name="b"
+X-Foo: \xff
+
+bar
+--1234
+--1234
+Content-Disposition: form-data; name="c"
+
+baz
+--1234--""".replace(b"\n", b"\r\n")
+        with ExpectLog(gen_log, "multipart/form-data"):
+            args, files = self.parse(data)
+        self.assertEqual(args, {"c": [b"baz"]})
+
+    def test_no_final_boundary(self):
+        data = (self.data % (b"x" * 1000))[:-4]
+        with ExpectLog(gen_log, "Invalid multipart/form-data"):
+            args, files = self.parse(data, spool_size=100)
+        self.assertEqual(args, {})
+        self.assertEqual(files, {})
+
+
 class HTTPHeadersTest(unittest.TestCase):
     def test_multi_line(self):
         # Lines beginning with whitespace are appended to the previous line
@@ -229,6 +333,104 @@ Foo: even
                           ("Foo", "even more lines")])
 
 
+class RequestHeadParserMixin(object):
+    # Subclasses should define self.parse(data), returning the same
+    # thing as _parse_request_head_python.
+    def build_headers(self, pairs):
+        headers = HTTPHeaders()
+        headers._add_pairs(pairs)
+        return headers
+
+    def test_simple(self):
+        method, uri, version, pairs = self.parse(
+            b"GET /foo?a=b HTTP/1.1\r\nHost: example.com\r\n"
+            b"content-length: 0\r\nX-Empty:\r\n\r\n")
+        self.assertEqual((method, uri, version),
+                         ("GET", "/foo?a=b", "HTTP/1.1"))
+        headers = self.build_headers(pairs)
+        self.assertEqual(sorted(headers.get_all()),
+                         [("Content-Length", "0"), ("Host", "example.com"),
+                          ("X-Empty", "")])
+
+    def test_multi_line(self):
+        method, uri, version, pairs = self.parse(b"""\
+GET / HTTP/1.1
+Foo: bar
+ baz
+Asdf: qwer
+\tzxcv
+Foo: even
+     more
+     lines
+
+""".replace(b"\n", b"\r\n"))
+        headers = self.build_headers(pairs)
+        self.assertEqual(headers["asdf"], "qwer zxcv")
+        self.assertEqual(headers["Foo"], "bar baz,even more lines")
+        self.assertEqual(headers.get_list("foo"), ["bar baz", "even more lines"])
+
+    def test_latin1(self):
+        method, uri, version, pairs = self.parse(
+            b"GET /\xe9 HTTP/1.1\r\nX-Name:  caf\xe9 \r\n\r\n")
+        self.assertEqual(pairs, [("X-Name", native_str(u("caf\xe9")))])
+        self.assertEqual(uri, native_str(u("/\xe9")))
+
+    def test_line_breaks(self):
+        # Header lines are split as by splitlines() on the native str
+        # type, which on Python 3 also breaks on some control characters.
+        method, uri, version, pairs = self.parse(
+            b"GET / HTTP/1.1\r\nA: 1\x0bB: 2\x0cC: 3\x1cD: 4\x85E: 5\r"
+            b"F: 6\nG: 7\r\n\r\n")
+        if bytes is str:
+            expected = [("A", native_str(u("1\x0bB: 2\x0cC: 3\x1cD: 4"
+                                           "\x85E: 5")))]
+        else:
+            expected = [("A", "1"), ("B", "2"), ("C", "3"), ("D", "4"),
+                        ("E", "5")]
+        self.assertEqual(pairs, expected + [("F", "6"), ("G", "7")])
+
+    def test_malformed(self):
+        for data, message in [
+                (b"GET /\r\n\r\n", "Malformed HTTP request line"),
+                (b"GET / x HTTP/1.1\r\n\r\n", "Malformed HTTP request line"),
+                (b"GET / FTP/1.1\r\n\r\n", "Malformed HTTP version"),
+                (b"GET / HTTP/1.1\r\nFoo\r\n\r\n", "Malformed HTTP headers"),
+                (b"GET / HTTP/1.1\r\n bar\r\n\r\n", "Malformed HTTP headers")]:
+            with self.assertRaises(ValueError) as cm:
+                self.parse(data)
+            self.assertTrue(str(cm.exception).startswith(message),
+                            (data, cm.exception))
+
+
+class PythonRequestHeadParserTest(RequestHeadParserMixin, unittest.TestCase):
+    def parse(self, data):
+        return _parse_request_head_python(data)
+
+
+@unittest.skipIf(speedups is None or
+                 not hasattr(speedups, "parse_request_head"),
+                 "tornado.speedups module not present")
+class CRequestHeadParserTest(RequestHeadParserMixin, unittest.TestCase):
+    def parse(self, data):
+        return speedups.parse_request_head(data)
+
+    def test_matches_python(self):
+        def result(parse, data):
+            try:
+                return parse(data)
+            except ValueError as e:
+                return str(e)
+        for c in b"\r\n\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0 \t":
+            c = bytes(bytearray([c]))
+            for data in [b"GET / HTTP/1.1\r\nA: 1" + c + b"B: 2\r\n\r\n",
+                         b"GET / HTTP/1.1\r\nA: 1\r\n" + c + b"B: 2\r\n",
+                         b"GET / HTTP/1.1\r\n" + c + b"A: 1" + c + c,
+                         b"GET / HTTP/1.1" + c + b"A: 1\r\n\r\n"]:
+                self.assertEqual(result(self.parse, data),
+                                 result(_parse_request_head_python, data),
+                                 data)
+
+
 class FormatTimestampTest(unittest.TestCase):
     # Make sure that all the input types are supported.
     TIMESTAMP = 1359312200.503611
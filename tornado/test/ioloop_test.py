@@ -5,15 +5,16 @@ from __future__ import absolute_import, division, print_function, with_statement
 import contextlib
 import datetime
 import functools
+import select
 import socket
 import sys
 import threading
 import time
 
 from tornado import gen
-from tornado.ioloop import IOLoop, TimeoutError
+from tornado.ioloop import IOLoop, PollIOLoop, TimeoutError, _TimingWheel, _WheelTimeout, _CallbackTimings
 from tornado.stack_context import ExceptionStackContext, StackContext, wrap, NullContext
-from tornado.testing import AsyncTestCase, bind_unused_port
+from tornado.testing import AsyncTestCase, ExpectLog, bind_unused_port
 from tornado.test.util import unittest, skipIfNonUnix, skipOnTravis
 
 try:
@@ -54,6 +55,28 @@ class TestIOLoop(AsyncTestCase):
         self.assertAlmostEqual(time.time(), self.stop_time, places=2)
         thread.join()
 
+    def test_add_callback_many_threads(self):
+        # Callbacks from several threads racing with the IOLoop draining
+        # its queue must all run, and must wake the IOLoop up.
+        count = [0]
+        total = 4 * 500
+
+        def callback():
+            count[0] += 1
+            if count[0] == total:
+                self.stop()
+
+        def target():
+            for i in range(500):
+                self.io_loop.add_callback(callback)
+        threads = [threading.Thread(target=target) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        self.wait()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(count[0], total)
+
     def test_add_timeout_timedelta(self):
         self.io_loop.add_timeout(datetime.timedelta(microseconds=1), self.stop)
         self.wait()
@@ -190,6 +213,92 @@ class TestIOLoopCurrent(unittest.TestCase):
         self.assertIs(self.current_io_loop, self.io_loop)
 
 
+@skipIfNonUnix
+class TestWaker(unittest.TestCase):
+    def check_waker(self, waker):
+        try:
+            waker.wake()
+            waker.wake()
+            self.assertEqual(select.select([waker.fileno()], [], [], 0)[0],
+                             [waker.fileno()])
+            waker.consume()
+            self.assertEqual(select.select([waker.fileno()], [], [], 0)[0],
+                             [])
+            # Consuming when there's nothing to read is harmless.
+            waker.consume()
+            waker.wake()
+            self.assertEqual(select.select([waker.fileno()], [], [], 0)[0],
+                             [waker.fileno()])
+        finally:
+            waker.close()
+
+    def check_concurrent_wakes(self, waker, num_threads=4, num_wakes=2000):
+        # Mimic add_callback from several threads: each producer adds
+        # work and wakes the waker, while this thread runs the work and
+        # polls the way the IOLoop does.  A lost wakeup makes the poll
+        # time out with work still pending.
+        lock = threading.Lock()
+        pending = [0]
+
+        def produce():
+            for i in range(num_wakes):
+                with lock:
+                    pending[0] += 1
+                waker.wake()
+                # Give the consumer a chance to go idle.
+                time.sleep(0)
+        threads = [threading.Thread(target=produce)
+                   for i in range(num_threads)]
+        old_interval = None
+        if hasattr(sys, 'setswitchinterval'):
+            old_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            done = 0
+            while done < num_threads * num_wakes:
+                with lock:
+                    done += pending[0]
+                    pending[0] = 0
+                if done == num_threads * num_wakes:
+                    break
+                poll_timeout = 0 if pending[0] else 5
+                if select.select([waker.fileno()], [], [], poll_timeout)[0]:
+                    waker.consume()
+                elif poll_timeout:
+                    self.fail("lost wakeup with %d of %d done" %
+                              (done, num_threads * num_wakes))
+        finally:
+            if old_interval is not None:
+                sys.setswitchinterval(old_interval)
+            for thread in threads:
+                thread.join()
+            waker.close()
+
+    def test_pipe_waker(self):
+        from tornado.platform.posix import Waker
+        self.check_waker(Waker())
+
+    def test_eventfd_waker(self):
+        from tornado.platform.posix import EventFDWaker
+        if not EventFDWaker.available():
+            raise unittest.SkipTest("eventfd not available")
+        waker = EventFDWaker()
+        self.assertIs(waker.write_fileno(), None)
+        self.check_waker(waker)
+
+    def test_pipe_waker_concurrent(self):
+        from tornado.platform.posix import Waker
+        self.check_concurrent_wakes(Waker())
+
+    def test_eventfd_waker_concurrent(self):
+        from tornado.platform.posix import EventFDWaker
+        if not EventFDWaker.available():
+            raise unittest.SkipTest("eventfd not available")
+        self.check_concurrent_wakes(EventFDWaker())
+
+
 class TestIOLoopAddCallback(AsyncTestCase):
     def setUp(self):
         super(TestIOLoopAddCallback, self).setUp()
@@ -289,6 +398,369 @@ class TestIOLoopFutures(AsyncTestCase):
         self.assertEqual(self.future.exception().args[0], "worker")
 
 
+class TestTimingWheel(unittest.TestCase):
+    def setUp(self):
+        self.io_loop = IOLoop()
+        self.wheel = _TimingWheel(0.01, 100.0)
+
+    def tearDown(self):
+        self.io_loop.close()
+
+    def add(self, deadline):
+        timeout = _WheelTimeout(deadline, lambda: None, self.io_loop)
+        self.wheel.add(timeout)
+        return timeout
+
+    def test_expire_in_order(self):
+        timeouts = [self.add(100.0 + d) for d in (0.5, 0.05, 3, 0.051)]
+        self.assertEqual(len(self.wheel), 4)
+        self.assertEqual(self.wheel.expire(100.04), [])
+        self.assertEqual(self.wheel.expire(100.06),
+                         [timeouts[1], timeouts[3]])
+        self.assertEqual(self.wheel.expire(110.0),
+                         [timeouts[0], timeouts[2]])
+        self.assertEqual(len(self.wheel), 0)
+        self.assertIs(self.wheel.next_deadline(), None)
+
+    def test_never_early(self):
+        deadlines = [100.0 + i * 0.0037 for i in range(1000)]
+        for deadline in deadlines:
+            self.add(deadline)
+        now = 100.0
+        expired = []
+        while self.wheel:
+            now += 0.013
+            for timeout in self.wheel.expire(now):
+                self.assertTrue(timeout.deadline <= now)
+                self.assertTrue(timeout.deadline > now - 0.013 - 0.01)
+                expired.append(timeout.deadline)
+        self.assertEqual(expired, deadlines)
+
+    def test_remove(self):
+        first = self.add(100.5)
+        second = self.add(100.5)
+        far = self.add(100000.0)
+        self.wheel.remove(first)
+        self.wheel.remove(far)
+        # Removing twice is harmless.
+        self.wheel.remove(far)
+        self.assertEqual(len(self.wheel), 1)
+        self.assertEqual(self.wheel.expire(101), [second])
+        self.wheel.remove(second)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_next_deadline(self):
+        self.add(100.0 + 0.3)
+        self.assertAlmostEqual(self.wheel.next_deadline(), 100.3)
+        self.add(100.0 + 3600)
+        # The far timeout is in an outer wheel, so it doesn't affect
+        # the next deadline until it is cascaded inwards.
+        self.assertAlmostEqual(self.wheel.next_deadline(), 100.3)
+        self.assertEqual(len(self.wheel.expire(100.3)), 1)
+        deadline = self.wheel.next_deadline()
+        self.assertTrue(100.3 < deadline <= 3700.0)
+        self.assertEqual(self.wheel.expire(3699.9), [])
+        self.assertEqual(len(self.wheel.expire(3700.0)), 1)
+        self.assertIs(self.wheel.next_deadline(), None)
+
+    def test_distant_deadline(self):
+        timeout = self.add(100.0 + 10 ** 9)
+        self.assertEqual(self.wheel.expire(100.0 + 10 ** 8), [])
+        self.assertEqual(len(self.wheel), 1)
+        self.assertEqual(self.wheel.expire(100.0 + 10 ** 9), [timeout])
+
+
+class TestIOLoopTimerWheel(AsyncTestCase):
+    def get_new_ioloop(self):
+        return IOLoop(timer_resolution=0.005)
+
+    def setUp(self):
+        super(TestIOLoopTimerWheel, self).setUp()
+        if not isinstance(self.io_loop, PollIOLoop):
+            raise unittest.SkipTest("timer wheel requires PollIOLoop")
+
+    def test_timeouts(self):
+        results = []
+        now = self.io_loop.time()
+        self.io_loop.add_timeout(now + 0.02, lambda: results.append(2))
+        self.io_loop.add_timeout(now + 0.01, lambda: results.append(1))
+        cancelled = self.io_loop.add_timeout(now + 0.015,
+                                             lambda: results.append(None))
+        self.io_loop.add_timeout(datetime.timedelta(seconds=0.03), self.stop)
+        self.io_loop.remove_timeout(cancelled)
+        self.wait()
+        self.assertEqual(results, [1, 2])
+
+    def test_remove_from_earlier_callback(self):
+        # Both timeouts expire in the same tick; the first one cancels
+        # the second.
+        now = self.io_loop.time()
+        handles = []
+
+        def first():
+            self.io_loop.remove_timeout(handles[1])
+            self.io_loop.add_timeout(self.io_loop.time() + 0.01, self.stop)
+        handles.append(self.io_loop.add_timeout(now, first))
+        handles.append(self.io_loop.add_timeout(now + 0.001,
+                                                lambda: 1 / 0))
+        self.wait()
+
+
+class TimerSlackTestMixin(object):
+    def setUp(self):
+        super(TimerSlackTestMixin, self).setUp()
+        if not isinstance(self.io_loop, PollIOLoop):
+            raise unittest.SkipTest("timer slack requires PollIOLoop")
+
+    def run_timeouts(self, **kwargs):
+        iterations = []
+        self.io_loop.enable_stats(iterations.append)
+        now = self.io_loop.time()
+        late = []
+
+        def callback(deadline):
+            late.append(self.io_loop.time() - deadline)
+            if len(late) == 10:
+                self.stop()
+        for i in range(10):
+            deadline = now + i * 0.002
+            self.io_loop.add_timeout(deadline,
+                                     functools.partial(callback, deadline),
+                                     **kwargs)
+        self.wait()
+        self.assertTrue(min(late) >= 0)
+        # Ten deadlines spread over 20ms run in no more than two
+        # wakeups (one if they all fall in the same 50ms window).
+        return len([i for i in iterations if i['timeouts']])
+
+    def check_order(self, **kwargs):
+        # Deadlines made equal by the slack still run in order.
+        results = []
+        now = self.io_loop.time()
+        for i in range(5):
+            self.io_loop.add_timeout(now + i * 0.001,
+                                     functools.partial(results.append, i),
+                                     **kwargs)
+        for i in range(5, 10):
+            # Equal deadlines run in the order they were added.
+            self.io_loop.add_timeout(now + 0.005,
+                                     functools.partial(results.append, i),
+                                     **kwargs)
+        self.io_loop.add_timeout(now + 0.005, self.stop, **kwargs)
+        self.wait()
+        self.assertEqual(results, list(range(10)))
+
+
+class TestIOLoopTimerSlack(TimerSlackTestMixin, AsyncTestCase):
+    def get_new_ioloop(self):
+        return IOLoop(timer_slack=0.05)
+
+    def test_default_slack(self):
+        self.assertTrue(self.run_timeouts() <= 2)
+
+    def test_order(self):
+        self.check_order()
+
+    def test_negative_slack(self):
+        self.assertRaises(ValueError, IOLoop, timer_slack=-1)
+
+
+class TestIOLoopPerCallSlack(TimerSlackTestMixin, AsyncTestCase):
+    def get_new_ioloop(self):
+        # Override any default given with --ioloop_timer_slack.
+        return IOLoop(timer_slack=0)
+
+    def test_per_call_slack(self):
+        self.assertTrue(self.run_timeouts(slack=0.05) <= 2)
+
+    def test_order(self):
+        self.check_order(slack=0.05)
+
+
+class TestIOLoopTimerWheelSlack(TimerSlackTestMixin, AsyncTestCase):
+    def get_new_ioloop(self):
+        return IOLoop(timer_resolution=0.005, timer_slack=0.05)
+
+    def test_order(self):
+        self.check_order()
+
+
+class TestIOLoopStats(AsyncTestCase):
+    def setUp(self):
+        super(TestIOLoopStats, self).setUp()
+        if not isinstance(self.io_loop, PollIOLoop):
+            raise unittest.SkipTest("stats require PollIOLoop")
+
+    def test_disabled_by_default(self):
+        self.assertIs(self.io_loop.get_stats(), None)
+
+    def test_stats(self):
+        iterations = []
+        self.io_loop.enable_stats(iterations.append)
+        self.io_loop.add_callback(lambda: None)
+        self.io_loop.add_callback(lambda: None)
+        self.io_loop.add_timeout(self.io_loop.time() + 3600, lambda: None)
+        self.io_loop.add_timeout(self.io_loop.time(), self.stop)
+        self.wait()
+        stats = self.io_loop.get_stats()
+        self.assertEqual(stats['pending_timeouts'], 1)
+        self.assertTrue(stats['iterations'] >= 1)
+        self.assertEqual(stats['iterations'], len(iterations))
+        self.assertEqual(stats['callbacks'],
+                         sum(i['callbacks'] for i in iterations))
+        self.assertTrue(stats['callbacks'] >= 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertTrue(stats['max_lag'] >= 0)
+        for key in ('poll_time', 'callback_time', 'timeout_time',
+                    'handler_time'):
+            self.assertTrue(stats[key] >= 0)
+        self.io_loop.disable_stats()
+        self.assertIs(self.io_loop.get_stats(), None)
+
+    @skipIfNonUnix
+    def test_ready_fds(self):
+        client, server = socket.socketpair()
+        try:
+            self.io_loop.enable_stats()
+            self.io_loop.add_handler(client.fileno(),
+                                     lambda fd, events: self.stop(),
+                                     IOLoop.READ)
+            server.send(b'x')
+            self.wait()
+            self.io_loop.remove_handler(client.fileno())
+            self.assertTrue(self.io_loop.get_stats()['ready_fds'] >= 1)
+        finally:
+            client.close()
+            server.close()
+
+
+class _RecordingPoller(object):
+    def __init__(self, impl):
+        self.impl = impl
+        self.modified = []
+
+    def modify(self, fd, events):
+        self.modified.append((fd, events))
+        self.impl.modify(fd, events)
+
+    def __getattr__(self, name):
+        return getattr(self.impl, name)
+
+
+@skipIfNonUnix
+class TestIOLoopUpdateHandler(AsyncTestCase):
+    def setUp(self):
+        super(TestIOLoopUpdateHandler, self).setUp()
+        if not isinstance(self.io_loop, PollIOLoop):
+            raise unittest.SkipTest("requires PollIOLoop")
+        self.poller = self.io_loop._impl = _RecordingPoller(
+            self.io_loop._impl)
+        self.client, self.server = socket.socketpair()
+        self.events = []
+        self.io_loop.add_handler(self.client.fileno(), self.handle_events,
+                                 IOLoop.READ)
+
+    def tearDown(self):
+        self.io_loop.remove_handler(self.client.fileno())
+        self.io_loop._impl = self.poller.impl
+        self.client.close()
+        self.server.close()
+        super(TestIOLoopUpdateHandler, self).tearDown()
+
+    def handle_events(self, fd, events):
+        self.events.append(events)
+        self.io_loop.update_handler(fd, IOLoop.READ)
+        self.stop()
+
+    def test_collapse_updates(self):
+        fd = self.client.fileno()
+        for i in range(10):
+            self.io_loop.update_handler(fd, IOLoop.READ)
+            self.io_loop.update_handler(fd, IOLoop.READ | IOLoop.WRITE)
+        self.assertEqual(self.poller.modified, [])
+        self.wait()
+        self.assertEqual(self.poller.modified,
+                         [(fd, IOLoop.READ | IOLoop.WRITE | IOLoop.ERROR)])
+        self.assertEqual(self.events, [IOLoop.WRITE])
+
+    def test_skip_noop_updates(self):
+        fd = self.client.fileno()
+        self.io_loop.update_handler(fd, IOLoop.WRITE)
+        self.io_loop.update_handler(fd, IOLoop.READ)
+        self.io_loop.add_callback(self.server.send, b'x')
+        self.wait()
+        self.assertEqual(self.poller.modified, [])
+        self.assertEqual(self.events, [IOLoop.READ])
+
+
+def slow_callback():
+    time.sleep(0.02)
+
+
+class TestIOLoopCallbackTiming(AsyncTestCase):
+    def setUp(self):
+        super(TestIOLoopCallbackTiming, self).setUp()
+        if not isinstance(self.io_loop, PollIOLoop):
+            raise unittest.SkipTest("callback timing requires PollIOLoop")
+
+    def test_disabled_by_default(self):
+        self.assertIs(self.io_loop.get_callback_timings(), None)
+
+    def test_timings(self):
+        self.io_loop.enable_callback_timing(log_threshold=0.01)
+        with ExpectLog('tornado.general', 'Callback .*slow_callback took'):
+            self.io_loop.add_callback(slow_callback)
+            self.io_loop.add_callback(functools.partial(slow_callback))
+            self.io_loop.add_timeout(self.io_loop.time() + 0.01,
+                                     wrap(self.stop))
+            self.wait()
+        timings = self.io_loop.get_callback_timings()
+        self.assertEqual(timings[0]['name'],
+                         'tornado.test.ioloop_test.slow_callback')
+        self.assertEqual(timings[0]['count'], 2)
+        self.assertTrue(timings[0]['max_time'] >= 0.02)
+        self.assertTrue(timings[0]['total_time'] >= 0.04)
+        histogram = dict(timings[0]['histogram'])
+        self.assertEqual(histogram[0.1], 2)
+        self.assertEqual(sum(histogram.values()), 2)
+        self.assertEqual(len(self.io_loop.get_callback_timings(limit=1)), 1)
+        self.io_loop.disable_callback_timing()
+        self.assertIs(self.io_loop.get_callback_timings(), None)
+
+    def test_callback_names(self):
+        # Names are cached by code object, so every way of wrapping the
+        # same function must still land in one entry.
+        timings = _CallbackTimings(None)
+        other = TestIOLoopCallbackTiming('test_callback_names')
+        for callback in [self.stop, other.stop, functools.partial(self.stop),
+                         wrap(functools.partial(other.stop)), slow_callback,
+                         wrap(slow_callback), len]:
+            timings.record(callback, 0)
+        counts = sorted((t['count'], t['name'].rsplit('.', 1)[-1])
+                        for t in timings.report(None))
+        self.assertEqual(counts, [(1, 'len'), (2, 'slow_callback'),
+                                  (4, 'stop')])
+
+    @skipIfNonUnix
+    def test_handler_timing(self):
+        client, server = socket.socketpair()
+        try:
+            def handle_read(fd, events):
+                self.stop()
+            self.io_loop.enable_callback_timing()
+            self.io_loop.add_handler(client.fileno(), handle_read,
+                                     IOLoop.READ)
+            server.send(b'x')
+            self.wait()
+            self.io_loop.remove_handler(client.fileno())
+            names = [t['name'] for t in self.io_loop.get_callback_timings()]
+            self.assertTrue(any(name.endswith('handle_read')
+                                for name in names), names)
+        finally:
+            client.close()
+            server.close()
+
+
 class TestIOLoopRunSync(unittest.TestCase):
     def setUp(self):
         self.io_loop = IOLoop()
@@ -1,7 +1,7 @@
 from __future__ import absolute_import, division, print_function, with_statement
 from tornado import netutil
 from tornado.ioloop import IOLoop
-from tornado.iostream import IOStream, SSLIOStream, PipeIOStream
+from tornado.iostream import IOStream, SSLIOStream, PipeIOStream, StreamClosedError, StreamBufferFullError, StreamStatsCollector, UnsatisfiableReadError, get_read_chunk_stats
 from tornado.log import gen_log, app_log
 from tornado.netutil import ssl_wrap_socket
 from tornado.stack_context import NullContext
@@ -12,9 +12,11 @@ import errno
 import logging
 import os
 import platform
+import select
 import socket
 import ssl
 import sys
+import tempfile
 
 
 class HelloHandler(RequestHandler):
@@ -160,7 +162,9 @@ class TestIOStreamMixin(object):
         self.wait()
         # As a side effect, the stream is now listening for connection
         # close (if it wasn't already), but is not listening for writes
-        self.assertEqual(server._state, IOLoop.READ | IOLoop.ERROR)
+        # (unless it is edge-triggered and always listens for both)
+        if not self.io_loop.edge_triggered:
+            self.assertEqual(server._state, IOLoop.READ | IOLoop.ERROR)
         server.close()
         client.close()
 
@@ -307,7 +311,8 @@ class TestIOStreamMixin(object):
         #
         # This depends on the read_chunk_size being smaller than the
         # OS socket buffer, so make it small.
-        server, client = self.make_iostream_pair(read_chunk_size=256)
+        server, client = self.make_iostream_pair(read_chunk_size=256,
+                                                 max_read_chunk_size=256)
         try:
             server.write(b"A" * 512)
             client.read_bytes(256, self.stop)
@@ -386,6 +391,398 @@ class TestIOStreamMixin(object):
             server.close()
             client.close()
 
+    def test_pipelined_read_until(self):
+        # Many small reads from one large buffered chunk.
+        server, client = self.make_iostream_pair()
+        try:
+            lines = [("line %d\r\n" % i).encode() for i in range(1000)]
+            client.write(b"".join(lines) + b"tail")
+            for line in lines:
+                server.read_until(b"\r\n", self.stop)
+                self.assertEqual(self.wait(), line)
+            server.read_bytes(4, self.stop)
+            self.assertEqual(self.wait(), b"tail")
+            self.assertEqual(server._read_buffer_size, 0)
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_until_regex_pipelined(self):
+        server, client = self.make_iostream_pair()
+        try:
+            client.write(b"a1b22c333d")
+            for expected in [b"a1", b"b22", b"c333"]:
+                server.read_until_regex(b"[0-9]+", self.stop)
+                self.assertEqual(self.wait(), expected)
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_into(self):
+        server, client = self.make_iostream_pair()
+        try:
+            buf = bytearray(10)
+            server.read_into(buf, self.stop)
+            client.write(b"hello")
+            client.write(b" world!")
+            self.assertEqual(self.wait(), 10)
+            self.assertEqual(bytes(buf), b"hello worl")
+            # The leftover byte stays in the stream's own buffer.
+            server.read_bytes(2, self.stop)
+            client.write(b"?")
+            self.assertEqual(self.wait(), b"d!")
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_into_partial(self):
+        server, client = self.make_iostream_pair()
+        try:
+            buf = bytearray(10)
+            client.write(b"abc")
+            server.read_into(buf, self.stop, partial=True)
+            num_bytes = self.wait()
+            self.assertTrue(0 < num_bytes <= 3)
+            self.assertEqual(bytes(buf[:num_bytes]), b"abc"[:num_bytes])
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_into_buffered(self):
+        # Data already in the read buffer is copied before any new reads.
+        server, client = self.make_iostream_pair()
+        try:
+            client.write(b"header\r\nbody" + b"x" * 4096)
+            server.read_until(b"\r\n", self.stop)
+            self.assertEqual(self.wait(), b"header\r\n")
+            buf = bytearray(4100)
+            server.read_into(memoryview(buf), self.stop)
+            self.assertEqual(self.wait(), 4100)
+            self.assertEqual(bytes(buf), b"body" + b"x" * 4096)
+            self.assertEqual(server._read_buffer_size, 0)
+        finally:
+            server.close()
+            client.close()
+
+    def test_write_many_chunks(self):
+        # Lots of small writes plus a large one; the socket buffer fills
+        # up part way through, so the next send has to resume from the
+        # middle of a chunk.
+        server, client = self.make_iostream_pair()
+        try:
+            chunks = [("%d," % i).encode() for i in range(5000)]
+            chunks.append(b"".join(chunks) * 50)
+            for chunk in chunks:
+                server.write(chunk)
+            expected = b"".join(chunks)
+            client.read_bytes(len(expected), self.stop)
+            self.assertEqual(self.wait(), expected)
+            self.assertFalse(server.writing())
+            self.assertEqual(server._write_buffer_pos, 0)
+        finally:
+            server.close()
+            client.close()
+
+    def test_write_file(self):
+        server, client = self.make_iostream_pair()
+        data = b"".join(("%d," % i).encode() for i in range(100000))
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            try:
+                server.write(b"head")
+                server.write_file(os.fdopen(os.dup(f.fileno()), "rb"),
+                                  10, len(data) - 20)
+                server.write(b"tail")
+                expected = b"head" + data[10:-10] + b"tail"
+                client.read_bytes(len(expected), self.stop)
+                self.assertEqual(self.wait(), expected)
+                # The whole file, with a callback.
+                written = []
+                f2 = os.fdopen(os.dup(f.fileno()), "rb")
+                server.write_file(f2, callback=lambda: written.append(True))
+                client.read_bytes(len(data), self.stop)
+                self.assertEqual(self.wait(), data)
+                self.assertEqual(written, [True])
+                self.assertTrue(f2.closed)
+            finally:
+                server.close()
+                client.close()
+
+    def test_write_file_closed(self):
+        # The stream closes any files that haven't been written yet.
+        server, client = self.make_iostream_pair()
+        with tempfile.TemporaryFile() as f:
+            f.write(b"x" * (1024 * 1024))
+            f.flush()
+            try:
+                files = [os.fdopen(os.dup(f.fileno()), "rb") for i in range(5)]
+                for f2 in files:
+                    server.write_file(f2)
+            finally:
+                server.close()
+                client.close()
+            self.assertTrue(all(f2.closed for f2 in files))
+
+    def test_read_until_split_delimiter(self):
+        # A delimiter split across several reads is still found even
+        # though earlier data is not searched again.
+        server, client = self.make_iostream_pair()
+        try:
+            results = []
+            server.read_until(b"\r\n\r\n", results.append)
+            for piece in [b"GET / HTTP/1.1\r", b"\n", b"Host: x\r\n\r",
+                          b"\nnext"]:
+                self.assertEqual(results, [])
+                client.write(piece)
+                self.io_loop.add_timeout(self.io_loop.time() + 0.01,
+                                         self.stop)
+                self.wait()
+            while not results:
+                self.io_loop.add_timeout(self.io_loop.time() + 0.01,
+                                         self.stop)
+                self.wait()
+            self.assertEqual(results,
+                             [b"GET / HTTP/1.1\r\nHost: x\r\n\r\n"])
+            server.read_bytes(4, self.stop)
+            self.assertEqual(self.wait(), b"next")
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_until_max_bytes(self):
+        server, client = self.make_iostream_pair()
+        server.set_close_callback(lambda: self.stop("closed"))
+        try:
+            # Extra room under the limit is fine.
+            client.write(b"abcdef\r\n")
+            server.read_until(b"\r\n", self.stop, max_bytes=50)
+            self.assertEqual(self.wait(), b"abcdef\r\n")
+            # Not enough room for the whole delimiter.
+            client.write(b"abcdef\r\n")
+            with ExpectLog(gen_log, "Unsatisfiable read"):
+                server.read_until(b"\r\n", self.stop, max_bytes=7)
+                self.assertEqual(self.wait(), "closed")
+            self.assertTrue(isinstance(server.error, UnsatisfiableReadError))
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_until_max_bytes_exceeded_closes(self):
+        # More than max_bytes without the delimiter closes the stream
+        # as soon as they arrive, without waiting for more data.
+        server, client = self.make_iostream_pair()
+        server.set_close_callback(lambda: self.stop("closed"))
+        try:
+            server.read_until(b"\r\n", self.stop, max_bytes=5)
+            with ExpectLog(gen_log, "Unsatisfiable read"):
+                client.write(b"1234567890")
+                self.assertEqual(self.wait(), "closed")
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_until_regex_after_partial_consume(self):
+        # Patterns see only the unread data, as if it were the whole
+        # string, even when part of the buffer has been consumed.
+        server, client = self.make_iostream_pair()
+        try:
+            for regex in [b"^abc", b"(?<!z)abc"]:
+                client.write(b"xyzabc")
+                server.read_until(b"xyz", self.stop)
+                self.assertEqual(self.wait(), b"xyz")
+                server.read_until_regex(regex, self.stop)
+                self.assertEqual(self.wait(), b"abc")
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_until_regex_max_bytes(self):
+        server, client = self.make_iostream_pair()
+        server.set_close_callback(lambda: self.stop("closed"))
+        try:
+            client.write(b"abcdef\r\n")
+            server.read_until_regex(b"\r\n", self.stop, max_bytes=50)
+            self.assertEqual(self.wait(), b"abcdef\r\n")
+            client.write(b"abcdef\r\n")
+            with ExpectLog(gen_log, "Unsatisfiable read"):
+                server.read_until_regex(b"\r\n", self.stop, max_bytes=7)
+                self.assertEqual(self.wait(), "closed")
+        finally:
+            server.close()
+            client.close()
+
+    def test_wait_for_drain(self):
+        server, client = self.make_iostream_pair(
+            write_high_water_mark=64 * 1024)
+        try:
+            future = server.wait_for_drain()
+            self.assertTrue(future.done())
+            # More than the kernel's socket buffers will take.
+            data = b"x" * (16 * 1024 * 1024)
+            server.write(data)
+            self.assertTrue(server.get_write_buffer_size() > 64 * 1024)
+            future = server.wait_for_drain()
+            self.assertFalse(future.done())
+            client.read_bytes(len(data), lambda data: None,
+                              streaming_callback=lambda chunk: None)
+            self.io_loop.add_future(future, self.stop)
+            self.assertIs(self.wait().result(), None)
+            self.assertTrue(server.get_write_buffer_size() <= 16 * 1024)
+        finally:
+            server.close()
+            client.close()
+
+    def test_wait_for_drain_closed(self):
+        server, client = self.make_iostream_pair()
+        try:
+            server.write(b"x" * (16 * 1024 * 1024))
+            future = server.wait_for_drain()
+            self.assertFalse(future.done())
+            server.close()
+            self.assertTrue(isinstance(future.exception(), StreamClosedError))
+        finally:
+            server.close()
+            client.close()
+
+    def test_max_write_buffer_size(self):
+        server, client = self.make_iostream_pair(
+            max_write_buffer_size=1024 * 1024)
+        try:
+            server.write(b"x" * 512 * 1024)
+            with ExpectLog(gen_log, "Reached maximum write buffer size"):
+                self.assertRaises(StreamBufferFullError, server.write,
+                                  b"x" * (16 * 1024 * 1024))
+            self.assertTrue(server.closed())
+            self.assertTrue(isinstance(server.error, StreamBufferFullError))
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_chunk_size_adapts(self):
+        server, client = self.make_iostream_pair()
+        try:
+            totals = get_read_chunk_stats()
+            data = b"x" * (1024 * 1024)
+            server.write(data)
+            client.read_bytes(len(data), self.stop)
+            self.assertEqual(self.wait(), data)
+            stats = client.get_read_chunk_stats()
+            self.assertTrue(stats["grows"] > 0, stats)
+            self.assertTrue(stats["read_chunk_size"] > 4096, stats)
+            self.assertEqual(stats["bytes"], len(data))
+            # Small reads shrink it back down.
+            for i in range(10):
+                server.write(b"y")
+                client.read_bytes(1, self.stop)
+                self.assertEqual(self.wait(), b"y")
+            stats = client.get_read_chunk_stats()
+            self.assertTrue(stats["shrinks"] > 0, stats)
+            self.assertEqual(stats["read_chunk_size"], 4096)
+            new_totals = get_read_chunk_stats()
+            self.assertTrue(new_totals["bytes"] >=
+                            totals["bytes"] + len(data) + 10)
+        finally:
+            server.close()
+            client.close()
+
+    def test_cork(self):
+        server, client = self.make_iostream_pair()
+        try:
+            server.set_cork(True)
+            for i in range(100):
+                server.write(b"abcd")
+            # Nothing is sent until the IOLoop gets control back.
+            self.assertEqual(server.get_write_buffer_size(), 400)
+            server.write(b"", callback=self.stop)
+            self.wait()
+            self.assertEqual(server.get_write_buffer_size(), 0)
+            client.read_bytes(400, self.stop)
+            self.assertEqual(self.wait(), b"abcd" * 100)
+            # Uncorking sends anything still queued.
+            server.write(b"efgh")
+            server.set_cork(False)
+            self.assertEqual(server.get_write_buffer_size(), 0)
+            client.read_bytes(4, self.stop)
+            self.assertEqual(self.wait(), b"efgh")
+        finally:
+            server.close()
+            client.close()
+
+    def test_idle_buffers_released(self):
+        server, client = self.make_iostream_pair()
+        try:
+            server.write(b"abcd", callback=self.stop)
+            self.wait()
+            self.assertIs(server._write_buffer, None)
+            client.read_bytes(4, self.stop)
+            self.assertEqual(self.wait(), b"abcd")
+            self.assertIs(client._read_buffer, None)
+        finally:
+            server.close()
+            client.close()
+
+    def test_read_ahead_limited(self):
+        # A read_bytes doesn't pull everything the other side has sent
+        # into the read buffer; the rest stays in the socket.
+        server, client = self.make_iostream_pair(max_read_chunk_size=4096)
+        try:
+            server.write(b"a" * (1024 * 1024))
+            client.read_bytes(100, self.stop)
+            self.assertEqual(self.wait(), b"a" * 100)
+            self.assertTrue(client._read_buffer_size < 64 * 1024,
+                            client._read_buffer_size)
+            client.read_bytes(1024 * 1024 - 100, self.stop)
+            self.assertEqual(len(self.wait()), 1024 * 1024 - 100)
+        finally:
+            server.close()
+            client.close()
+
+    def test_stream_stats(self):
+        server, client = self.make_iostream_pair()
+        collector = StreamStatsCollector()
+        try:
+            self.assertIs(server.get_stats(), None)
+            server.enable_stats(collector)
+            client.enable_stats(collector)
+            server.write(b"abcd")
+            server.write(b"efgh", callback=self.stop)
+            self.wait()
+            client.read_bytes(8, self.stop)
+            self.assertEqual(self.wait(), b"abcdefgh")
+            stats = server.get_stats()
+            self.assertEqual(stats["bytes_written"], 8)
+            self.assertTrue(stats["writes"] >= 1, stats)
+            self.assertTrue(stats["max_write_buffer_size"] >= 4, stats)
+            stats = client.get_stats()
+            self.assertEqual(stats["bytes_read"], 8)
+            self.assertTrue(stats["reads"] >= 1, stats)
+            stats = collector.get_stats()
+            self.assertEqual(stats["open_streams"], 2)
+            self.assertEqual(stats["totals"]["bytes_read"], 8)
+            self.assertEqual(stats["distribution"]["bytes_read"]["max"], 8)
+            self.assertEqual(stats["distribution"]["bytes_read"]["min"], 0)
+            server.close()
+            stats = collector.get_stats()
+            self.assertEqual(stats["open_streams"], 1)
+            self.assertEqual(stats["closed_streams"], 1)
+            self.assertEqual(stats["totals"]["bytes_written"], 8)
+        finally:
+            server.close()
+            client.close()
+
+    def test_cork_close(self):
+        server, client = self.make_iostream_pair()
+        try:
+            server.set_cork(True)
+            server.write(b"abcd")
+            server.close()
+            client.read_until_close(self.stop)
+            self.assertEqual(self.wait(), b"abcd")
+        finally:
+            server.close()
+            client.close()
+
     def test_close_callback_with_pending_read(self):
         # Regression test for a bug that was introduced in 2.3
         # where the IOStream._close_callback would never be called
@@ -470,6 +867,13 @@ class TestIOStream(TestIOStreamMixin, AsyncTestCase):
         return IOStream(connection, **kwargs)
 
 
+@unittest.skipIf(not hasattr(select, 'epoll'), "epoll not available")
+class TestIOStreamEdgeTriggered(TestIOStream):
+    def get_new_ioloop(self):
+        from tornado.platform.epoll import EPollIOLoop
+        return EPollIOLoop(edge_triggered=True)
+
+
 class TestIOStreamSSL(TestIOStreamMixin, AsyncTestCase):
     def _make_server_iostream(self, connection, **kwargs):
         ssl_options = dict(
@@ -534,6 +938,57 @@ class TestPipeIOStream(AsyncTestCase):
 
         rs.close()
 
+    def test_pipe_iostream_read_into(self):
+        r, w = os.pipe()
+
+        rs = PipeIOStream(r, io_loop=self.io_loop)
+        ws = PipeIOStream(w, io_loop=self.io_loop)
+
+        buf = bytearray(5)
+        ws.write(b"hello world")
+        rs.read_into(buf, self.stop)
+        self.assertEqual(self.wait(), 5)
+        self.assertEqual(bytes(buf), b"hello")
+
+        rs.read_bytes(6, self.stop)
+        self.assertEqual(self.wait(), b" world")
+
+        ws.close()
+        rs.close()
+
+    def test_pipe_iostream_many_writes(self):
+        r, w = os.pipe()
+
+        rs = PipeIOStream(r, io_loop=self.io_loop)
+        ws = PipeIOStream(w, io_loop=self.io_loop)
+
+        chunks = [("%d," % i).encode() for i in range(50000)]
+        for chunk in chunks:
+            ws.write(chunk)
+        expected = b"".join(chunks)
+        rs.read_bytes(len(expected), self.stop)
+        self.assertEqual(self.wait(), expected)
+
+        ws.close()
+        rs.close()
+
+    def test_pipe_iostream_write_file(self):
+        r, w = os.pipe()
+
+        rs = PipeIOStream(r, io_loop=self.io_loop)
+        ws = PipeIOStream(w, io_loop=self.io_loop)
+
+        data = b"".join(("%d," % i).encode() for i in range(100000))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            ws.write_file(open(f.name, "rb"), 5)
+            rs.read_bytes(len(data) - 5, self.stop)
+            self.assertEqual(self.wait(), data[5:])
+
+        ws.close()
+        rs.close()
+
     def test_pipe_iostream_big_write(self):
         r, w = os.pipe()
 
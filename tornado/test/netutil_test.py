@@ -2,7 +2,7 @@ from __future__ import absolute_import, division, print_function, with_statement
 
 import socket
 
-from tornado.netutil import BlockingResolver, ThreadedResolver, is_valid_ip
+from tornado.netutil import BlockingResolver, ThreadedResolver, DefaultExecutorResolver, is_valid_ip, bind_sockets
 from tornado.testing import AsyncTestCase, gen_test
 from tornado.test.util import unittest
 
@@ -46,6 +46,16 @@ class BlockingResolverTest(AsyncTestCase, _ResolverTestMixin):
         self.resolver = BlockingResolver(io_loop=self.io_loop)
 
 
+class DefaultExecutorResolverTest(AsyncTestCase, _ResolverTestMixin):
+    def setUp(self):
+        super(DefaultExecutorResolverTest, self).setUp()
+        self.resolver = DefaultExecutorResolver(io_loop=self.io_loop)
+
+    def tearDown(self):
+        self.resolver.close()
+        super(DefaultExecutorResolverTest, self).tearDown()
+
+
 @unittest.skipIf(futures is None, "futures module not present")
 class ThreadedResolverTest(AsyncTestCase, _ResolverTestMixin):
     def setUp(self):
@@ -86,3 +96,20 @@ class IsValidIPTest(unittest.TestCase):
         self.assertTrue(not is_valid_ip(' '))
         self.assertTrue(not is_valid_ip('\n'))
         self.assertTrue(not is_valid_ip('\x00'))
+
+
+class BindSocketsTest(unittest.TestCase):
+    @unittest.skipIf(not hasattr(socket, "SO_REUSEPORT"),
+                     "SO_REUSEPORT not supported on this platform")
+    def test_reuse_port(self):
+        sockets = bind_sockets(0, '127.0.0.1', reuse_port=True)
+        port = sockets[0].getsockname()[1]
+        try:
+            sockets.extend(bind_sockets(port, '127.0.0.1', reuse_port=True))
+            self.assertEqual(len(sockets), 2)
+            for sock in sockets:
+                self.assertTrue(sock.getsockopt(socket.SOL_SOCKET,
+                                                socket.SO_REUSEPORT))
+        finally:
+            for sock in sockets:
+                sock.close()
@@ -94,6 +94,9 @@ if __name__ == '__main__':
            callback=AsyncHTTPClient.configure)
     define('ioloop', type=str, default=None)
     define('ioloop_time_monotonic', default=False)
+    define('ioloop_timer_resolution', type=float, default=None)
+    define('ioloop_timer_slack', type=float, default=None)
+    define('ioloop_edge_triggered', default=False)
     define('resolver', type=str, default=None,
            callback=Resolver.configure)
     define('debug_gc', type=str, multiple=True,
@@ -111,6 +114,12 @@ if __name__ == '__main__':
             if monotonic_time is None:
                 raise RuntimeError("monotonic clock not found")
             kwargs['time_func'] = monotonic_time
+        if options.ioloop_timer_resolution is not None:
+            kwargs['timer_resolution'] = options.ioloop_timer_resolution
+        if options.ioloop_timer_slack is not None:
+            kwargs['timer_slack'] = options.ioloop_timer_slack
+        if options.ioloop_edge_triggered:
+            kwargs['edge_triggered'] = True
         if options.ioloop or kwargs:
             IOLoop.configure(options.ioloop, **kwargs)
     add_parse_callback(configure_ioloop)
@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function, with_statement
 from tornado import gen
 from tornado.escape import json_decode, utf8, to_unicode, recursive_unicode, native_str, to_basestring
 from tornado.httputil import format_timestamp
+from tornado.ioloop import IOLoop
 from tornado.iostream import IOStream
 from tornado.log import app_log, gen_log
 from tornado.simple_httpclient import SimpleAsyncHTTPClient
@@ -9,7 +10,7 @@ from tornado.template import DictLoader
 from tornado.testing import AsyncHTTPTestCase, ExpectLog
 from tornado.test.util import unittest
 from tornado.util import u, bytes_type, ObjectDict, unicode_type
-from tornado.web import RequestHandler, authenticated, Application, asynchronous, url, HTTPError, StaticFileHandler, _create_signature, create_signed_value, ErrorHandler, UIModule, MissingArgumentError
+from tornado.web import RequestHandler, authenticated, Application, asynchronous, url, HTTPError, StaticFileHandler, _create_signature, create_signed_value, ErrorHandler, UIModule, MissingArgumentError, stream_request_body
 
 import binascii
 import datetime
@@ -17,8 +18,10 @@ import email.utils
 import logging
 import os
 import re
+import shutil
 import socket
 import sys
+import tempfile
 
 try:
     import urllib.parse as urllib_parse  # py3
@@ -1055,6 +1058,65 @@ class StaticFileTest(WebTestCase):
         self.assertEqual(response.code, 404)
 
 
+class StaticFileWriteFileTest(WebTestCase):
+    # Responses that the transforms leave alone are sent with
+    # HTTPRequest.write_file.
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.data = b"".join(utf8("%d\n" % i) for i in range(200000))
+        with open(os.path.join(self.static_dir, "big.bin"), "wb") as f:
+            f.write(self.data)
+        super(StaticFileWriteFileTest, self).setUp()
+
+    def tearDown(self):
+        super(StaticFileWriteFileTest, self).tearDown()
+        shutil.rmtree(self.static_dir)
+
+    def get_handlers(self):
+        return []
+
+    def get_app_kwargs(self):
+        return dict(static_path=self.static_dir, gzip=True)
+
+    def test_large_file(self):
+        response = self.fetch('/static/big.bin')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.body, self.data)
+        self.assertEqual(response.headers.get("Content-Length"),
+                         str(len(self.data)))
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_range(self):
+        response = self.fetch('/static/big.bin', headers={
+            'Range': 'bytes=100000-199999'})
+        self.assertEqual(response.code, 206)
+        self.assertEqual(response.body, self.data[100000:200000])
+
+    def test_gzip_text(self):
+        # Compressible types still go through the gzip transform.
+        with open(os.path.join(self.static_dir, "big.txt"), "wb") as f:
+            f.write(self.data)
+        response = self.fetch('/static/big.txt')
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        self.assertEqual(response.body, self.data)
+
+    def test_keep_alive(self):
+        # The connection can be reused after a file has been written.
+        stream = IOStream(socket.socket(), io_loop=self.io_loop)
+        stream.connect(("localhost", self.get_http_port()), self.stop)
+        self.wait()
+        try:
+            for i in range(2):
+                stream.write(b"GET /static/big.bin HTTP/1.1\r\n\r\n")
+                stream.read_until(b"\r\n\r\n", self.stop)
+                headers = self.wait()
+                self.assertTrue(headers.startswith(b"HTTP/1.1 200"), headers)
+                stream.read_bytes(len(self.data), self.stop)
+                self.assertEqual(self.wait(), self.data)
+        finally:
+            stream.close()
+
+
 @wsgi_safe
 class StaticDefaultFilenameTest(WebTestCase):
     def get_app_kwargs(self):
@@ -1783,3 +1845,122 @@ class HandlerByNameTest(WebTestCase):
         self.assertEqual(resp.body, b'hello')
         resp = self.fetch('/hello3')
         self.assertEqual(resp.body, b'hello')
+
+
+@stream_request_body
+class StreamingBodyHandler(RequestHandler):
+    def initialize(self, max_body_size=None):
+        self.max_body_size = max_body_size
+
+    def prepare(self):
+        self.chunks = []
+        if self.get_argument("reject", None):
+            raise HTTPError(403)
+
+    def data_received(self, chunk):
+        self.chunks.append(chunk)
+
+    def put(self):
+        self.write(dict(num_chunks=len(self.chunks),
+                        size=sum(len(c) for c in self.chunks),
+                        body_ok=b"".join(self.chunks) == self.expected_body(),
+                        request_body=native_str(self.request.body)))
+
+    def expected_body(self):
+        return b"".join(utf8(str(i % 10)) for i in range(
+            int(self.request.headers["Content-Length"])))
+
+
+@stream_request_body
+class SlowStreamingBodyHandler(StreamingBodyHandler):
+    @gen.coroutine
+    def prepare(self):
+        self.chunks = []
+        yield gen.Task(IOLoop.current().add_callback)
+
+    @gen.coroutine
+    def data_received(self, chunk):
+        # Only one data_received call may be in progress at a time.
+        if getattr(self, "receiving", False):
+            raise Exception("data_received called concurrently")
+        self.receiving = True
+        yield gen.Task(IOLoop.current().add_timeout,
+                       IOLoop.current().time() + 0.001)
+        self.receiving = False
+        self.chunks.append(chunk)
+
+
+class StreamingRequestBodyTest(WebTestCase):
+    def get_handlers(self):
+        return [("/stream", StreamingBodyHandler),
+                ("/limited", StreamingBodyHandler, dict(max_body_size=1000)),
+                ("/slow", SlowStreamingBodyHandler),
+                ("/hello", HelloHandler)]
+
+    def get_httpserver_options(self):
+        # Streamed bodies are not limited by max_buffer_size.
+        return dict(max_buffer_size=200000)
+
+    def body(self, size):
+        return b"".join(utf8(str(i % 10)) for i in range(size))
+
+    def test_streaming_body(self):
+        response = self.fetch("/stream", method="PUT", body=self.body(500000))
+        result = json_decode(response.body)
+        self.assertEqual(result["size"], 500000)
+        self.assertTrue(result["body_ok"])
+        self.assertTrue(result["num_chunks"] > 1)
+        self.assertEqual(result["request_body"], "")
+
+    def test_slow_consumer(self):
+        response = self.fetch("/slow", method="PUT", body=self.body(500000))
+        result = json_decode(response.body)
+        self.assertEqual(result["size"], 500000)
+        self.assertTrue(result["body_ok"])
+
+    def raw_put(self, path, content_length):
+        # Sends only the headers, so the request must be answered
+        # without reading the body.
+        stream = IOStream(socket.socket(), io_loop=self.io_loop)
+        stream.connect(("localhost", self.get_http_port()), self.stop)
+        self.wait()
+        stream.write(utf8("PUT %s HTTP/1.1\r\nContent-Length: %d\r\n\r\n" %
+                          (path, content_length)))
+        stream.read_until(b"\r\n", self.stop)
+        start_line = self.wait()
+        # The unread body means the connection can't be reused.
+        stream.read_until_close(self.stop)
+        self.wait()
+        stream.close()
+        return start_line
+
+    def test_max_body_size(self):
+        response = self.fetch("/limited", method="PUT", body=self.body(1000))
+        self.assertEqual(response.code, 200)
+        self.assertTrue(self.raw_put("/limited", 1001).startswith(
+            b"HTTP/1.1 413 "))
+        self.assertTrue(self.raw_put("/limited", 10 ** 10).startswith(
+            b"HTTP/1.1 413 "))
+
+    def test_reject_in_prepare(self):
+        self.assertTrue(self.raw_put("/stream?reject=1", 10 ** 10).startswith(
+            b"HTTP/1.1 403 "))
+
+    def test_buffered_handler_routed_once(self):
+        routes = []
+        find_handler = self.app._find_handler
+
+        def counting_find_handler(request):
+            routes.append(request.path)
+            return find_handler(request)
+        self.app._find_handler = counting_find_handler
+        response = self.fetch("/hello", method="POST", body=b"foo")
+        self.assertEqual(response.code, 405)
+        self.assertEqual(routes, ["/hello"])
+
+    def test_buffered_handler_limit(self):
+        # Handlers without @stream_request_body still use max_buffer_size.
+        with ExpectLog(gen_log, "Malformed HTTP request"):
+            response = self.fetch("/hello", method="POST",
+                                  body=self.body(300000))
+        self.assertEqual(response.code, 599)
@@ -58,6 +58,19 @@ class WebSocketTest(AsyncHTTPTestCase):
         ws.close()
         yield self.close_future
 
+    @gen_test
+    def test_write_message_flow_control(self):
+        ws = yield websocket_connect(
+            'ws://localhost:%d/echo' % self.get_http_port(),
+            io_loop=self.io_loop)
+        for i in range(10):
+            yield ws.write_message('hello %d' % i)
+        for i in range(10):
+            response = yield ws.read_message()
+            self.assertEqual(response, 'hello %d' % i)
+        ws.close()
+        yield self.close_future
+
     def test_websocket_callbacks(self):
         websocket_connect(
             'ws://localhost:%d/echo' % self.get_http_port(),
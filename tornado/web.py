@@ -115,6 +115,17 @@ class RequestHandler(object):
     SUPPORTED_METHODS = ("GET", "HEAD", "POST", "DELETE", "PATCH", "PUT",
                          "OPTIONS")
 
+    # Set by the `stream_request_body` decorator.
+    _stream_request_body = False
+
+    #: The largest request body (in bytes) that a `stream_request_body`
+    #: handler accepts; larger requests are rejected with a 413 error
+    #: before any of the body is read.  May be overridden in a subclass
+    #: or set in `initialize` for per-route limits.  None means no limit.
+    #:
+    #: .. versionadded:: 3.2
+    max_body_size = None
+
     _template_loaders = {}  # {path: template.BaseLoader}
     _template_loader_lock = threading.Lock()
     _remove_control_chars_regex = re.compile(r"[\x00-\x08\x0e-\x1f]")
@@ -128,6 +139,7 @@ class RequestHandler(object):
         self._finished = False
         self._auto_finish = True
         self._transforms = None  # will be set in _execute
+        self._body_stream = None  # set by Application.start_request_stream
         self.path_args = None
         self.path_kwargs = None
         self.ui = ObjectDict((n, self._ui_method(m)) for n, m in
@@ -237,6 +249,22 @@ class RequestHandler(object):
         """
         pass
 
+    def data_received(self, chunk):
+        """Implement this method to handle streamed request data.
+
+        Requires the `stream_request_body` decorator.  Called with each
+        piece of the request body as it arrives, after `prepare` has
+        finished and before the HTTP method (`get`/`post`/etc) is called.
+
+        If this method returns a `.Future` (e.g. when decorated with
+        `.gen.coroutine`), no more of the body is read from the
+        connection until it has resolved, so a slow consumer holds the
+        client back instead of the body piling up in memory.
+
+        .. versionadded:: 3.2
+        """
+        raise NotImplementedError()
+
     def clear(self):
         """Resets all headers and content for this response."""
         self._headers = httputil.HTTPHeaders({
@@ -761,13 +789,22 @@ class RequestHandler(object):
         Note that only one flush callback can be outstanding at a time;
         if another flush occurs before the previous flush's callback
         has been run, the previous callback will be discarded.
+
+        Returns the `.Future` from the connection's ``wait_for_drain``
+        (see `.BaseIOStream.wait_for_drain`), which allows flow control
+        without waiting for the buffer to be completely empty.
+
+        .. versionchanged:: 3.2
+           Returns a `.Future`.
         """
         if self.application._wsgi:
             # WSGI applications cannot usefully support flush, so just make
             # it a no-op (and run the callback immediately).
             if callback is not None:
                 callback()
-            return
+            future = Future()
+            future.set_result(None)
+            return future
 
         chunk = b"".join(self._write_buffer)
         self._write_buffer = []
@@ -787,9 +824,9 @@ class RequestHandler(object):
         if self.request.method == "HEAD":
             if headers:
                 self.request.write(headers, callback=callback)
-            return
-
-        self.request.write(headers + chunk, callback=callback)
+        else:
+            self.request.write(headers + chunk, callback=callback)
+        return self.request.connection.wait_for_drain()
 
     def finish(self, chunk=None):
         """Finishes this response, ending the HTTP request."""
@@ -1195,6 +1232,11 @@ class RequestHandler(object):
             self.path_args = [self.decode_argument(arg) for arg in args]
             self.path_kwargs = dict((k, self.decode_argument(v, name=k))
                                     for (k, v) in kwargs.items())
+            if (self._body_stream is not None and
+                    self.max_body_size is not None and
+                    int(self.request.headers["Content-Length"]) >
+                    self.max_body_size):
+                raise HTTPError(413)
             # If XSRF cookies are turned on, reject form submissions without
             # the proper cookie
             if self.request.method not in ("GET", "HEAD", "OPTIONS") and \
@@ -1227,6 +1269,14 @@ class RequestHandler(object):
 
     def _execute_method(self):
         if not self._finished:
+            body_stream = self._body_stream
+            if body_stream is not None and not body_stream.complete.done():
+                # Start passing the body to data_received, and call the
+                # HTTP method once all of it has been received.
+                body_stream.prepared.set_result(None)
+                self._when_complete(body_stream.complete,
+                                    self._execute_method)
+                return
             method = getattr(self, self.request.method.lower())
             self._when_complete(method(*self.path_args, **self.path_kwargs),
                                 self._execute_finish)
@@ -1387,6 +1437,36 @@ def asynchronous(method):
     return wrapper
 
 
+def stream_request_body(cls):
+    """Apply to `RequestHandler` subclasses to enable streaming body support.
+
+    The request body is passed to `RequestHandler.data_received` in
+    pieces as it arrives instead of being read into memory first, so
+    large uploads can be processed (or proxied) in constant memory:
+
+    * `RequestHandler.prepare` is called when the request headers have
+      been read.  It may reject the request before any of the body is
+      read by raising `HTTPError` or finishing the response.
+    * `RequestHandler.data_received` is called zero or more times as
+      data arrives.  It may return a `.Future` to apply flow control.
+    * The regular HTTP method (``post``, ``put``, etc) is called once
+      the whole body has been received.
+
+    `RequestHandler.max_body_size` limits the size of the body.
+    ``self.request.body`` is empty and body arguments are not parsed,
+    so the ``_xsrf`` token (if ``xsrf_cookies`` is enabled) must be
+    sent in a header or the query string.  Only bodies with a
+    ``Content-Length`` are streamed, and streaming requires
+    `.HTTPServer` (it is ignored under WSGI).
+
+    .. versionadded:: 3.2
+    """
+    if not issubclass(cls, RequestHandler):
+        raise TypeError("expected subclass of RequestHandler, got %r" % cls)
+    cls._stream_request_body = True
+    return cls
+
+
 def removeslash(method):
     """Use this decorator to remove trailing slashes from the request path.
 
@@ -1628,19 +1708,59 @@ class Application(object):
 
     def __call__(self, request):
         """Called by HTTPServer to execute the request."""
-        transforms = [t(request) for t in self.transforms]
-        handler = None
+        # Requests with a body were already routed by
+        # start_request_stream.
+        route = request.__dict__.pop("_route", None)
+        if route is None:
+            route = self._find_handler(request)
+        handler_class, handler_kwargs, args, kwargs = route
+        handler = handler_class(self, request, **handler_kwargs)
+        self._execute_handler(handler, args, kwargs)
+        return handler
+
+    def start_request_stream(self, request):
+        """Called by `.HTTPServer` once the headers of a request with a
+        body have been read.
+
+        If the request is routed to a handler decorated with
+        `stream_request_body`, the handler is started right away and
+        an object that passes the body on to its
+        `~RequestHandler.data_received` method is returned.  Otherwise
+        returns None, and the request is handled by `__call__` once
+        its body has been read.
+
+        .. versionadded:: 3.2
+        """
+        route = self._find_handler(request)
+        handler_class, handler_kwargs, args, kwargs = route
+        if not handler_class._stream_request_body:
+            # Saved for __call__, so the request isn't routed twice.
+            request._route = route
+            return None
+        handler = handler_class(self, request, **handler_kwargs)
+        handler._body_stream = _HandlerBodyStream(handler)
+        self._execute_handler(handler, args, kwargs)
+        return handler._body_stream
+
+    def _find_handler(self, request):
+        """Returns the handler class for ``request``, with the keyword
+        arguments to construct it with and the positional and keyword
+        arguments for its HTTP method.
+        """
+        handler_class = None
+        handler_kwargs = {}
         args = []
         kwargs = {}
         handlers = self._get_host_handlers(request)
         if not handlers:
-            handler = RedirectHandler(
-                self, request, url="http://" + self.default_host + "/")
+            handler_class = RedirectHandler
+            handler_kwargs = dict(url="http://" + self.default_host + "/")
         else:
             for spec in handlers:
                 match = spec.regex.match(request.path)
                 if match:
-                    handler = spec.handler_class(self, request, **spec.kwargs)
+                    handler_class = spec.handler_class
+                    handler_kwargs = spec.kwargs
                     if spec.regex.groups:
                         # None-safe wrapper around url_unescape to handle
                         # unmatched optional groups correctly
@@ -1662,15 +1782,18 @@ class Application(object):
                         else:
                             args = [unquote(s) for s in match.groups()]
                     break
-            if not handler:
+            if handler_class is None:
                 if self.settings.get('default_handler_class'):
                     handler_class = self.settings['default_handler_class']
-                    handler_args = self.settings.get(
+                    handler_kwargs = self.settings.get(
                         'default_handler_args', {})
                 else:
                     handler_class = ErrorHandler
-                    handler_args = dict(status_code=404)
-                handler = handler_class(self, request, **handler_args)
+                    handler_kwargs = dict(status_code=404)
+        return handler_class, handler_kwargs, args, kwargs
+
+    def _execute_handler(self, handler, args, kwargs):
+        transforms = [t(handler.request) for t in self.transforms]
 
         # If template cache is disabled (usually in the debug mode),
         # re-compile templates and reload static files on every
@@ -1683,7 +1806,6 @@ class Application(object):
             StaticFileHandler.reset()
 
         handler._execute(transforms, *args, **kwargs)
-        return handler
 
     def reverse_url(self, name, *args):
         """Returns a URL path for handler named ``name``
@@ -1720,6 +1842,43 @@ class Application(object):
                    handler._request_summary(), request_time)
 
 
+class _HandlerBodyStream(object):
+    """Passes a streamed request body from the `.HTTPConnection` to a
+    `stream_request_body` handler.
+
+    Data is held back (by returning an unresolved `.Future`) until the
+    handler's `~RequestHandler.prepare` has finished.
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.prepared = Future()
+        self.complete = Future()
+
+    def data_received(self, chunk):
+        future = Future()
+        if self.prepared.done():
+            self._deliver(chunk, future)
+        else:
+            self.prepared.add_done_callback(
+                lambda f: self._deliver(chunk, future))
+        return future
+
+    def _deliver(self, chunk, future):
+        handler = self.handler
+        if handler._finished:
+            future.set_result(None)
+            return
+        try:
+            result = handler.data_received(chunk)
+        except Exception as e:
+            handler._handle_request_exception(e)
+            return
+        handler._when_complete(result, lambda: future.set_result(None))
+
+    def finish(self):
+        self.complete.set_result(None)
+
+
 class HTTPError(Exception):
     """An exception that will turn into an HTTP error response.
 
@@ -1926,6 +2085,19 @@ class StaticFileHandler(RequestHandler):
                                 httputil._get_content_range(start, end, size))
         else:
             start = end = None
+
+        if include_body and self._can_write_file():
+            # Hand the file to the IOStream (which uses sendfile where
+            # it can) instead of reading it into the output buffer.
+            start = start or 0
+            if end is None:
+                end = self.get_content_size()
+            self.set_header("Content-Length", end - start)
+            self.flush()
+            self.request.write_file(open(self.absolute_path, "rb"),
+                                    start, end - start)
+            return
+
         content = self.get_content(self.absolute_path, start, end)
         if isinstance(content, bytes_type):
             content = [content]
@@ -1939,6 +2111,31 @@ class StaticFileHandler(RequestHandler):
             assert self.request.method == "HEAD"
             self.set_header("Content-Length", content_length)
 
+    def _can_write_file(self):
+        """Returns True if the response body can be written straight from
+        the file with `.HTTPRequest.write_file`.
+
+        This is only possible when `get_content` has not been overridden
+        and no output transform would change the content.
+        """
+        if (self.application._wsgi or
+                getattr(self.request, "connection", None) is None):
+            return False
+        if (self.get_content.__func__ is not
+                StaticFileHandler.get_content.__func__):
+            return False
+        # Chunked encoding is never applied to a response with a
+        # Content-Length; gzip only applies to some content types.
+        content_type = _unicode(self._headers.get("Content-Type", ""))
+        for transform in self._transforms:
+            if type(transform) is GZipContentEncoding:
+                if (transform._gzipping and content_type.split(";")[0] in
+                        transform.CONTENT_TYPES):
+                    return False
+            elif type(transform) is not ChunkedTransferEncoding:
+                return False
+        return True
+
     def compute_etag(self):
         """Sets the ``Etag`` header based on static url version.
 
@@ -2117,8 +2314,9 @@ class StaticFileHandler(RequestHandler):
     def get_content_size(self):
         """Retrieve the total size of the resource at the given path.
 
-        This method may be overridden by subclasses. It will only
-        be called if a partial result is requested from `get_content`
+        This method may be overridden by subclasses. It is called if a
+        partial result is requested from `get_content`, or if the file
+        is sent directly with `.HTTPRequest.write_file`.
 
         .. versionadded:: 3.1
         """
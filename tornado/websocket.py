@@ -170,15 +170,22 @@ class WebSocketHandler(tornado.web.RequestHandler):
 
         If the connection is already closed, raises `WebSocketClosedError`.
 
+        Returns the `.Future` from `.BaseIOStream.wait_for_drain`, which
+        a coroutine sending many messages can yield to avoid buffering
+        more than the client is reading.
+
         .. versionchanged:: 3.2
            `WebSocketClosedError` was added (previously a closed connection
            would raise an `AttributeError`)
+
+        .. versionchanged:: 3.2
+           Returns a `.Future` for flow control.
         """
         if self.ws_connection is None:
             raise WebSocketClosedError()
         if isinstance(message, dict):
             message = tornado.escape.json_encode(message)
-        self.ws_connection.write_message(message, binary=binary)
+        return self.ws_connection.write_message(message, binary=binary)
 
     def select_subprotocol(self, subprotocols):
         """Invoked when a new WebSocket requests specific subprotocols.
@@ -484,6 +491,7 @@ class WebSocketProtocol76(WebSocketProtocol):
             message = message.encode("utf-8")
         assert isinstance(message, bytes_type)
         self.stream.write(b"\x00" + message + b"\xff")
+        return self.stream.wait_for_drain()
 
     def write_ping(self, data):
         """Send ping frame."""
@@ -612,6 +620,7 @@ class WebSocketProtocol13(WebSocketProtocol):
             self._write_frame(True, opcode, message)
         except StreamClosedError:
             self._abort()
+        return self.stream.wait_for_drain()
 
     def write_ping(self, data):
         """Send ping frame."""
@@ -833,8 +842,12 @@ class WebSocketClientConnection(simple_httpclient._HTTPConnection):
         self.connect_future.set_result(self)
 
     def write_message(self, message, binary=False):
-        """Sends a message to the WebSocket server."""
-        self.protocol.write_message(message, binary)
+        """Sends a message to the WebSocket server.
+
+        Returns a `.Future` for flow control, as
+        `WebSocketHandler.write_message` does.
+        """
+        return self.protocol.write_message(message, binary)
 
     def read_message(self, callback=None):
         """Reads a message from the WebSocket server.